@@ -0,0 +1,179 @@
+"""Backfill CSM snapshots and module lists of a past block range into the `SnapshotArchive` file.
+
+The blocks are split into contiguous shards handed out to a pool of worker processes. Each
+worker opens its own RPC connection, pins every read to the block it builds, and walks its
+shards forward so the incremental queue/operator mirrors only fetch what changed between
+consecutive blocks. The parent appends finished shards to the archive in block order, so
+the blocks are stored as deltas between keyframes, and `?block=N` requests serve them like
+the blocks archived by the follower. Backfilled blocks are pinned: the archive retention never
+prunes them. Blocks already archived are skipped, so an interrupted run is resumed by
+starting it again with the same arguments.
+
+Run from the repository root (needs an archive node, e.g. the anvil fork of docker-compose.yml):
+
+    SNAPSHOT_ARCHIVE=archive.sqlite3 python -m app.backfill --from 20000000 --to 20001000 --workers 4
+"""
+from __future__ import annotations
+
+import argparse
+from concurrent.futures import FIRST_COMPLETED, Executor, Future, ProcessPoolExecutor, wait
+from dataclasses import dataclass
+import logging
+import time
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from app.config import Config, load_config
+from app.models import Module
+from app.services.snapshot_archive import SnapshotArchive
+
+
+logger = logging.getLogger(__name__)
+
+# (csm service, router service) of this worker process; either may be None
+_services: Optional[Tuple[Any, Any]] = None
+
+
+def init_worker(cfg: Optional[Config] = None, services: Optional[Tuple[Any, Any]] = None) -> None:
+    """Pool initializer: build this worker's services (and RPC connection) from `cfg`, or use `services`."""
+    global _services
+    if services is None:
+        from app.services.csm_service import make_csm_service
+        from app.services.router_service import make_router_service
+
+        cfg = cfg or load_config()
+        csm = make_csm_service(cfg) if cfg.csm_address else None
+        router = make_router_service(cfg) if cfg.staking_router_address or cfg.lido_locator_address else None
+        services = (csm, router)
+    _services = services
+
+
+Row = Tuple[int, Optional[Dict[str, Any]], Optional[List[Module]]]
+
+
+def backfill_shard(blocks: Sequence[int]) -> Tuple[List[Row], List[int]]:
+    """Build the state at each of `blocks` (ascending) in this worker.
+
+    Returns the (block, csm snapshot, modules) rows and the blocks that failed; those are not
+    written, so the next run retries them.
+    """
+    if _services is None:
+        init_worker()
+    csm, router = _services  # type: ignore[misc]
+    rows: List[Row] = []
+    failed: List[int] = []
+    for block in blocks:
+        try:
+            snapshot = csm.snapshot(block) if csm is not None else None
+            modules = router.list_modules(block) if router is not None else None
+        except Exception:
+            logger.warning("Backfill of block %s failed", block, exc_info=True)
+            failed.append(block)
+            continue
+        rows.append((block, snapshot, modules))
+    return rows, failed
+
+
+def shards(blocks: Sequence[int], size: int) -> List[List[int]]:
+    """`blocks` cut into contiguous runs of at most `size`."""
+    size = max(1, size)
+    return [list(blocks[i : i + size]) for i in range(0, len(blocks), size)]
+
+
+@dataclass
+class BackfillStats:
+    requested: int = 0
+    # Already archived when the run started
+    skipped: int = 0
+    written: int = 0
+    failed: int = 0
+    seconds: float = 0.0
+
+    @property
+    def blocks_per_second(self) -> float:
+        return self.written / self.seconds if self.seconds > 0 else 0.0
+
+
+def run_backfill(
+    archive: SnapshotArchive,
+    blocks: Iterable[int],
+    executor: Executor,
+    shard_size: int = 50,
+    clock: Any = time.monotonic,
+    max_pending: int = 8,
+) -> BackfillStats:
+    """Backfill `blocks` not yet in `archive`, building them on `executor` (see `init_worker`).
+
+    Shards finishing early wait for the ones before them, as the archive takes blocks in
+    increasing order; at most `max_pending` shards are submitted or waiting at a time, so a slow
+    shard does not leave the snapshots of all later ones in memory. Each run writes through a
+    pinned writer of its own, as the blocks it fills in may be older than the ones `archive`
+    last appended.
+    """
+    wanted = sorted(set(blocks))
+    stats = BackfillStats(requested=len(wanted))
+    if not wanted:
+        return stats
+    done = set(archive.archived(wanted[0], wanted[-1]))
+    todo = [block for block in wanted if block not in done]
+    stats.skipped = len(wanted) - len(todo)
+    writer = archive.writer(pinned=True)
+    started = clock()
+    tasks = shards(todo, shard_size)
+    running: Dict[Future, int] = {}
+    finished: Dict[int, Tuple[List[Row], List[int]]] = {}
+    next_shard = 0
+    while next_shard < len(tasks):
+        # Shards are submitted in order, so the next one to write is always among them
+        submitted = next_shard + len(running) + len(finished)
+        for i in range(submitted, min(len(tasks), next_shard + max(1, max_pending))):
+            running[executor.submit(backfill_shard, tasks[i])] = i
+        done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+        for future in done:
+            finished[running.pop(future)] = future.result()
+        while next_shard in finished:
+            rows, failed = finished.pop(next_shard)
+            next_shard += 1
+            for block, snapshot, modules in rows:
+                writer.append(block, snapshot, modules)
+            stats.written += len(rows)
+            stats.failed += len(failed)
+        stats.seconds = clock() - started
+        logger.info(
+            "Processed %s/%s blocks, %s failed (%.1f blocks/s)",
+            stats.written + stats.failed,
+            len(todo),
+            stats.failed,
+            stats.blocks_per_second,
+        )
+    return stats
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.backfill", description=__doc__.splitlines()[0])
+    parser.add_argument("--from", dest="start", type=int, required=True, help="first block")
+    parser.add_argument("--to", dest="end", type=int, required=True, help="last block (inclusive)")
+    parser.add_argument("--step", type=int, default=1, help="backfill every N-th block")
+    parser.add_argument("--workers", type=int, default=4, help="worker processes (one RPC connection each)")
+    parser.add_argument("--shard-size", type=int, default=50, help="blocks per task and per write")
+    parser.add_argument("--db", help="snapshot archive file to write to (default: SNAPSHOT_ARCHIVE)")
+    args = parser.parse_args(argv)
+    if args.end < args.start or args.step < 1:
+        parser.error("expected --from <= --to and --step >= 1")
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    cfg = load_config()
+    path = args.db or cfg.snapshot_archive_path
+    if not path:
+        parser.error("set SNAPSHOT_ARCHIVE or --db")
+    archive = SnapshotArchive(path, keyframe_every=cfg.archive_keyframe_interval)
+    blocks = range(args.start, args.end + 1, args.step)
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=init_worker, initargs=(cfg,)) as pool:
+        stats = run_backfill(archive, blocks, pool, shard_size=args.shard_size, max_pending=2 * args.workers)
+    print(
+        f"{stats.written} blocks written, {stats.skipped} already stored, {stats.failed} failed"
+        f" in {stats.seconds:.1f}s ({stats.blocks_per_second:.1f} blocks/s)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -2,7 +2,7 @@ from __future__ import annotations
 
 import os
 from dataclasses import dataclass
-from typing import Optional
+from typing import Optional, Tuple
 
 from dotenv import load_dotenv
 
@@ -10,10 +10,24 @@ from dotenv import load_dotenv
 load_dotenv()
 
 
+# Multicall3 is deployed at the same address on mainnet, testnets and most EVM chains.
+MULTICALL3_ADDRESS = "0xcA11bde05977b3631167028862bE2a173976CA11"
+
+
 @dataclass(frozen=True)
 class Config:
     eth_rpc_url: str
     eth_rpc_timeout: int = 20
+    # Several RPC endpoints (ETH_RPC_URLS) are pooled: latency-ranked, hedged, circuit-broken
+    eth_rpc_urls: Tuple[str, ...] = ()
+    # Hedge a read after this percentile of the endpoint's latency (0 disables hedging)
+    rpc_hedge_percentile: float = 0.95
+    # Consecutive failures that open an endpoint's circuit, and seconds before it is probed again
+    rpc_breaker_failures: int = 5
+    rpc_breaker_cooldown: float = 30.0
+    # Per-endpoint request rate cap (requests/s, None = none) and ceiling of the adaptive concurrency limit
+    rpc_rate_limit: Optional[float] = None
+    rpc_max_concurrency: int = 16
     # Prefer locator; if provided and router not set, we will resolve via locator.
     lido_locator_address: Optional[str] = None
     staking_router_address: Optional[str] = None
@@ -23,10 +37,51 @@ class Config:
     # Community Staking Module (CSM)
     csm_address: Optional[str] = None
     csm_abi: str = "csm.json"
+    # Sync the CSM deposit queue incrementally (only new batches) instead of re-reading it
+    csm_incremental_queue: bool = True
+    # Refresh node operators from CSM event logs; full re-read at least every N blocks
+    csm_incremental_operators: bool = True
+    csm_operators_reconcile_blocks: int = 7200
+    # Max block span of a single eth_getLogs request
+    csm_log_block_range: int = 5000
+    # Multicall3 used to aggregate view calls; None disables aggregation (sequential calls).
+    multicall_address: Optional[str] = MULTICALL3_ADDRESS
+    multicall_abi: str = "multicall3.json"
+    # Max number of calls packed into a single aggregate3 eth_call
+    multicall_batch_size: int = 500
+    # Send aggregated reads as JSON-RPC batch arrays (instead of Multicall3)
+    eth_rpc_batch: bool = False
+    eth_rpc_batch_size: int = 100
+    # Serve the API from asyncio services (AsyncWeb3) instead of sync services in the threadpool
+    eth_async: bool = False
+    # Max concurrent RPC requests (and pooled keep-alive connections) of the async adapter
+    eth_max_concurrency: int = 8
+    # Precompute snapshots in a background task that follows new blocks
+    snapshot_follower: bool = False
+    follower_poll_interval: float = 2.0
+    # Seconds without a confirmed-current snapshot after which requests wait for a refresh
+    snapshot_max_staleness: Optional[float] = None
+    # Block-keyed snapshot cache bounds (entries, approximate bytes); 0 entries disables it
+    snapshot_cache_entries: int = 64
+    snapshot_cache_bytes: int = 128 * 1024 * 1024
+    # SQLite file keeping the follower's latest snapshots across restarts; None disables it
+    snapshot_store_path: Optional[str] = None
+    # SQLite file archiving every followed block for ?block=N queries; None disables it
+    snapshot_archive_path: Optional[str] = None
+    # Full CSM snapshot every N archived blocks (deltas in between); archive depth in blocks
+    archive_keyframe_interval: int = 256
+    archive_retention_blocks: int = 50_400
 
 
 def load_config() -> Config:
-    rpc = os.getenv("ETH_RPC_URL", "")
+    rpc_urls = tuple(u.strip() for u in os.getenv("ETH_RPC_URLS", "").split(",") if u.strip())
+    rpc = os.getenv("ETH_RPC_URL", "") or (rpc_urls[0] if rpc_urls else "")
+    rpc_hedge_percentile = float(os.getenv("RPC_HEDGE_PERCENTILE", "0.95"))
+    rpc_breaker_failures = int(os.getenv("RPC_BREAKER_FAILURES", "5"))
+    rpc_breaker_cooldown = float(os.getenv("RPC_BREAKER_COOLDOWN", "30"))
+    rate_limit = os.getenv("RPC_RATE_LIMIT")
+    rpc_rate_limit = float(rate_limit) if rate_limit else None
+    rpc_max_concurrency = int(os.getenv("RPC_MAX_CONCURRENCY", "16"))
     timeout = int(os.getenv("ETH_RPC_TIMEOUT", "20"))
     locator = os.getenv("LIDO_LOCATOR_ADDRESS")
     router = os.getenv("STAKING_ROUTER_ADDRESS")
@@ -34,14 +89,62 @@ def load_config() -> Config:
     router_abi = os.getenv("ROUTER_ABI", "staking_router.json")
     csm_address = os.getenv("COMMUNITY_STAKING_MODULE_ADDRESS")
     csm_abi = os.getenv("CSM_ABI", "csm.json")
+    csm_incremental_queue = os.getenv("CSM_INCREMENTAL_QUEUE", "1").lower() not in ("0", "false", "no")
+    csm_incremental_operators = os.getenv("CSM_INCREMENTAL_OPERATORS", "1").lower() not in ("0", "false", "no")
+    csm_operators_reconcile_blocks = int(os.getenv("CSM_OPERATORS_RECONCILE_BLOCKS", "7200"))
+    csm_log_block_range = int(os.getenv("CSM_LOG_BLOCK_RANGE", "5000"))
+    # Set MULTICALL3_ADDRESS to an empty string to disable aggregation
+    multicall_address = os.getenv("MULTICALL3_ADDRESS", MULTICALL3_ADDRESS) or None
+    multicall_abi = os.getenv("MULTICALL3_ABI", "multicall3.json")
+    multicall_batch_size = int(os.getenv("MULTICALL_BATCH_SIZE", "500"))
+    rpc_batch = os.getenv("ETH_RPC_BATCH", "").lower() in ("1", "true", "yes")
+    rpc_batch_size = int(os.getenv("ETH_RPC_BATCH_SIZE", "100"))
+    eth_async = os.getenv("ETH_ASYNC", "").lower() in ("1", "true", "yes")
+    eth_max_concurrency = int(os.getenv("ETH_MAX_CONCURRENCY", "8"))
+    snapshot_follower = os.getenv("SNAPSHOT_FOLLOWER", "").lower() in ("1", "true", "yes")
+    follower_poll_interval = float(os.getenv("FOLLOWER_POLL_INTERVAL", "2"))
+    max_staleness = os.getenv("SNAPSHOT_MAX_STALENESS")
+    snapshot_max_staleness = float(max_staleness) if max_staleness else None
+    cache_entries = int(os.getenv("SNAPSHOT_CACHE_ENTRIES", "64"))
+    cache_bytes = int(os.getenv("SNAPSHOT_CACHE_MB", "128")) * 1024 * 1024
+    snapshot_store_path = os.getenv("SNAPSHOT_STORE") or None
+    snapshot_archive_path = os.getenv("SNAPSHOT_ARCHIVE") or None
+    archive_keyframe_interval = int(os.getenv("ARCHIVE_KEYFRAME_INTERVAL", "256"))
+    archive_retention_blocks = int(os.getenv("ARCHIVE_RETENTION_BLOCKS", "50400"))
 
     return Config(
         eth_rpc_url=rpc,
         eth_rpc_timeout=timeout,
+        eth_rpc_urls=rpc_urls,
+        rpc_hedge_percentile=rpc_hedge_percentile,
+        rpc_breaker_failures=rpc_breaker_failures,
+        rpc_breaker_cooldown=rpc_breaker_cooldown,
+        rpc_rate_limit=rpc_rate_limit,
+        rpc_max_concurrency=rpc_max_concurrency,
         lido_locator_address=locator,
         staking_router_address=router,
         locator_abi=locator_abi,
         router_abi=router_abi,
         csm_address=csm_address,
         csm_abi=csm_abi,
+        csm_incremental_queue=csm_incremental_queue,
+        csm_incremental_operators=csm_incremental_operators,
+        csm_operators_reconcile_blocks=csm_operators_reconcile_blocks,
+        csm_log_block_range=csm_log_block_range,
+        multicall_address=multicall_address,
+        multicall_abi=multicall_abi,
+        multicall_batch_size=multicall_batch_size,
+        eth_rpc_batch=rpc_batch,
+        eth_rpc_batch_size=rpc_batch_size,
+        eth_async=eth_async,
+        eth_max_concurrency=eth_max_concurrency,
+        snapshot_follower=snapshot_follower,
+        follower_poll_interval=follower_poll_interval,
+        snapshot_max_staleness=snapshot_max_staleness,
+        snapshot_cache_entries=cache_entries,
+        snapshot_cache_bytes=cache_bytes,
+        snapshot_store_path=snapshot_store_path,
+        snapshot_archive_path=snapshot_archive_path,
+        archive_keyframe_interval=archive_keyframe_interval,
+        archive_retention_blocks=archive_retention_blocks,
     )
@@ -1,19 +1,114 @@
 from __future__ import annotations
 
 from functools import lru_cache
+import logging
+from typing import List, Optional, Union
 
 from app.config import load_config
-from app.services.router_service import RouterService, make_router_service
-from app.services.csm_service import CsmService, make_csm_service
+from app.eth.async_adapter import AsyncEthAdapter, make_async_eth_adapter
+from app.eth.provider_pool import EndpointPool, shared_endpoint_pool
+from app.eth.rate_control import RateController, controllers
+from app.services.router_service import (
+    AsyncRouterService,
+    RouterService,
+    make_async_router_service,
+    make_router_service,
+)
+from app.services.csm_service import AsyncCsmService, CsmService, make_async_csm_service, make_csm_service
+from app.services.follower import BlockFollower
+from app.services.snapshot_archive import SnapshotArchive
+from app.services.snapshot_cache import SnapshotCache
+from app.services.snapshot_store import SnapshotStore
+
+
+logger = logging.getLogger(__name__)
 
 
 @lru_cache(maxsize=1)
-def get_router_service() -> RouterService:
+def get_snapshot_cache() -> Optional[SnapshotCache]:
     cfg = load_config()
-    return make_router_service(cfg)
+    if cfg.snapshot_cache_entries <= 0:
+        return None
+    return SnapshotCache(max_entries=cfg.snapshot_cache_entries, max_bytes=cfg.snapshot_cache_bytes)
 
 
 @lru_cache(maxsize=1)
-def get_csm_service() -> CsmService:
+def get_snapshot_store() -> Optional[SnapshotStore]:
     cfg = load_config()
-    return make_csm_service(cfg)
+    if not cfg.snapshot_store_path:
+        return None
+    return SnapshotStore(cfg.snapshot_store_path)
+
+
+@lru_cache(maxsize=1)
+def get_snapshot_archive() -> Optional[SnapshotArchive]:
+    cfg = load_config()
+    if not cfg.snapshot_archive_path:
+        return None
+    return SnapshotArchive(
+        cfg.snapshot_archive_path,
+        keyframe_every=cfg.archive_keyframe_interval,
+        retention_blocks=cfg.archive_retention_blocks,
+    )
+
+
+def get_endpoint_pool() -> Optional[EndpointPool]:
+    """RPC endpoint pool shared by all adapters, or None with a single ETH_RPC_URL."""
+    return shared_endpoint_pool(load_config())
+
+
+def get_rate_controllers() -> List[RateController]:
+    """Per-endpoint concurrency/rate controllers of the adapters built so far."""
+    return controllers()
+
+
+@lru_cache(maxsize=1)
+def get_async_eth_adapter() -> AsyncEthAdapter:
+    """One async adapter (and connection pool) shared by the async services."""
+    return make_async_eth_adapter(load_config())
+
+
+@lru_cache(maxsize=1)
+def get_router_service() -> Union[RouterService, AsyncRouterService]:
+    cfg = load_config()
+    if cfg.eth_async:
+        return make_async_router_service(cfg, get_async_eth_adapter(), cache=get_snapshot_cache())
+    return make_router_service(cfg, cache=get_snapshot_cache())
+
+
+@lru_cache(maxsize=1)
+def get_csm_service() -> Union[CsmService, AsyncCsmService]:
+    cfg = load_config()
+    if cfg.eth_async:
+        return make_async_csm_service(cfg, get_async_eth_adapter(), cache=get_snapshot_cache())
+    return make_csm_service(cfg, cache=get_snapshot_cache())
+
+
+@lru_cache(maxsize=1)
+def get_follower() -> Optional[BlockFollower]:
+    """Background block follower, or None unless SNAPSHOT_FOLLOWER is enabled."""
+    cfg = load_config()
+    if not cfg.snapshot_follower:
+        return None
+    router = get_router_service()
+    csm = None
+    if cfg.csm_address:
+        csm = get_csm_service()
+    else:
+        logger.info("COMMUNITY_STAKING_MODULE_ADDRESS is not set; the follower only tracks modules")
+    return BlockFollower(
+        router.adapter.block_number,
+        csm=csm,
+        router=router,
+        poll_interval=cfg.follower_poll_interval,
+        max_staleness=cfg.snapshot_max_staleness,
+        wait_timeout=cfg.eth_rpc_timeout,
+        store=get_snapshot_store(),
+        archive=get_snapshot_archive(),
+    )
+
+
+async def close() -> None:
+    """Release pooled connections of the async adapter, if it was created."""
+    if get_async_eth_adapter.cache_info().currsize:
+        await get_async_eth_adapter().close()
@@ -1,12 +1,14 @@
 from __future__ import annotations
 
+from functools import lru_cache
 import json
 import os
 from typing import Any, Dict
 
 
+@lru_cache(maxsize=None)
 def load_abi_file(filename: str) -> Dict[str, Any]:
-    """Load an ABI JSON from `abi/<filename>`.
+    """Load an ABI JSON from `abi/<filename>`; parsed once and shared, so treat it as read-only.
 
     Raises FileNotFoundError with a clear message if missing.
     """
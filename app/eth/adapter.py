@@ -1,10 +1,17 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import Any, Dict, List, Optional
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Sequence, Tuple
 import logging
 
 from app.eth.abi_loader import load_abi_file
+from app.eth.codec import FastContract, hot_codecs
+from app.eth.multicall import CallResult, decode_result, encode_call
+from app.eth.rpc_batch import RpcBatchTransport
+from app.metrics import instrument_web3, observe_contract_calls, register_functions
+
+if TYPE_CHECKING:  # pragma: no cover
+    from app.config import Config
 
 
 logger = logging.getLogger(__name__)
@@ -13,10 +20,152 @@ logger = logging.getLogger(__name__)
 @dataclass
 class EthAdapter:
     web3: Any
+    # Multicall3 contract used by `multicall()`; None means plain sequential calls.
+    multicall_address: Optional[str] = None
+    multicall_abi: str = "multicall3.json"
+    multicall_batch_size: int = 500
+    # When set, `call_many()` sends eth_calls as JSON-RPC batch arrays instead of aggregate3.
+    batch_transport: Optional[RpcBatchTransport] = None
+    _multicall_contract: Any = field(default=None, init=False, repr=False)
+    _contracts: Dict[Tuple[str, str], Any] = field(default_factory=dict, init=False, repr=False)
 
     def contract(self, address: str, abi_filename: str) -> Any:
-        abi = load_abi_file(abi_filename)
-        return self.web3.eth.contract(address=self.web3.to_checksum_address(address), abi=abi)
+        """Contract at `address`, built once per (address, ABI file); see `FastContract`."""
+        key = (address.lower(), abi_filename)
+        contract = self._contracts.get(key)
+        if contract is None:
+            abi = load_abi_file(abi_filename)
+            register_functions(abi)
+            contract = FastContract(
+                self.web3.eth.contract(address=self.web3.to_checksum_address(address), abi=abi),
+                hot_codecs(abi_filename),
+            )
+            self._contracts[key] = contract
+        return contract
+
+    def block_number(self) -> int:
+        return int(self.web3.eth.block_number)
+
+    def get_block(self, block_identifier: Any) -> Any:
+        """Return the block header (includes `hash` and `parentHash`)."""
+        return self.web3.eth.get_block(block_identifier)
+
+    def get_logs(self, filter_params: Dict[str, Any]) -> List[Any]:
+        return list(self.web3.eth.get_logs(filter_params))
+
+    def call_many(self, calls: Sequence[Any], block_identifier: Any = None) -> List[CallResult]:
+        """Execute many bound contract calls with the configured aggregation transport.
+
+        Uses the JSON-RPC batch transport when configured, Multicall3 otherwise. Failures are
+        reported per call; results are returned in the order of `calls`.
+        """
+        if self.batch_transport is not None:
+            results = self.batch_call(calls, block_identifier)
+        else:
+            results = self.multicall(calls, block_identifier)
+        observe_contract_calls(calls, results)
+        return results
+
+    def batch_call(self, calls: Sequence[Any], block_identifier: Any = None) -> List[CallResult]:
+        """Execute bound contract calls as individual eth_call entries of JSON-RPC batches."""
+        if self.batch_transport is None:
+            raise RuntimeError("JSON-RPC batch transport is not configured")
+        if block_identifier is None:
+            block = "latest"
+        elif isinstance(block_identifier, int):
+            block = hex(block_identifier)
+        else:
+            block = block_identifier
+        requests = []
+        for fn in calls:
+            target, data = encode_call(fn)
+            requests.append(("eth_call", [{"to": target, "data": "0x" + data.hex()}, block]))
+        out: List[CallResult] = []
+        for fn, reply in zip(calls, self.batch_transport.request(requests)):
+            if not reply.success:
+                out.append(CallResult(False, error=f"{fn.fn_name}: {reply.error}"))
+                continue
+            try:
+                out.append(CallResult(True, decode_result(fn, bytes.fromhex(str(reply.value)[2:]))))
+            except Exception as exc:
+                out.append(CallResult(False, error=f"{fn.fn_name}: cannot decode result ({exc})"))
+        return out
+
+    def multicall(
+        self,
+        calls: Sequence[Any],
+        block_identifier: Any = None,
+        batch_size: Optional[int] = None,
+        allow_failure: bool = True,
+    ) -> List[CallResult]:
+        """Execute bound contract calls (e.g. `c.functions.f(x)`) via Multicall3 `aggregate3`.
+
+        Calls are packed into chunks of `batch_size` (default: `multicall_batch_size`), so N
+        calls cost ceil(N / batch_size) round trips. With `allow_failure` a reverting call only
+        marks its own result as failed; otherwise any failure raises RuntimeError.
+
+        Without a Multicall3 address, or when a whole chunk fails (e.g. Multicall3 is not
+        deployed on a local chain), the affected calls are made one by one instead.
+        Results are returned in the order of `calls`.
+        """
+        size = max(1, int(batch_size or self.multicall_batch_size))
+        results: List[CallResult] = []
+        for start in range(0, len(calls), size):
+            chunk = calls[start : start + size]
+            chunk_results: Optional[List[CallResult]] = None
+            if self.multicall_address:
+                try:
+                    chunk_results = self._aggregate3(chunk, block_identifier, allow_failure)
+                except Exception:
+                    logger.debug(
+                        "aggregate3 of %d calls failed; falling back to sequential calls",
+                        len(chunk),
+                        exc_info=True,
+                    )
+            if chunk_results is None:
+                chunk_results = self._call_each(chunk, block_identifier)
+            if not allow_failure:
+                failed = next((r for r in chunk_results if not r.success), None)
+                if failed is not None:
+                    raise RuntimeError(f"Aggregated call failed: {failed.error}")
+            results.extend(chunk_results)
+        return results
+
+    def _get_multicall_contract(self) -> Any:
+        if self._multicall_contract is None:
+            self._multicall_contract = self.contract(self.multicall_address, self.multicall_abi)  # type: ignore[arg-type]
+        return self._multicall_contract
+
+    def _aggregate3(self, calls: Sequence[Any], block_identifier: Any, allow_failure: bool) -> List[CallResult]:
+        payload = []
+        for fn in calls:
+            target, data = encode_call(fn)
+            payload.append((target, allow_failure, data))
+        raw = self._get_multicall_contract().functions.aggregate3(payload).call(
+            block_identifier=block_identifier
+        )
+        if len(raw) != len(calls):
+            raise RuntimeError(f"aggregate3 returned {len(raw)} results for {len(calls)} calls")
+        out: List[CallResult] = []
+        for fn, (success, data) in zip(calls, raw):
+            if not success:
+                out.append(CallResult(False, error=f"{fn.fn_name} reverted"))
+                continue
+            try:
+                out.append(CallResult(True, decode_result(fn, data)))
+            except Exception as exc:
+                out.append(CallResult(False, error=f"{fn.fn_name}: cannot decode result ({exc})"))
+        return out
+
+    @staticmethod
+    def _call_each(calls: Sequence[Any], block_identifier: Any) -> List[CallResult]:
+        out: List[CallResult] = []
+        for fn in calls:
+            try:
+                out.append(CallResult(True, fn.call(block_identifier=block_identifier)))
+            except Exception as exc:
+                out.append(CallResult(False, error=f"{getattr(fn, 'fn_name', fn)}: {exc}"))
+        return out
 
     def resolve_staking_router(self, locator_address: str, locator_abi: str) -> str:
         """Resolve the StakingRouter address via the Lido Locator contract.
@@ -33,13 +182,17 @@ class EthAdapter:
                 " exposes a `stakingRouter()` view or update EthAdapter.resolve_staking_router()."
             ) from exc
 
-    def list_modules(self, router_address: str, router_abi: str) -> List[Dict[str, Any]]:
+    def list_modules(
+        self, router_address: str, router_abi: str, block_identifier: Any = None
+    ) -> List[Dict[str, Any]]:
         """Return staking modules with best-effort enrichment.
 
         Tries in order:
         1) getAllStakingModuleDigests() + per-id flag/counter getters
         2) Enumerate ids (getStakingModuleIds/getStakingModulesCount) + per-id getters
         3) Fallback to getStakingModules() returning only addresses
+
+        All reads are made at `block_identifier` (default: latest).
         """
         router = self.contract(router_address, router_abi)
 
@@ -48,100 +201,166 @@ class EthAdapter:
         #    digest with status flags and counters via per-id getters to provide a complete
         #    module snapshot expected by the service/tests.
         try:
-            digests = router.functions.getAllStakingModuleDigests().call()
-            modules: List[Dict[str, Any]] = []
-            for d in digests or []:
-                # Each digest has fields: nodeOperatorsCount, activeNodeOperatorsCount, state, summary
-                state = None
-                if isinstance(d, (list, tuple)) and len(d) >= 3:
-                    state = d[2]
-                elif isinstance(d, dict):
-                    state = d.get("state")
-                if not state:
-                    continue
-                # State is a struct; try to access by index and by key
-                def _get(s, key, idx):
-                    if isinstance(s, dict):
-                        return s.get(key)
-                    if isinstance(s, (list, tuple)) and len(s) > idx:
-                        return s[idx]
-                    return None
-
-                mid = _get(state, "id", 0)
-                maddr = _get(state, "stakingModuleAddress", 1)
-                fee = _get(state, "stakingModuleFee", 2)
-                treasury_fee = _get(state, "treasuryFee", 3)
-                share_limit = _get(state, "stakeShareLimit", 4)
-                status = _get(state, "status", 5)
-                name = _get(state, "name", 6)
-                last_deposit_at = _get(state, "lastDepositAt", 7)
-                last_deposit_block = _get(state, "lastDepositBlock", 8)
-                exited_count = _get(state, "exitedValidatorsCount", 9)
-                priority_exit_threshold = _get(state, "priorityExitShareThreshold", 10)
-                max_per_block = _get(state, "maxDepositsPerBlock", 11)
-                min_block_distance = _get(state, "minDepositBlockDistance", 12)
-
-                if isinstance(maddr, str) and maddr.startswith("0x"):
-                    mid_int = int(mid) if mid is not None else None
-
-                    # Enrich with flags/counters not present directly in digest
-                    is_active: Optional[bool] = None
-                    is_deposits_paused: Optional[bool] = None
-                    is_stopped: Optional[bool] = None
-                    active_validators: Optional[int] = None
-                    depositable_validators: Optional[int] = None
-                    if mid_int is not None:
-                        try:
-                            is_active = bool(router.functions.getStakingModuleIsActive(mid_int).call())
-                        except Exception:
-                            logger.debug("getStakingModuleIsActive(%s) failed", mid_int, exc_info=True)
-                        try:
-                            is_deposits_paused = bool(
-                                router.functions.getStakingModuleIsDepositsPaused(mid_int).call()
-                            )
-                        except Exception:
-                            logger.debug(
-                                "getStakingModuleIsDepositsPaused(%s) failed", mid_int, exc_info=True
-                            )
-                        try:
-                            is_stopped = bool(router.functions.getStakingModuleIsStopped(mid_int).call())
-                        except Exception:
-                            logger.debug("getStakingModuleIsStopped(%s) failed", mid_int, exc_info=True)
-                        try:
-                            active_validators = int(
-                                router.functions.getStakingModuleActiveValidatorsCount(mid_int).call()
-                            )
-                        except Exception:
-                            logger.debug(
-                                "getStakingModuleActiveValidatorsCount(%s) failed", mid_int, exc_info=True
-                            )
-                        try:
-                            summary = router.functions.getStakingModuleSummary(mid_int).call()
-                            if isinstance(summary, (list, tuple)) and len(summary) >= 3:
-                                depositable_validators = int(summary[2])
-                            elif isinstance(summary, dict):
-                                dv = summary.get("depositableValidatorsCount")
-                                depositable_validators = int(dv) if dv is not None else None
-                        except Exception:
-                            logger.debug("getStakingModuleSummary(%s) failed", mid_int, exc_info=True)
-
-                    modules.append(
-                        {
-                            "id": mid_int,
-                            "address": self.web3.to_checksum_address(maddr),
-                            "name": name if isinstance(name, str) else None,
-                            "target_share_bps": int(share_limit) if share_limit is not None else None,
-                            "last_deposit_block": int(last_deposit_block) if last_deposit_block is not None else None,
-                            "max_deposits_per_block": int(max_per_block) if max_per_block is not None else None,
-                            "min_deposit_block_distance": int(min_block_distance) if min_block_distance is not None else None,
-                            "is_active": is_active,
-                            "is_deposits_paused": is_deposits_paused,
-                            "is_stopped": is_stopped,
-                            "active_validators": active_validators,
-                            "depositable_validators": depositable_validators,
-                        }
-                    )
+            digests = router.functions.getAllStakingModuleDigests().call(block_identifier=block_identifier)
+            modules = parse_module_digests(digests, self.web3.to_checksum_address)
             if modules:
+                self._enrich_modules(router, modules, block_identifier)
                 return modules
         except Exception:
             logger.debug("getAllStakingModuleDigests() unavailable or failed; falling back", exc_info=True)
+
+    def _enrich_modules(self, router: Any, modules: List[Dict[str, Any]], block_identifier: Any = None) -> None:
+        """Fill status flags and counters of `modules` in place with one aggregated read.
+
+        A getter that fails for a module leaves the corresponding field as None.
+        """
+        calls = module_getter_calls(router, modules)
+        apply_module_getters(modules, self.call_many(calls, block_identifier))
+
+
+# Per-id getters used to enrich module digests: (result key, router function, converter)
+_MODULE_GETTERS = (
+    ("is_active", "getStakingModuleIsActive", bool),
+    ("is_deposits_paused", "getStakingModuleIsDepositsPaused", bool),
+    ("is_stopped", "getStakingModuleIsStopped", bool),
+    ("active_validators", "getStakingModuleActiveValidatorsCount", int),
+    ("depositable_validators", "getStakingModuleSummary", None),
+)
+
+
+def parse_module_digests(digests: Any, to_checksum_address: Callable[[str], str]) -> List[Dict[str, Any]]:
+    """Turn `getAllStakingModuleDigests()` output into module dicts (flags/counters unset)."""
+    modules: List[Dict[str, Any]] = []
+    for d in digests or []:
+        # Each digest has fields: nodeOperatorsCount, activeNodeOperatorsCount, state, summary
+        state = None
+        if isinstance(d, (list, tuple)) and len(d) >= 3:
+            state = d[2]
+        elif isinstance(d, dict):
+            state = d.get("state")
+        if not state:
+            continue
+        # State is a struct; try to access by index and by key
+        def _get(s, key, idx):
+            if isinstance(s, dict):
+                return s.get(key)
+            if isinstance(s, (list, tuple)) and len(s) > idx:
+                return s[idx]
+            return None
+
+        mid = _get(state, "id", 0)
+        maddr = _get(state, "stakingModuleAddress", 1)
+        fee = _get(state, "stakingModuleFee", 2)
+        treasury_fee = _get(state, "treasuryFee", 3)
+        share_limit = _get(state, "stakeShareLimit", 4)
+        status = _get(state, "status", 5)
+        name = _get(state, "name", 6)
+        last_deposit_at = _get(state, "lastDepositAt", 7)
+        last_deposit_block = _get(state, "lastDepositBlock", 8)
+        exited_count = _get(state, "exitedValidatorsCount", 9)
+        priority_exit_threshold = _get(state, "priorityExitShareThreshold", 10)
+        max_per_block = _get(state, "maxDepositsPerBlock", 11)
+        min_block_distance = _get(state, "minDepositBlockDistance", 12)
+
+        if isinstance(maddr, str) and maddr.startswith("0x"):
+            mid_int = int(mid) if mid is not None else None
+            modules.append(
+                {
+                    "id": mid_int,
+                    "address": to_checksum_address(maddr),
+                    "name": name if isinstance(name, str) else None,
+                    "target_share_bps": int(share_limit) if share_limit is not None else None,
+                    "last_deposit_block": int(last_deposit_block) if last_deposit_block is not None else None,
+                    "max_deposits_per_block": int(max_per_block) if max_per_block is not None else None,
+                    "min_deposit_block_distance": int(min_block_distance) if min_block_distance is not None else None,
+                    # Flags/counters not present directly in digest; filled in by the getters
+                    "is_active": None,
+                    "is_deposits_paused": None,
+                    "is_stopped": None,
+                    "active_validators": None,
+                    "depositable_validators": None,
+                }
+            )
+    return modules
+
+
+def module_getter_calls(router: Any, modules: List[Dict[str, Any]]) -> List[Any]:
+    """Bound per-id getter calls for `modules`, in the order `apply_module_getters` expects."""
+    return [
+        getattr(router.functions, fn_name)(m["id"])
+        for m in modules
+        if m["id"] is not None
+        for _, fn_name, _ in _MODULE_GETTERS
+    ]
+
+
+def apply_module_getters(modules: List[Dict[str, Any]], results: List[CallResult]) -> None:
+    """Fill module flags/counters in place from `module_getter_calls` results."""
+    targets = [m for m in modules if m["id"] is not None]
+    per_module = len(_MODULE_GETTERS)
+    for pos, m in enumerate(targets):
+        chunk = results[pos * per_module : (pos + 1) * per_module]
+        for (key, fn_name, conv), res in zip(_MODULE_GETTERS, chunk):
+            if not res.success:
+                logger.debug("%s(%s) failed: %s", fn_name, m["id"], res.error)
+                continue
+            if conv is not None:
+                m[key] = conv(res.value)
+            else:
+                m[key] = _depositable_from_summary(res.value)
+
+
+def _depositable_from_summary(summary: Any) -> Optional[int]:
+    if isinstance(summary, (list, tuple)) and len(summary) >= 3:
+        return int(summary[2])
+    if isinstance(summary, dict):
+        dv = summary.get("depositableValidatorsCount")
+        return int(dv) if dv is not None else None
+    return None
+
+
+def make_eth_adapter(cfg: "Config") -> EthAdapter:
+    """Build an `EthAdapter` over a real `Web3.HTTPProvider` configured from `cfg`."""
+    # Lazy import to avoid hard dependency during tests that stub the adapter
+    from web3 import Web3  # type: ignore
+
+    from app.eth.provider_pool import PooledHTTPProvider, shared_endpoint_pool
+    from app.eth.rate_control import ThrottledProvider, shared_controller
+
+    request_kwargs = {"timeout": cfg.eth_rpc_timeout}
+    pool = shared_endpoint_pool(cfg)
+    # web3's own HTTP retries are off: a 429 must reach the rate controller, and a pool fails
+    # over to the next endpoint instead of retrying a failing one
+    if pool is None:
+        provider = ThrottledProvider(
+            Web3.HTTPProvider(cfg.eth_rpc_url, request_kwargs=request_kwargs, exception_retry_configuration=None),
+            shared_controller(cfg, cfg.eth_rpc_url),
+        )
+    else:
+        provider = PooledHTTPProvider(
+            pool,
+            [
+                ThrottledProvider(
+                    Web3.HTTPProvider(url, request_kwargs=request_kwargs, exception_retry_configuration=None),
+                    shared_controller(cfg, url),
+                )
+                for url in cfg.eth_rpc_urls
+            ],
+        )
+    web3 = instrument_web3(Web3(provider))
+    batch_transport = None
+    if cfg.eth_rpc_batch:
+        batch_transport = RpcBatchTransport(
+            cfg.eth_rpc_url,
+            timeout=cfg.eth_rpc_timeout,
+            max_batch_size=cfg.eth_rpc_batch_size,
+            controller=shared_controller(cfg, cfg.eth_rpc_url) if pool is None else None,
+            pool_provider=provider if pool is not None else None,
+        )
+    return EthAdapter(
+        web3,
+        multicall_address=cfg.multicall_address,
+        multicall_abi=cfg.multicall_abi,
+        multicall_batch_size=cfg.multicall_batch_size,
+        batch_transport=batch_transport,
+    )
@@ -0,0 +1,244 @@
+from __future__ import annotations
+
+import asyncio
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple
+import logging
+
+from app.eth.abi_loader import load_abi_file
+from app.eth.codec import FastContract, hot_codecs
+from app.eth.adapter import apply_module_getters, module_getter_calls, parse_module_digests
+from app.eth.multicall import CallResult, decode_result, encode_call
+from app.metrics import instrument_web3, observe_contract_calls, register_functions
+
+if TYPE_CHECKING:  # pragma: no cover
+    from app.config import Config
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class AsyncEthAdapter:
+    """asyncio counterpart of `EthAdapter` over an `AsyncWeb3` instance.
+
+    Independent calls (multicall chunks, sequential fallbacks) run concurrently, with at most
+    `max_concurrency` requests in flight. For an `AsyncHTTPProvider`, requests share one
+    keep-alive aiohttp session per event loop with a pool of `max_concurrency` connections.
+    """
+
+    web3: Any
+    multicall_address: Optional[str] = None
+    multicall_abi: str = "multicall3.json"
+    multicall_batch_size: int = 500
+    max_concurrency: int = 8
+    # Seconds an idle pooled connection is kept open
+    keepalive_timeout: float = 30
+    _multicall_contract: Any = field(default=None, init=False, repr=False)
+    _contracts: Dict[Tuple[str, str], Any] = field(default_factory=dict, init=False, repr=False)
+    _semaphore: Optional[asyncio.Semaphore] = field(default=None, init=False, repr=False)
+    _session: Any = field(default=None, init=False, repr=False)
+    _loop: Any = field(default=None, init=False, repr=False)
+
+    def contract(self, address: str, abi_filename: str) -> Any:
+        """Contract at `address`, built once per (address, ABI file); see `FastContract`."""
+        key = (address.lower(), abi_filename)
+        contract = self._contracts.get(key)
+        if contract is None:
+            abi = load_abi_file(abi_filename)
+            register_functions(abi)
+            contract = FastContract(
+                self.web3.eth.contract(address=self.web3.to_checksum_address(address), abi=abi),
+                hot_codecs(abi_filename), is_async=True,
+            )
+            self._contracts[key] = contract
+        return contract
+
+    @asynccontextmanager
+    async def _slot(self) -> AsyncIterator[None]:
+        """Hold one of `max_concurrency` request slots of the current event loop."""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Semaphores and aiohttp sessions are bound to the loop they were first used on
+            self._loop = loop
+            self._semaphore = asyncio.Semaphore(max(1, self.max_concurrency))
+            self._session = None
+            await self._attach_session()
+        async with self._semaphore:  # type: ignore[union-attr]
+            yield
+
+    async def _attach_session(self) -> None:
+        provider = self.web3.provider
+        if not hasattr(provider, "cache_async_session"):
+            return
+        import aiohttp  # type: ignore
+
+        # web3's default session closes every connection after use; pool them instead
+        session = aiohttp.ClientSession(
+            raise_for_status=True,
+            connector=aiohttp.TCPConnector(
+                limit=max(1, self.max_concurrency), keepalive_timeout=self.keepalive_timeout
+            ),
+        )
+        self._session = await provider.cache_async_session(session)
+
+    async def close(self) -> None:
+        """Close the pooled HTTP session (if any)."""
+        session, self._session, self._loop = self._session, None, None
+        if session is not None and not session.closed:
+            await session.close()
+
+    async def block_number(self) -> int:
+        async with self._slot():
+            return int(await self.web3.eth.block_number)
+
+    async def get_block(self, block_identifier: Any) -> Any:
+        """Return the block header (includes `hash` and `parentHash`)."""
+        async with self._slot():
+            return await self.web3.eth.get_block(block_identifier)
+
+    async def get_logs(self, filter_params: Dict[str, Any]) -> List[Any]:
+        async with self._slot():
+            return list(await self.web3.eth.get_logs(filter_params))
+
+    async def call(self, fn: Any, block_identifier: Any = None) -> Any:
+        """Execute one bound contract call (e.g. `c.functions.f(x)`)."""
+        async with self._slot():
+            return await fn.call(block_identifier=block_identifier)
+
+    async def call_many(self, calls: Sequence[Any], block_identifier: Any = None) -> List[CallResult]:
+        """Execute many bound contract calls via Multicall3; see `multicall()`."""
+        results = await self.multicall(calls, block_identifier)
+        observe_contract_calls(calls, results)
+        return results
+
+    async def multicall(
+        self,
+        calls: Sequence[Any],
+        block_identifier: Any = None,
+        batch_size: Optional[int] = None,
+        allow_failure: bool = True,
+    ) -> List[CallResult]:
+        """Execute bound contract calls via Multicall3 `aggregate3`, chunks concurrently.
+
+        Same contract as `EthAdapter.multicall`: chunks of `batch_size` calls, per-call
+        failures (or RuntimeError without `allow_failure`), and a call-by-call fallback when
+        no Multicall3 address is set or a chunk fails. Results are returned in call order.
+        """
+        size = max(1, int(batch_size or self.multicall_batch_size))
+        chunks = [calls[start : start + size] for start in range(0, len(calls), size)]
+        per_chunk = await asyncio.gather(*(self._run_chunk(chunk, block_identifier, allow_failure) for chunk in chunks))
+        results: List[CallResult] = []
+        for chunk_results in per_chunk:
+            if not allow_failure:
+                failed = next((r for r in chunk_results if not r.success), None)
+                if failed is not None:
+                    raise RuntimeError(f"Aggregated call failed: {failed.error}")
+            results.extend(chunk_results)
+        return results
+
+    async def _run_chunk(self, chunk: Sequence[Any], block_identifier: Any, allow_failure: bool) -> List[CallResult]:
+        if self.multicall_address:
+            try:
+                return await self._aggregate3(chunk, block_identifier, allow_failure)
+            except Exception:
+                logger.debug(
+                    "aggregate3 of %d calls failed; falling back to sequential calls", len(chunk), exc_info=True
+                )
+        return await self._call_each(chunk, block_identifier)
+
+    async def _aggregate3(self, calls: Sequence[Any], block_identifier: Any, allow_failure: bool) -> List[CallResult]:
+        if self._multicall_contract is None:
+            self._multicall_contract = self.contract(self.multicall_address, self.multicall_abi)  # type: ignore[arg-type]
+        payload = []
+        for fn in calls:
+            target, data = encode_call(fn)
+            payload.append((target, allow_failure, data))
+        raw = await self.call(self._multicall_contract.functions.aggregate3(payload), block_identifier)
+        if len(raw) != len(calls):
+            raise RuntimeError(f"aggregate3 returned {len(raw)} results for {len(calls)} calls")
+        out: List[CallResult] = []
+        for fn, (success, data) in zip(calls, raw):
+            if not success:
+                out.append(CallResult(False, error=f"{fn.fn_name} reverted"))
+                continue
+            try:
+                out.append(CallResult(True, decode_result(fn, data)))
+            except Exception as exc:
+                out.append(CallResult(False, error=f"{fn.fn_name}: cannot decode result ({exc})"))
+        return out
+
+    async def _call_each(self, calls: Sequence[Any], block_identifier: Any) -> List[CallResult]:
+        values = await asyncio.gather(*(self.call(fn, block_identifier) for fn in calls), return_exceptions=True)
+        out: List[CallResult] = []
+        for fn, value in zip(calls, values):
+            if isinstance(value, Exception):
+                out.append(CallResult(False, error=f"{getattr(fn, 'fn_name', fn)}: {value}"))
+            else:
+                out.append(CallResult(True, value))
+        return out
+
+    async def resolve_staking_router(self, locator_address: str, locator_abi: str) -> str:
+        """Resolve the StakingRouter address via the Lido Locator contract."""
+        locator = self.contract(locator_address, locator_abi)
+        try:
+            return await self.call(locator.functions.stakingRouter())
+        except Exception as exc:  # pragma: no cover - depends on real ABI
+            raise RuntimeError(
+                "Failed to resolve staking router via locator. Ensure the locator ABI"
+                " exposes a `stakingRouter()` view or update EthAdapter.resolve_staking_router()."
+            ) from exc
+
+    async def list_modules(
+        self, router_address: str, router_abi: str, block_identifier: Any = None
+    ) -> List[Dict[str, Any]]:
+        """Return staking modules from digests enriched by per-id getters (see `EthAdapter`)."""
+        router = self.contract(router_address, router_abi)
+        try:
+            digests = await self.call(router.functions.getAllStakingModuleDigests(), block_identifier)
+            modules = parse_module_digests(digests, self.web3.to_checksum_address)
+            if modules:
+                calls = module_getter_calls(router, modules)
+                apply_module_getters(modules, await self.call_many(calls, block_identifier))
+                return modules
+        except Exception:
+            logger.debug("getAllStakingModuleDigests() unavailable or failed; falling back", exc_info=True)
+        return []
+
+
+def make_async_eth_adapter(cfg: "Config") -> AsyncEthAdapter:
+    """Build an `AsyncEthAdapter` over a real `AsyncHTTPProvider` configured from `cfg`."""
+    # Lazy import to avoid hard dependency during tests that stub the adapter
+    import aiohttp  # type: ignore
+    from web3 import AsyncHTTPProvider, AsyncWeb3  # type: ignore
+
+    from app.eth.provider_pool import AsyncPooledHTTPProvider, shared_endpoint_pool
+    from app.eth.rate_control import AsyncThrottledProvider, shared_controller
+
+    request_kwargs = {"timeout": aiohttp.ClientTimeout(total=cfg.eth_rpc_timeout)}
+    pool = shared_endpoint_pool(cfg)
+    # No web3 HTTP retries (see `make_eth_adapter`)
+    if pool is None:
+        provider = AsyncThrottledProvider(
+            AsyncHTTPProvider(cfg.eth_rpc_url, request_kwargs=request_kwargs, exception_retry_configuration=None),
+            shared_controller(cfg, cfg.eth_rpc_url),
+        )
+    else:
+        provider = AsyncPooledHTTPProvider(
+            pool,
+            [
+                AsyncThrottledProvider(
+                    AsyncHTTPProvider(url, request_kwargs=request_kwargs, exception_retry_configuration=None),
+                    shared_controller(cfg, url),
+                )
+                for url in cfg.eth_rpc_urls
+            ],
+        )
+    return AsyncEthAdapter(
+        instrument_web3(AsyncWeb3(provider)),
+        multicall_address=cfg.multicall_address,
+        multicall_abi=cfg.multicall_abi,
+        multicall_batch_size=cfg.multicall_batch_size,
+        max_concurrency=cfg.eth_max_concurrency,
+    )
@@ -0,0 +1,240 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from functools import lru_cache
+import re
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from app.eth.abi_loader import load_abi_file
+
+
+# View functions read per node operator / queue item / module; bound calls of these skip
+# web3's generic ABI machinery when all their inputs and outputs are static types
+HOT_FUNCTIONS = frozenset(
+    {
+        "depositQueueItem",
+        "getNodeOperator",
+        "getNodeOperatorIsActive",
+        "getNodeOperatorSummary",
+        "getStakingModuleIsActive",
+        "getStakingModuleIsDepositsPaused",
+        "getStakingModuleIsStopped",
+        "getStakingModuleActiveValidatorsCount",
+        "getStakingModuleSummary",
+    }
+)
+
+_WORD = 32
+_INT = re.compile(r"^(u?)int(\d*)$")
+_BYTES = re.compile(r"^bytes(\d+)$")
+
+
+@lru_cache(maxsize=4096)
+def _checksum_address(raw: bytes) -> str:
+    # Hashing dominates address decoding; the same few addresses come back again and again
+    from eth_utils import to_checksum_address  # type: ignore
+
+    return to_checksum_address(raw)
+
+
+def _int_codec(signed: bool, bits: int) -> Tuple[Callable[[Any], bytes], Callable[[bytes], Any]]:
+    low, high = (-(1 << (bits - 1)), 1 << (bits - 1)) if signed else (0, 1 << bits)
+
+    def encode(value: Any) -> bytes:
+        if isinstance(value, bool) or not isinstance(value, int) or not low <= value < high:
+            raise ValueError(f"{value!r} is not a valid {'' if signed else 'u'}int{bits}")
+        return value.to_bytes(_WORD, "big", signed=signed)
+
+    def decode(word: bytes) -> int:
+        return int.from_bytes(word, "big", signed=signed)
+
+    return encode, decode
+
+
+def _word_codec(abi_type: str) -> Optional[Tuple[Callable[[Any], bytes], Callable[[bytes], Any]]]:
+    """(encode, decode) of a type taking one 32-byte word, or None if it is not one."""
+    m = _INT.match(abi_type)
+    if m:
+        return _int_codec(m.group(1) == "", int(m.group(2) or 256))
+    if abi_type == "bool":
+        return (lambda value: bytes(31) + (b"\x01" if value else b"\x00")), (lambda word: word[-1] != 0)
+    if abi_type == "address":
+        def encode_address(value: Any) -> bytes:
+            raw = bytes.fromhex(value[2:] if value.startswith("0x") else value)
+            if len(raw) != 20:
+                raise ValueError(f"{value!r} is not a valid address")
+            return bytes(12) + raw
+
+        return encode_address, lambda word: _checksum_address(word[12:])
+    m = _BYTES.match(abi_type)
+    if m and 1 <= int(m.group(1)) <= 32:
+        size = int(m.group(1))
+        return (lambda value: bytes(value).ljust(_WORD, b"\x00")), lambda word: bytes(word[:size])
+    return None
+
+
+def _layout(params: Sequence[Dict[str, Any]]) -> Optional[List[Any]]:
+    """Decoders for a static parameter list: a word decoder or a nested list per tuple.
+
+    None when any parameter is dynamic (strings, bytes, arrays) and so not fixed-layout.
+    """
+    out: List[Any] = []
+    for param in params:
+        if param["type"] == "tuple":
+            nested = _layout(param.get("components") or [])
+            if nested is None:
+                return None
+            out.append(nested)
+            continue
+        codec = _word_codec(param["type"])
+        if codec is None:
+            return None
+        out.append(codec[1])
+    return out
+
+
+def _decode_words(layout: List[Any], data: bytes, offset: int) -> Tuple[Tuple[Any, ...], int]:
+    values = []
+    for item in layout:
+        if isinstance(item, list):
+            value, offset = _decode_words(item, data, offset)
+        else:
+            value, offset = item(data[offset : offset + _WORD]), offset + _WORD
+        values.append(value)
+    return tuple(values), offset
+
+
+@dataclass(frozen=True)
+class FunctionCodec:
+    """Precompiled calldata encoder and return decoder of one static-typed ABI function."""
+
+    name: str
+    selector: bytes
+    encoders: Tuple[Callable[[Any], bytes], ...]
+    outputs: List[Any]
+    size: int
+
+    @classmethod
+    def compile(cls, entry: Dict[str, Any]) -> Optional["FunctionCodec"]:
+        """Codec of the function ABI `entry`, or None when it has dynamic inputs or outputs."""
+        from eth_utils import function_abi_to_4byte_selector  # type: ignore
+
+        encoders = []
+        for param in entry.get("inputs") or []:
+            codec = _word_codec(param["type"])
+            if codec is None:
+                return None
+            encoders.append(codec[0])
+        outputs = _layout(entry.get("outputs") or [])
+        if outputs is None:
+            return None
+
+        def words(layout: List[Any]) -> int:
+            return sum(words(item) if isinstance(item, list) else 1 for item in layout)
+
+        return cls(
+            name=entry["name"],
+            selector=bytes(function_abi_to_4byte_selector(entry)),
+            encoders=tuple(encoders),
+            outputs=outputs,
+            size=words(outputs) * _WORD,
+        )
+
+    def encode(self, args: Sequence[Any]) -> bytes:
+        if len(args) != len(self.encoders):
+            raise TypeError(f"{self.name}() takes {len(self.encoders)} arguments, {len(args)} given")
+        return self.selector + b"".join(enc(arg) for enc, arg in zip(self.encoders, args))
+
+    def decode(self, data: bytes) -> Any:
+        """Decode return data like `ContractFunction.call()`: one output unwrapped, several as a list."""
+        if len(data) < self.size:
+            raise ValueError(f"{self.name}: expected {self.size} bytes of return data, got {len(data)}")
+        values, _ = _decode_words(self.outputs, bytes(data), 0)
+        return values[0] if len(values) == 1 else list(values)
+
+
+def compile_hot_functions(abi: Sequence[Dict[str, Any]]) -> Dict[str, FunctionCodec]:
+    """Codecs of the HOT_FUNCTIONS in `abi`; overloaded or dynamic-typed ones are left out."""
+    entries: Dict[str, List[Dict[str, Any]]] = {}
+    for entry in abi:
+        if entry.get("type") == "function" and entry.get("name") in HOT_FUNCTIONS:
+            entries.setdefault(entry["name"], []).append(entry)
+    out: Dict[str, FunctionCodec] = {}
+    for name, overloads in entries.items():
+        codec = FunctionCodec.compile(overloads[0]) if len(overloads) == 1 else None
+        if codec is not None:
+            out[name] = codec
+    return out
+
+
+@lru_cache(maxsize=None)
+def hot_codecs(abi_filename: str) -> Dict[str, FunctionCodec]:
+    """`compile_hot_functions` of `abi/<abi_filename>`, compiled once per file."""
+    return compile_hot_functions(load_abi_file(abi_filename))
+
+
+@dataclass(frozen=True)
+class PreparedCall:
+    """A bound view call with its calldata already encoded; quacks like a `ContractFunction`.
+
+    `encode_call` / `decode_result` use the calldata and codec directly; `call()` makes a
+    plain eth_call.
+    """
+
+    web3: Any
+    address: str
+    codec: FunctionCodec
+    data: bytes
+
+    @property
+    def fn_name(self) -> str:
+        return self.codec.name
+
+    def call(self, block_identifier: Any = None) -> Any:
+        return self.codec.decode(self.web3.eth.call({"to": self.address, "data": self.data}, block_identifier))
+
+
+class AsyncPreparedCall(PreparedCall):
+    """`PreparedCall` over an `AsyncWeb3`; `call()` is a coroutine."""
+
+    async def call(self, block_identifier: Any = None) -> Any:  # type: ignore[override]
+        raw = await self.web3.eth.call({"to": self.address, "data": self.data}, block_identifier)
+        return self.codec.decode(raw)
+
+
+class _Functions:
+    """`contract.functions` with precompiled factories for the hot functions."""
+
+    def __init__(self, contract: "FastContract") -> None:
+        self._contract = contract
+
+    def __getattr__(self, name: str) -> Any:
+        c = self._contract
+        codec = c.codecs.get(name)
+        if codec is None:
+            return getattr(c.contract.functions, name)
+        call_cls = AsyncPreparedCall if c.is_async else PreparedCall
+        web3, address = c.contract.w3, c.contract.address
+
+        def prepare(*args: Any) -> PreparedCall:
+            return call_cls(web3, address, codec, codec.encode(args))
+
+        # Later lookups skip __getattr__
+        setattr(self, name, prepare)
+        return prepare
+
+
+class FastContract:
+    """web3 contract wrapper whose hot view functions (`HOT_FUNCTIONS`) return `PreparedCall`s.
+
+    Everything else (other functions, events, `address`, `abi`) is the wrapped contract's.
+    """
+
+    def __init__(self, contract: Any, codecs: Dict[str, FunctionCodec], is_async: bool = False) -> None:
+        self.contract = contract
+        self.codecs = codecs
+        self.is_async = is_async
+        self.functions = _Functions(self)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.contract, name)
@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, Optional, Tuple
+
+from app.eth.codec import PreparedCall
+
+
+@dataclass
+class CallResult:
+    """Outcome of a single aggregated view call.
+
+    `value` holds the decoded return value (same shape as `ContractFunction.call()`),
+    `error` a short description when the call reverted or could not be decoded.
+    """
+
+    success: bool
+    value: Any = None
+    error: Optional[str] = None
+
+
+def encode_call(fn: Any) -> Tuple[str, bytes]:
+    """Return (target address, calldata) for a bound web3 `ContractFunction` or `PreparedCall`."""
+    if isinstance(fn, PreparedCall):
+        return fn.address, fn.data
+    from hexbytes import HexBytes  # type: ignore
+
+    return fn.address, bytes(HexBytes(fn._encode_transaction_data()))
+
+
+def decode_result(fn: Any, data: bytes) -> Any:
+    """Decode raw return data of `fn` the way `ContractFunction.call()` does.
+
+    Single outputs are unwrapped; multiple outputs are returned as a list.
+    Raises on empty or malformed data (e.g. a call to an address without code).
+    """
+    if isinstance(fn, PreparedCall):
+        return fn.codec.decode(data)
+    from eth_utils.abi import get_abi_output_types  # type: ignore
+    from web3._utils.abi import map_abi_data  # type: ignore
+    from web3._utils.normalizers import BASE_RETURN_NORMALIZERS  # type: ignore
+
+    output_types = get_abi_output_types(fn.abi)
+    decoded = fn.w3.codec.decode(output_types, data)
+    normalized = map_abi_data(BASE_RETURN_NORMALIZERS, output_types, decoded)
+    if len(normalized) == 1:
+        return normalized[0]
+    return list(normalized)
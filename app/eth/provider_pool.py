@@ -0,0 +1,385 @@
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+import logging
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Callable, Deque, Dict, List, Optional, Sequence, Tuple
+
+from web3.providers import AsyncBaseProvider, BaseProvider
+
+from app.eth.rpc_batch import is_permanent_error
+
+if TYPE_CHECKING:  # pragma: no cover
+    from app.config import Config
+
+
+logger = logging.getLogger(__name__)
+
+# Read-only methods: safe to send to several endpoints at once or to retry elsewhere
+HEDGEABLE_METHODS = frozenset(
+    {
+        "eth_call",
+        "eth_blockNumber",
+        "eth_chainId",
+        "eth_getBlockByNumber",
+        "eth_getBlockByHash",
+        "eth_getLogs",
+        "eth_getCode",
+        "eth_getBalance",
+        "eth_getStorageAt",
+        "net_version",
+    }
+)
+
+
+def usable_response(response: Any) -> bool:
+    """True for a result or a permanent error (revert, bad params); those are the same on any node."""
+    error = response.get("error") if isinstance(response, dict) else None
+    return error is None or (isinstance(error, dict) and is_permanent_error(error))
+
+
+@dataclass
+class EndpointHealth:
+    """Latency and error history of one RPC endpoint, plus its circuit breaker state."""
+
+    url: str
+    window: int = 200
+    samples: Deque[float] = field(default_factory=deque, repr=False)
+    latency_ewma: Optional[float] = None
+    error_ewma: float = 0.0
+    requests: int = 0
+    errors: int = 0
+    # Duplicates of slow requests sent to this endpoint
+    hedges: int = 0
+    consecutive_failures: int = 0
+    # Clock reading until which the circuit is open (no traffic unless nothing else is left)
+    open_until: Optional[float] = None
+
+    def score(self) -> float:
+        # Expected seconds per request, with each recent error costing a second; endpoints
+        # without samples yet score 0, so each one gets tried
+        return (self.latency_ewma or 0.0) + self.error_ewma
+
+    def percentile(self, q: float) -> Optional[float]:
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class EndpointPool:
+    """Health-ranked set of RPC endpoints shared by the pooled providers.
+
+    Requests go to the endpoint with the lowest latency EWMA, penalized by its recent error rate.
+    After `breaker_failures` consecutive failures an endpoint's circuit opens for
+    `breaker_cooldown` seconds; then a single probe request is let through, which closes the
+    circuit again on success. `hedge_delay()` is the `hedge_percentile` of an endpoint's recent
+    latencies (`initial_hedge_delay` until it has `min_samples` of them).
+    """
+
+    def __init__(
+        self,
+        urls: Sequence[str],
+        hedge_percentile: float = 0.95,
+        initial_hedge_delay: float = 1.0,
+        min_hedge_delay: float = 0.02,
+        min_samples: int = 20,
+        breaker_failures: int = 5,
+        breaker_cooldown: float = 30.0,
+        alpha: float = 0.2,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if not urls:
+            raise ValueError("EndpointPool needs at least one RPC URL")
+        self.endpoints = [EndpointHealth(url) for url in urls]
+        self.hedge_percentile = hedge_percentile
+        self.initial_hedge_delay = initial_hedge_delay
+        self.min_hedge_delay = min_hedge_delay
+        self.min_samples = min_samples
+        self.breaker_failures = max(1, breaker_failures)
+        self.breaker_cooldown = breaker_cooldown
+        self.alpha = alpha
+        self.clock = clock
+        self._lock = threading.Lock()
+
+    def order(self) -> List[int]:
+        """Endpoint indices to try, best first; endpoints with an open circuit come last."""
+        now = self.clock()
+        with self._lock:
+            closed, probes, open_ = [], [], []
+            for i, e in enumerate(self.endpoints):
+                if e.open_until is None:
+                    closed.append(i)
+                elif e.open_until <= now:
+                    # Half-open: one probe, then wait another cooldown unless it succeeds
+                    e.open_until = now + self.breaker_cooldown
+                    probes.append(i)
+                else:
+                    open_.append(i)
+            closed.sort(key=lambda i: self.endpoints[i].score())
+            open_.sort(key=lambda i: self.endpoints[i].open_until or 0.0)
+            return probes + closed + open_
+
+    def hedge_delay(self, index: int) -> Optional[float]:
+        """Seconds to wait on endpoint `index` before hedging; None when hedging is off."""
+        if not self.hedge_percentile:
+            return None
+        e = self.endpoints[index]
+        with self._lock:
+            if len(e.samples) < self.min_samples:
+                return self.initial_hedge_delay
+            return max(self.min_hedge_delay, e.percentile(self.hedge_percentile) or 0.0)
+
+    def record(self, index: int, seconds: float, ok: Optional[bool]) -> None:
+        """Record a request to endpoint `index`; `ok=None` records latency only (cancelled hedge)."""
+        e = self.endpoints[index]
+        with self._lock:
+            e.samples.append(seconds)
+            if len(e.samples) > e.window:
+                e.samples.popleft()
+            ewma = e.latency_ewma
+            e.latency_ewma = seconds if ewma is None else ewma + self.alpha * (seconds - ewma)
+            if ok is None:
+                return
+            e.requests += 1
+            e.error_ewma += self.alpha * ((0.0 if ok else 1.0) - e.error_ewma)
+            if ok:
+                if e.open_until is not None:
+                    logger.info("RPC endpoint %s recovered; closing its circuit", e.url)
+                e.consecutive_failures = 0
+                e.open_until = None
+                return
+            e.errors += 1
+            e.consecutive_failures += 1
+            if e.consecutive_failures >= self.breaker_failures:
+                if e.open_until is None:
+                    logger.warning(
+                        "RPC endpoint %s failed %d times in a row; opening its circuit", e.url, e.consecutive_failures
+                    )
+                e.open_until = self.clock() + self.breaker_cooldown
+
+    def hedged(self, index: int) -> None:
+        with self._lock:
+            self.endpoints[index].hedges += 1
+
+    def stats(self) -> List[Dict[str, Any]]:
+        now = self.clock()
+        with self._lock:
+            return [
+                {
+                    "url": e.url,
+                    "state": "closed" if e.open_until is None else ("open" if e.open_until > now else "half-open"),
+                    "requests": e.requests,
+                    "errors": e.errors,
+                    "hedges": e.hedges,
+                    "latency_ewma_ms": _ms(e.latency_ewma),
+                    "latency_p50_ms": _ms(e.percentile(0.5)),
+                    "latency_p95_ms": _ms(e.percentile(0.95)),
+                    "error_rate": round(e.error_ewma, 3),
+                }
+                for e in self.endpoints
+            ]
+
+
+def _ms(seconds: Optional[float]) -> Optional[float]:
+    return round(seconds * 1000, 2) if seconds is not None else None
+
+
+class PooledHTTPProvider(BaseProvider):
+    """web3 provider spreading requests over the providers of an `EndpointPool`, one per URL.
+
+    A request goes to the best-ranked endpoint. Read-only requests (`HEDGEABLE_METHODS`) are
+    duplicated to the next endpoint when the first has not answered within its hedge delay
+    (at most `max_hedges` times), and retried on the next endpoint when one fails: a transport
+    error or a JSON-RPC error other than a revert. The first usable response wins; slower
+    duplicates finish in the background and only update the endpoint statistics.
+    """
+
+    def __init__(
+        self, pool: EndpointPool, providers: Sequence[Any], max_hedges: int = 1, max_workers: int = 32
+    ) -> None:
+        super().__init__()
+        if len(providers) != len(pool.endpoints):
+            raise ValueError("One provider per pool endpoint is required")
+        self.pool = pool
+        self.providers = list(providers)
+        self.max_hedges = max_hedges
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="rpc-pool")
+
+    def is_connected(self, show_traceback: bool = False) -> bool:
+        return any(p.is_connected(show_traceback) for p in self.providers)
+
+    def _attempt(
+        self, index: int, send: Callable[[int], Any], label: Any
+    ) -> Tuple[bool, Any, Optional[BaseException]]:
+        started = time.perf_counter()
+        try:
+            response = send(index)
+        except Exception as exc:
+            self.pool.record(index, time.perf_counter() - started, False)
+            logger.debug("%s via %s failed: %s", label, self.pool.endpoints[index].url, exc)
+            return False, None, exc
+        ok = usable_response(response)
+        self.pool.record(index, time.perf_counter() - started, ok)
+        return ok, response, None
+
+    def make_request(self, method: Any, params: Any) -> Any:
+        return self.race(
+            lambda index: self.providers[index].make_request(method, params), method, method in HEDGEABLE_METHODS
+        )
+
+    def race(self, send: Callable[[int], Any], label: Any = "request", hedge: bool = True) -> Any:
+        """`send(index)` to the best-ranked endpoint; hedged and failed over as a read-only request if `hedge`.
+
+        Also used for requests that are not web3 ones, such as JSON-RPC batch arrays.
+        """
+        order = self.pool.order()
+        if not hedge:
+            ok, response, exc = self._attempt(order[0], send, label)
+            if exc is not None:
+                raise exc
+            return response
+        pending: Dict[Any, int] = {}
+        hedges = 0
+        last: Tuple[Any, Optional[BaseException]] = (None, None)
+
+        def launch() -> int:
+            index = order.pop(0)
+            pending[self._executor.submit(self._attempt, index, send, label)] = index
+            return index
+
+        newest = launch()
+        while pending:
+            delay = self.pool.hedge_delay(newest) if order and hedges < self.max_hedges else None
+            done, _ = wait(list(pending), timeout=delay, return_when=FIRST_COMPLETED)
+            if not done:
+                newest = launch()
+                self.pool.hedged(newest)
+                hedges += 1
+                continue
+            for future in done:
+                pending.pop(future)
+                ok, response, exc = future.result()
+                if ok:
+                    return response
+                last = (response, exc)
+            if order:
+                # Fail over to the next endpoint
+                newest = launch()
+        response, exc = last
+        if response is not None:
+            return response
+        raise exc if exc is not None else RuntimeError(f"{label}: no RPC endpoint answered")
+
+
+class AsyncPooledHTTPProvider(AsyncBaseProvider):
+    """asyncio counterpart of `PooledHTTPProvider`; a losing hedge is cancelled instead."""
+
+    def __init__(self, pool: EndpointPool, providers: Sequence[Any], max_hedges: int = 1) -> None:
+        super().__init__()
+        if len(providers) != len(pool.endpoints):
+            raise ValueError("One provider per pool endpoint is required")
+        self.pool = pool
+        self.providers = list(providers)
+        self.max_hedges = max_hedges
+
+    async def is_connected(self, show_traceback: bool = False) -> bool:
+        for p in self.providers:
+            if await p.is_connected(show_traceback):
+                return True
+        return False
+
+    async def cache_async_session(self, session: Any) -> Any:
+        """Share one aiohttp session (see `AsyncEthAdapter`) between all endpoint providers."""
+        for p in self.providers:
+            if hasattr(p, "cache_async_session"):
+                await p.cache_async_session(session)
+        return session
+
+    async def _attempt(self, index: int, method: Any, params: Any) -> Tuple[bool, Any, Optional[BaseException]]:
+        started = time.perf_counter()
+        try:
+            response = await self.providers[index].make_request(method, params)
+        except asyncio.CancelledError:
+            # Lost a hedge race: it took at least this long
+            self.pool.record(index, time.perf_counter() - started, None)
+            raise
+        except Exception as exc:
+            self.pool.record(index, time.perf_counter() - started, False)
+            logger.debug("%s via %s failed: %s", method, self.pool.endpoints[index].url, exc)
+            return False, None, exc
+        ok = usable_response(response)
+        self.pool.record(index, time.perf_counter() - started, ok)
+        return ok, response, None
+
+    async def make_request(self, method: Any, params: Any) -> Any:
+        order = self.pool.order()
+        if method not in HEDGEABLE_METHODS:
+            ok, response, exc = await self._attempt(order[0], method, params)
+            if exc is not None:
+                raise exc
+            return response
+        pending: Dict[asyncio.Task, int] = {}
+        hedges = 0
+        last: Tuple[Any, Optional[BaseException]] = (None, None)
+
+        def launch() -> int:
+            index = order.pop(0)
+            pending[asyncio.ensure_future(self._attempt(index, method, params))] = index
+            return index
+
+        newest = launch()
+        try:
+            while pending:
+                delay = self.pool.hedge_delay(newest) if order and hedges < self.max_hedges else None
+                done, _ = await asyncio.wait(list(pending), timeout=delay, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    newest = launch()
+                    self.pool.hedged(newest)
+                    hedges += 1
+                    continue
+                for task in done:
+                    pending.pop(task)
+                    ok, response, exc = task.result()
+                    if ok:
+                        return response
+                    last = (response, exc)
+                if order:
+                    newest = launch()
+        finally:
+            for task in pending:
+                task.cancel()
+        response, exc = last
+        if response is not None:
+            return response
+        raise exc if exc is not None else RuntimeError(f"{method}: no RPC endpoint answered")
+
+
+_pools: Dict[Tuple[Any, ...], EndpointPool] = {}
+_pools_lock = threading.Lock()
+
+
+def shared_endpoint_pool(cfg: "Config") -> Optional[EndpointPool]:
+    """The process-wide `EndpointPool` of `cfg.eth_rpc_urls`, or None with fewer than two URLs.
+
+    Shared so that every adapter (sync and async services alike) ranks endpoints on the
+    same history.
+    """
+    urls = tuple(cfg.eth_rpc_urls)
+    if len(urls) < 2:
+        return None
+    key = (urls, cfg.rpc_hedge_percentile, cfg.rpc_breaker_failures, cfg.rpc_breaker_cooldown)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = EndpointPool(
+                urls,
+                hedge_percentile=cfg.rpc_hedge_percentile,
+                breaker_failures=cfg.rpc_breaker_failures,
+                breaker_cooldown=cfg.rpc_breaker_cooldown,
+            )
+        return pool
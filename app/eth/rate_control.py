@@ -0,0 +1,360 @@
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass
+import logging
+import math
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple
+
+from web3.providers import AsyncBaseProvider, BaseProvider
+
+if TYPE_CHECKING:  # pragma: no cover
+    from app.config import Config
+
+
+logger = logging.getLogger(__name__)
+
+# JSON-RPC error codes providers use for rate limiting (-32005 "limit exceeded" is the common one)
+_RATE_LIMIT_CODES = {-32005, -32029, 429}
+_RATE_LIMIT_WORDS = ("rate limit", "too many requests", "request limit", "throughput", "exceeded the limit")
+
+
+def is_rate_limit_error(error: Any) -> bool:
+    """True for a JSON-RPC error object that signals throttling rather than a failed call."""
+    if not isinstance(error, dict):
+        return False
+    if error.get("code") in _RATE_LIMIT_CODES:
+        return True
+    message = str(error.get("message", "")).lower()
+    return any(word in message for word in _RATE_LIMIT_WORDS)
+
+
+def http_throttle(exc: BaseException) -> Tuple[bool, Optional[float]]:
+    """(is an HTTP 429, its Retry-After seconds) of a `requests` or `aiohttp` exception."""
+    response = getattr(exc, "response", None)
+    status = getattr(response, "status_code", None) or getattr(exc, "status", None)
+    if status != 429:
+        return False, None
+    headers = getattr(response, "headers", None) or getattr(exc, "headers", None) or {}
+    try:
+        return True, max(0.0, float(headers.get("Retry-After")))
+    except (TypeError, ValueError):
+        return True, None
+
+
+@dataclass
+class TokenBucket:
+    """Requests per second allowance; `rate=None` is unlimited. Can be paused (Retry-After)."""
+
+    rate: Optional[float] = None
+    burst: float = 1.0
+    tokens: float = 0.0
+    updated: float = 0.0
+    paused_until: float = 0.0
+
+    def wait_time(self, now: float) -> float:
+        """0 and one token taken, or the seconds until one can be."""
+        if now < self.paused_until:
+            return self.paused_until - now
+        if self.rate is None:
+            return 0.0
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class RateController:
+    """Adaptive concurrency limit (AIMD) and token bucket for the requests to one RPC endpoint.
+
+    Each success raises the concurrency limit by 1/limit (about one per round of requests), up to
+    `max_concurrency`. A throttle (HTTP 429 or a JSON-RPC rate-limit error) halves it and pauses
+    the bucket for the Retry-After time, or a backoff doubling with each throttle in a row.
+    A latency EWMA above `latency_tolerance` times the baseline (the lowest latency seen,
+    slowly drifting up), and more than `latency_margin` seconds above it, cuts it by 10%.
+    Decreases happen at most once per latency EWMA, so one burst of errors counts once.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        rate: Optional[float] = None,
+        burst: Optional[float] = None,
+        max_concurrency: int = 16,
+        min_concurrency: int = 1,
+        latency_tolerance: float = 2.0,
+        latency_margin: float = 0.02,
+        backoff: float = 0.2,
+        max_backoff: float = 5.0,
+        alpha: float = 0.2,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.url = url
+        self.max_concurrency = max(1, max_concurrency)
+        self.min_concurrency = max(1, min(min_concurrency, self.max_concurrency))
+        self.limit = float(max(self.min_concurrency, self.max_concurrency // 2))
+        self.latency_tolerance = latency_tolerance
+        self.latency_margin = latency_margin
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.alpha = alpha
+        self.clock = clock
+        now = clock()
+        self.bucket = TokenBucket(rate, burst or max(1.0, rate or 1.0), burst or max(1.0, rate or 1.0), now)
+        self.in_flight = 0
+        self.latency_ewma: Optional[float] = None
+        self.baseline: Optional[float] = None
+        self.events: Dict[str, int] = {"http_429": 0, "rpc_rate_limit": 0, "latency": 0, "failures": 0, "waits": 0}
+        self._throttles_in_row = 0
+        self._decreased_at = float("-inf")
+        self._lock = threading.Lock()
+        # Threads waiting for a slot sleep on `_cond`; coroutines on an asyncio.Condition of their
+        # event loop ([condition, waiting coroutines] per loop), woken from `release`
+        self._cond = threading.Condition(self._lock)
+        self._async_waiters: Dict[Any, List[Any]] = {}
+
+    def _try_acquire(self) -> float:
+        if self.in_flight >= int(self.limit):
+            # Until a request ends
+            return math.inf
+        wait = self.bucket.wait_time(self.clock())
+        if wait > 0:
+            return wait
+        self.in_flight += 1
+        return 0.0
+
+    def try_acquire(self) -> float:
+        """0 when a request may start now (counted in flight), else seconds to wait before retrying
+        (`math.inf` at the concurrency limit: until a request is released)."""
+        with self._lock:
+            return self._try_acquire()
+
+    def acquire(self) -> None:
+        waited = False
+        with self._cond:
+            while True:
+                wait = self._try_acquire()
+                if not wait:
+                    break
+                waited = True
+                self._cond.wait(None if wait == math.inf else wait)
+            if waited:
+                self.events["waits"] += 1
+
+    async def acquire_async(self) -> None:
+        if not self.try_acquire():
+            return
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            entry = self._async_waiters.get(loop)
+            if entry is None:
+                entry = self._async_waiters[loop] = [asyncio.Condition(), 0]
+            entry[1] += 1
+        cond = entry[0]
+        try:
+            async with cond:
+                # Registered before this check, so a release in between is not missed
+                while True:
+                    wait = self.try_acquire()
+                    if not wait:
+                        break
+                    try:
+                        await asyncio.wait_for(cond.wait(), None if wait == math.inf else wait)
+                    except asyncio.TimeoutError:
+                        pass
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self._async_waiters[loop]
+                self.events["waits"] += 1
+
+    def _notify(self) -> None:
+        """Wake as many waiters as there are free slots (at least one, to recheck the bucket)."""
+        free = max(1, int(self.limit) - self.in_flight)
+        self._cond.notify(free)
+        for loop, (cond, waiting) in self._async_waiters.items():
+            if waiting:
+                try:
+                    loop.call_soon_threadsafe(self._wake_async, cond)
+                except RuntimeError:
+                    # Loop closed; its waiters are gone
+                    pass
+
+    def _wake_async(self, cond: Any) -> None:
+        async def wake() -> None:
+            async with cond:
+                cond.notify(max(1, int(self.limit) - self.in_flight))
+
+        asyncio.ensure_future(wake())
+
+    def release(
+        self, seconds: float, throttle: Optional[str] = None, retry_after: Optional[float] = None, failed: bool = False
+    ) -> None:
+        """End a request that took `seconds`; `throttle` names the rate-limit signal it got, if any.
+
+        `failed` is any other error (the request never got an answer): the limit does not grow
+        and a run of throttles is not interrupted.
+        """
+        with self._lock:
+            self.in_flight = max(0, self.in_flight - 1)
+            try:
+                self._release(seconds, throttle, retry_after, failed)
+            finally:
+                self._notify()
+
+    def _release(self, seconds: float, throttle: Optional[str], retry_after: Optional[float], failed: bool) -> None:
+        now = self.clock()
+        if throttle is not None:
+            self.events[throttle] += 1
+            self._throttles_in_row += 1
+            pause = retry_after
+            if pause is None:
+                pause = min(self.max_backoff, self.backoff * 2 ** (self._throttles_in_row - 1))
+            self.bucket.paused_until = max(self.bucket.paused_until, now + pause)
+            self._decrease(now, 0.5)
+            logger.info("RPC endpoint %s throttled (%s); concurrency limit %.1f", self.url, throttle, self.limit)
+            return
+        if failed:
+            self.events["failures"] += 1
+            return
+        self._throttles_in_row = 0
+        ewma = self.latency_ewma
+        self.latency_ewma = seconds if ewma is None else ewma + self.alpha * (seconds - ewma)
+        if self.baseline is None or seconds < self.baseline:
+            self.baseline = seconds
+        else:
+            # Let the baseline follow a lasting change of the endpoint's normal latency
+            self.baseline += 0.01 * (seconds - self.baseline)
+        slow = self.latency_ewma - self.baseline
+        if slow > self.latency_margin and self.latency_ewma > self.latency_tolerance * self.baseline:
+            # Queueing at the endpoint: back off, and do not grow until latency recovers
+            if self._decrease(now, 0.9):
+                self.events["latency"] += 1
+            return
+        self.limit = min(float(self.max_concurrency), self.limit + 1 / self.limit)
+
+    def _decrease(self, now: float, factor: float) -> bool:
+        if now - self._decreased_at < (self.latency_ewma or 0.0):
+            return False
+        self.limit = max(float(self.min_concurrency), self.limit * factor)
+        self._decreased_at = now
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "url": self.url,
+                "concurrency_limit": round(self.limit, 2),
+                "in_flight": self.in_flight,
+                "rate_limit": self.bucket.rate,
+                "paused_for": round(max(0.0, self.bucket.paused_until - self.clock()), 3),
+                "latency_ewma_ms": round(self.latency_ewma * 1000, 2) if self.latency_ewma is not None else None,
+                "baseline_ms": round(self.baseline * 1000, 2) if self.baseline is not None else None,
+                "throttle_events": dict(self.events),
+            }
+
+
+def _response_throttle(response: Any) -> Optional[str]:
+    error = response.get("error") if isinstance(response, dict) else None
+    return "rpc_rate_limit" if error is not None and is_rate_limit_error(error) else None
+
+
+class ThrottledProvider(BaseProvider):
+    """web3 provider passing requests to `provider` under a `RateController`.
+
+    Other attributes (`endpoint_uri`, request settings) are the wrapped provider's.
+    """
+
+    def __init__(self, provider: Any, controller: RateController) -> None:
+        super().__init__()
+        self.provider = provider
+        self.controller = controller
+
+    def __getattr__(self, name: str) -> Any:
+        provider = self.__dict__.get("provider")
+        if provider is None:
+            raise AttributeError(name)
+        return getattr(provider, name)
+
+    def is_connected(self, show_traceback: bool = False) -> bool:
+        return self.provider.is_connected(show_traceback)
+
+    def make_request(self, method: Any, params: Any) -> Any:
+        self.controller.acquire()
+        started = time.perf_counter()
+        try:
+            response = self.provider.make_request(method, params)
+        except BaseException as exc:
+            throttled, retry_after = http_throttle(exc)
+            if throttled:
+                self.controller.release(time.perf_counter() - started, "http_429", retry_after)
+            else:
+                self.controller.release(time.perf_counter() - started, failed=True)
+            raise
+        self.controller.release(time.perf_counter() - started, _response_throttle(response))
+        return response
+
+
+class AsyncThrottledProvider(AsyncBaseProvider):
+    """asyncio counterpart of `ThrottledProvider`."""
+
+    def __init__(self, provider: Any, controller: RateController) -> None:
+        super().__init__()
+        self.provider = provider
+        self.controller = controller
+
+    def __getattr__(self, name: str) -> Any:
+        provider = self.__dict__.get("provider")
+        if provider is None:
+            raise AttributeError(name)
+        return getattr(provider, name)
+
+    async def is_connected(self, show_traceback: bool = False) -> bool:
+        return await self.provider.is_connected(show_traceback)
+
+    async def cache_async_session(self, session: Any) -> Any:
+        if hasattr(self.provider, "cache_async_session"):
+            return await self.provider.cache_async_session(session)
+        return session
+
+    async def make_request(self, method: Any, params: Any) -> Any:
+        await self.controller.acquire_async()
+        started = time.perf_counter()
+        try:
+            response = await self.provider.make_request(method, params)
+        except BaseException as exc:
+            throttled, retry_after = http_throttle(exc)
+            if throttled:
+                self.controller.release(time.perf_counter() - started, "http_429", retry_after)
+            else:
+                self.controller.release(time.perf_counter() - started, failed=True)
+            raise
+        self.controller.release(time.perf_counter() - started, _response_throttle(response))
+        return response
+
+
+_controllers: Dict[Tuple[Any, ...], RateController] = {}
+_controllers_lock = threading.Lock()
+
+
+def shared_controller(cfg: "Config", url: str) -> RateController:
+    """The process-wide `RateController` of endpoint `url`, shared by every adapter using it."""
+    key = (url, cfg.rpc_rate_limit, cfg.rpc_max_concurrency)
+    with _controllers_lock:
+        controller = _controllers.get(key)
+        if controller is None:
+            controller = _controllers[key] = RateController(
+                url, rate=cfg.rpc_rate_limit, max_concurrency=cfg.rpc_max_concurrency
+            )
+        return controller
+
+
+def controllers() -> List[RateController]:
+    """Every controller created so far, in creation order."""
+    with _controllers_lock:
+        return list(_controllers.values())
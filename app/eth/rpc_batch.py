@@ -0,0 +1,189 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import logging
+import re
+import time
+
+from app.eth.multicall import CallResult
+
+
+logger = logging.getLogger(__name__)
+
+
+# JSON-RPC error codes that retrying cannot fix: execution reverted, method not found,
+# invalid params. Anything else (rate limits, internal/upstream errors) is retried.
+_PERMANENT_ERROR_CODES = {3, -32601, -32602}
+
+
+# How endpoints word the refusal of a batch that is too large (HTTP 400 bodies, single error objects)
+_BATCH_TOO_LARGE = re.compile(r"too (large|big)|batch (size|limit)|batch.*exceed|exceed.*batch", re.IGNORECASE)
+
+
+def is_permanent_error(error: Dict[str, Any]) -> bool:
+    if error.get("code") in _PERMANENT_ERROR_CODES:
+        return True
+    return "revert" in str(error.get("message", "")).lower()
+
+
+class BatchRejected(Exception):
+    """The endpoint refused a batch as a whole for its size (HTTP 413, or an error saying so)."""
+
+
+@dataclass
+class RpcBatchTransport:
+    """Send many JSON-RPC requests as HTTP batch arrays over a keep-alive session.
+
+    Requests are split into batches of at most `max_batch_size`; a batch the endpoint rejects
+    as a whole is halved (and the size limit lowered) until it goes through. Entries that come
+    back with a transient error, or not at all, are retried up to `max_retries` times on their
+    own, while successful entries are never re-sent.
+    """
+
+    endpoint_uri: str
+    timeout: float = 20
+    max_batch_size: int = 100
+    max_retries: int = 2
+    session: Any = None
+    # Shared `RateController` of the endpoint; batches wait for a slot and report throttling
+    controller: Any = None
+    # `PooledHTTPProvider` of ETH_RPC_URLS: batches then go to its endpoints (not `endpoint_uri`)
+    # with its failover, hedging and circuit breaking, under each endpoint provider's controller
+    pool_provider: Any = None
+    _next_id: int = field(default=0, init=False, repr=False)
+
+    def request(self, requests: Sequence[Tuple[str, List[Any]]]) -> List[CallResult]:
+        """Execute (method, params) pairs; results are returned in request order.
+
+        A result's `value` is the raw JSON-RPC `result`; `error` carries the per-entry
+        error message when the entry failed.
+        """
+        results: List[Optional[CallResult]] = [None] * len(requests)
+        pending = list(range(len(requests)))
+        for attempt in range(self.max_retries + 1):
+            retry: List[int] = []
+            for start in range(0, len(pending), max(1, self.max_batch_size)):
+                chunk = pending[start : start + max(1, self.max_batch_size)]
+                for pos, reply in self._send(chunk, requests):
+                    error = reply.get("error") if reply is not None else {"message": "no response"}
+                    if error is None:
+                        results[pos] = CallResult(True, reply.get("result"))
+                        continue
+                    results[pos] = CallResult(False, error=str(error.get("message", error)))
+                    if not is_permanent_error(error):
+                        retry.append(pos)
+            if not retry:
+                break
+            if attempt < self.max_retries:
+                logger.debug("Retrying %d failed JSON-RPC batch entries", len(retry))
+            pending = retry
+        return [r if r is not None else CallResult(False, error="not sent") for r in results]
+
+    def _send(
+        self, positions: List[int], requests: Sequence[Tuple[str, List[Any]]]
+    ) -> List[Tuple[int, Optional[Dict[str, Any]]]]:
+        ids: Dict[int, int] = {}
+        payload = []
+        for pos in positions:
+            method, params = requests[pos]
+            self._next_id += 1
+            ids[self._next_id] = pos
+            payload.append({"jsonrpc": "2.0", "id": self._next_id, "method": method, "params": params})
+        try:
+            replies = self._post(payload)
+        except BatchRejected:
+            if len(positions) == 1:
+                return [(positions[0], {"error": {"message": "batch rejected by endpoint"}})]
+            self.max_batch_size = min(self.max_batch_size, len(positions) // 2)
+            logger.debug(
+                "JSON-RPC batch of %d rejected; lowering batch size to %d", len(positions), self.max_batch_size
+            )
+            out: List[Tuple[int, Optional[Dict[str, Any]]]] = []
+            rest = positions
+            while rest:
+                # The limit may shrink further while the remainder is being sent
+                size = max(1, self.max_batch_size)
+                out.extend(self._send(rest[:size], requests))
+                rest = rest[size:]
+            return out
+        except Exception as exc:
+            logger.debug("JSON-RPC batch of %d failed: %s", len(positions), exc)
+            return [(pos, {"error": {"message": str(exc)}}) for pos in positions]
+        by_pos: Dict[int, Dict[str, Any]] = {}
+        for reply in replies:
+            pos = ids.get(reply.get("id")) if isinstance(reply, dict) else None
+            if pos is not None:
+                by_pos[pos] = reply
+        return [(pos, by_pos.get(pos)) for pos in positions]
+
+    def _post(self, payload: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        if self.pool_provider is None:
+            return self._post_to(None, self.controller, payload)
+        providers = self.pool_provider.providers
+        endpoints = self.pool_provider.pool.endpoints
+
+        def send(index: int) -> Any:
+            try:
+                return self._post_to(endpoints[index].url, getattr(providers[index], "controller", None), payload)
+            except BatchRejected as exc:
+                # The endpoint is up and only refused the size; splitting the batch is the answer,
+                # not another endpoint. Any other error fails over and counts against the endpoint.
+                return exc
+
+        replies = self.pool_provider.race(send, "batch")
+        if isinstance(replies, BatchRejected):
+            raise replies
+        return replies
+
+    def _post_to(self, url: Optional[str], controller: Any, payload: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        from app.eth.rate_control import http_throttle, is_rate_limit_error
+        from app.metrics import observe_rpc
+
+        if controller is not None:
+            controller.acquire()
+        started = time.perf_counter()
+        try:
+            replies = self.post(payload) if url is None else self.post(payload, url)
+        except BaseException as exc:
+            seconds = time.perf_counter() - started
+            observe_rpc("batch", None, seconds, False)
+            if controller is not None:
+                throttled, retry_after = http_throttle(exc)
+                if throttled:
+                    controller.release(seconds, "http_429", retry_after)
+                else:
+                    controller.release(seconds, failed=not isinstance(exc, BatchRejected))
+            raise
+        seconds = time.perf_counter() - started
+        observe_rpc("batch", None, seconds, True)
+        if controller is not None:
+            limited = any(isinstance(r, dict) and is_rate_limit_error(r.get("error")) for r in replies)
+            controller.release(seconds, "rpc_rate_limit" if limited else None)
+        return replies
+
+    def post(self, payload: List[Dict[str, Any]], url: Optional[str] = None) -> List[Dict[str, Any]]:
+        """POST one batch (to `endpoint_uri` by default); raises BatchRejected when the endpoint
+        refuses the batch for its size.
+
+        Other HTTP errors (5xx included) and other single error objects are raised as transport
+        errors: the failed entries are retried, and a pool fails over to its next endpoint.
+        """
+        if self.session is None:
+            import requests  # type: ignore
+
+            self.session = requests.Session()
+        resp = self.session.post(url or self.endpoint_uri, json=payload, timeout=self.timeout)
+        if resp.status_code == 413 or (
+            resp.status_code == 400 and _BATCH_TOO_LARGE.search(getattr(resp, "text", "") or "")
+        ):
+            raise BatchRejected(f"HTTP {resp.status_code}")
+        resp.raise_for_status()
+        body = resp.json()
+        if not isinstance(body, list):
+            # Providers answer an oversized batch with a single error object
+            error = body.get("error") if isinstance(body, dict) else body
+            if _BATCH_TOO_LARGE.search(str(error)):
+                raise BatchRejected(str(error))
+            raise RuntimeError(f"JSON-RPC batch failed: {error}")
+        return body
@@ -1,17 +1,61 @@
+from contextlib import asynccontextmanager
+import inspect
+import math
 from dataclasses import asdict
-from typing import List, Dict, Any
+from typing import Annotated, Any, AsyncIterator, Callable, Dict, Iterator, List, Optional
 
-from fastapi import Depends, FastAPI, Request
-from fastapi.responses import HTMLResponse, Response
-import json
+from fastapi import Depends, FastAPI, HTTPException, Query, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
+from pydantic import BaseModel, Field
 
+from app import metrics
 import app.deps as deps
+from app.eth.provider_pool import EndpointPool
+from app.eth.rate_control import RateController
+from app.models import Module
+from app.services.allocation import simulate_lowest_share_first, sweep_lowest_share_first
 from app.services.router_service import RouterService
+from app.services.csm_columns import snapshot_to_json
+from app.services.csm_pages import CsmFilters, operators_page, queue_page
 from app.services.csm_service import CsmService
+from app.services.encoded import block_etag, dumps, encode_body, etag_matches, pick_encoding
+from app.services.follower import BlockFollower, FollowedSnapshot, call_service
+from app.services.snapshot_archive import SnapshotArchive
+from app.services.snapshot_cache import SnapshotCache
 
-app = FastAPI(title="Stake Allocation Simulation")
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    follower = app.dependency_overrides.get(deps.get_follower, deps.get_follower)()
+    if follower is not None:
+        follower.start()
+    yield
+    if follower is not None:
+        await follower.stop()
+    await deps.close()
+
+
+app = FastAPI(title="Stake Allocation Simulation", lifespan=lifespan)
+app.add_middleware(metrics.RouteMetricsMiddleware)
+
+
+def _json_safe(value: Any) -> Any:
+    if isinstance(value, float) and not math.isfinite(value):
+        return str(value)
+    if isinstance(value, dict):
+        return {k: _json_safe(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_json_safe(v) for v in value]
+    return value
+
+
+@app.exception_handler(RequestValidationError)
+async def validation_error(request: Request, exc: RequestValidationError) -> JSONResponse:
+    """FastAPI's 422 response, with rejected JSON `Infinity` / `NaN` inputs echoed as strings."""
+    return JSONResponse(status_code=422, content={"detail": jsonable_encoder(_json_safe(exc.errors()))})
 
 # Mount static files (if any get added later)
 app.mount("/static", StaticFiles(directory="static"), name="static")
@@ -19,11 +63,194 @@ app.mount("/static", StaticFiles(directory="static"), name="static")
 templates = Jinja2Templates(directory="templates")
 
 
+async def _followed(follower: Optional[BlockFollower], part: str) -> Optional[FollowedSnapshot]:
+    """Follower snapshot to serve if it has `part` ("csm" or "modules"), else None."""
+    if follower is None:
+        return None
+    state = await follower.latest()
+    if state is None or getattr(state, part) is None:
+        return None
+    return state
+
+
+def _snapshot_headers(response: Response, follower: BlockFollower, state: FollowedSnapshot) -> None:
+    response.headers["X-Snapshot-Block"] = str(state.block)
+    response.headers["X-Snapshot-Age"] = f"{follower.age() or 0.0:.3f}"
+    if state.restored:
+        response.headers["X-Snapshot-Restored"] = "1"
+
+
+async def _load_modules(
+    response: Response, service: RouterService, follower: Optional[BlockFollower]
+) -> List[Module]:
+    state = await _followed(follower, "modules")
+    if state is not None:
+        _snapshot_headers(response, follower, state)
+        return state.modules  # type: ignore[return-value]
+    return await call_service(service.list_modules)
+
+
+async def _encoded_response(
+    request: Request,
+    response: Response,
+    cache: Optional[SnapshotCache],
+    kind: str,
+    block: Any,
+    build: Callable[[], bytes],
+    media_type: str,
+) -> Response:
+    """Serve a body serialized (and compressed) once per block, with the block as strong ETag.
+
+    `If-None-Match` hits get a 304 without touching the body; otherwise the stored variant
+    for the client's Accept-Encoding is sent as is.
+    """
+    etag = block_etag(kind, block)
+    headers = {k: v for k, v in response.headers.items() if k.lower() != "content-length"}
+    headers["Vary"] = "Accept-Encoding"
+    if etag is not None:
+        headers["ETag"] = etag
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers=headers)
+
+    def serialize() -> Any:
+        with metrics.STAGE_SECONDS.time("serialize"):
+            return encode_body(build(), media_type, etag)
+
+    if cache is not None and etag is not None:
+        body = await cache.get_or_build_async((kind, block), lambda: call_service(serialize))
+    else:
+        body = await call_service(serialize)
+    encoding = pick_encoding(request.headers.get("accept-encoding"))
+    if encoding is not None:
+        headers["Content-Encoding"] = encoding
+    return Response(content=body.variant(encoding), media_type=body.media_type, headers=headers)
+
+
+async def _load_csm(
+    response: Response, service: CsmService, follower: Optional[BlockFollower]
+) -> Dict[str, Any]:
+    state = await _followed(follower, "csm")
+    if state is not None:
+        _snapshot_headers(response, follower, state)
+        return state.csm  # type: ignore[return-value]
+    return await call_service(service.snapshot)
+
+
+async def _pinned_csm(
+    response: Response,
+    service: CsmService,
+    follower: Optional[BlockFollower],
+    cache: Optional[SnapshotCache],
+    block: Optional[int],
+    archive: Optional[SnapshotArchive] = None,
+    historical: bool = False,
+) -> Dict[str, Any]:
+    """CSM snapshot at `block` from memory (follower or cache) or the archive; the current one without `block`.
+
+    Never reads the chain for a past block: pages of one listing stay consistent. A block that
+    is not archived is a 404. Without an archive, a page's block evicted from the cache is a 410
+    telling the client to start over, and a `historical` query (not a page) is a 404.
+    """
+    if block is None:
+        return await _load_csm(response, service, follower)
+    state = await _followed(follower, "csm")
+    if state is not None and state.block == block:
+        _snapshot_headers(response, follower, state)  # type: ignore[arg-type]
+        return state.csm  # type: ignore[return-value]
+    snapshot = cache.get(("csm", block)) if cache is not None else None
+    if snapshot is not None:
+        return snapshot
+    if archive is None:
+        if historical:
+            raise HTTPException(
+                status_code=404, detail=f"CSM state at block {block} is not available: no snapshot archive"
+            )
+        raise HTTPException(status_code=410, detail=f"CSM state at block {block} is no longer cached; start over")
+
+    async def rebuild() -> Dict[str, Any]:
+        snapshot = await call_service(archive.csm_at, block)
+        if snapshot is None:
+            raise await _not_archived(archive, f"CSM state at block {block}")
+        return snapshot
+
+    snapshot = await cache.get_or_build_async(("csm", block), rebuild) if cache is not None else await rebuild()
+    response.headers["X-Snapshot-Block"] = str(block)
+    return snapshot
+
+
+async def _not_archived(archive: SnapshotArchive, what: str) -> HTTPException:
+    """404 for a block outside the archive: before its oldest or after its newest block, or one it skipped."""
+    oldest, newest = await call_service(archive.blocks)
+    if oldest is None:
+        return HTTPException(status_code=404, detail=f"{what} is outside the archived range: the archive is empty")
+    return HTTPException(
+        status_code=404,
+        detail=f"{what} is outside the archived range ({oldest}-{newest}: blocks the follower polled or backfilled)",
+    )
+
+
+async def _archived_modules(
+    response: Response, follower: Optional[BlockFollower], archive: Optional[SnapshotArchive], block: int
+) -> List[Module]:
+    """Module list at a past `block`, from the follower or the archive; never from the chain."""
+    state = await _followed(follower, "modules")
+    if state is not None and state.block == block:
+        _snapshot_headers(response, follower, state)  # type: ignore[arg-type]
+        return state.modules  # type: ignore[return-value]
+    if archive is None:
+        raise HTTPException(status_code=404, detail=f"Modules at block {block} are not available: no snapshot archive")
+    modules = await call_service(archive.modules_at, block)
+    if modules is None:
+        raise await _not_archived(archive, f"Modules at block {block}")
+    response.headers["X-Snapshot-Block"] = str(block)
+    return modules
+
+
+def _csm_filters(
+    active_only: bool = Query(False, description="Only active node operators"),
+    has_depositable: bool = Query(False, description="Only node operators with depositable keys"),
+    in_queue: bool = Query(False, description="Only node operators with batches in the queue"),
+    operator_ids: Optional[str] = Query(
+        None, pattern=r"^\s*\d+(\s*,\s*\d+)*\s*$", description="Comma-separated node operator ids"
+    ),
+) -> CsmFilters:
+    ids = frozenset(int(x) for x in operator_ids.split(",")) if operator_ids is not None else None
+    if ids is not None and len(ids) > 1000:
+        raise HTTPException(status_code=422, detail="At most 1000 ids per request")
+    return CsmFilters(active_only=active_only, has_depositable=has_depositable, in_queue=in_queue, operator_ids=ids)
+
+
 @app.get("/healthz", tags=["health"])
 async def healthz():
     return {"status": "ok"}
 
 
+@app.get("/api/cache", tags=["health"])
+async def cache_stats(cache: Optional[SnapshotCache] = Depends(deps.get_snapshot_cache)) -> Dict[str, Any]:
+    """Snapshot cache counters (hits, misses, evictions) and current size."""
+    if cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **cache.stats()}
+
+
+@app.get("/metrics", response_class=PlainTextResponse, tags=["health"])
+async def prometheus_metrics() -> PlainTextResponse:
+    """Prometheus metrics: RPC calls per contract function, snapshot stages and sizes, route latency."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@app.get("/api/rpc", tags=["health"])
+async def rpc_stats(
+    pool: Optional[EndpointPool] = Depends(deps.get_endpoint_pool),
+    limits: List[RateController] = Depends(deps.get_rate_controllers),
+) -> Dict[str, Any]:
+    """RPC endpoint health (latency, errors, hedges, circuit; with ETH_RPC_URLS) and adaptive limits."""
+    out: Dict[str, Any] = {"enabled": pool is not None, "limits": [c.stats() for c in limits]}
+    if pool is not None:
+        out["endpoints"] = pool.stats()
+    return out
+
+
 @app.get("/", response_class=HTMLResponse, tags=["ui"])
 async def index(request: Request):
     return templates.TemplateResponse(request, "index.html", {"title": "Stake Allocation Simulation"})
@@ -44,8 +271,17 @@ async def csm_standalone_page(request: Request):
 
 
 @app.get("/api/modules", tags=["api"])
-async def api_modules(service: RouterService = Depends(deps.get_router_service)) -> List[dict]:
-    modules = service.list_modules()
+async def api_modules(
+    response: Response,
+    block: Optional[int] = Query(None, ge=0, description="Past block to read from the snapshot archive"),
+    service: RouterService = Depends(deps.get_router_service),
+    follower: Optional[BlockFollower] = Depends(deps.get_follower),
+    archive: Optional[SnapshotArchive] = Depends(deps.get_snapshot_archive),
+) -> List[dict]:
+    if block is None:
+        modules = await _load_modules(response, service, follower)
+    else:
+        modules = await _archived_modules(response, follower, archive, block)
 
     # Compute totals based on active and depositable validators
     total_active = sum((m.active_validators or 0) for m in modules)
@@ -81,24 +317,283 @@ async def api_modules(service: RouterService = Depends(deps.get_router_service))
     return enriched
 
 
+@app.get("/api/simulate", tags=["api"])
+async def api_simulate(
+    response: Response,
+    eth: float = Query(..., ge=0, allow_inf_nan=False, description="ETH to deposit"),
+    service: RouterService = Depends(deps.get_router_service),
+    follower: Optional[BlockFollower] = Depends(deps.get_follower),
+) -> Dict[str, Any]:
+    """Simulate depositing `eth` into the current modules, lowest share first."""
+    result = simulate_lowest_share_first(await _load_modules(response, service, follower), eth)
+    return {
+        "eth": result.eth,
+        "validators": result.validators,
+        "total_validators": result.total_validators,
+        "modules": [
+            {
+                **asdict(a.module),
+                "add_validators": a.add_validators,
+                "add_eth": a.add_eth,
+                "share_pct": a.share_pct,
+                "headroom_validators": a.headroom_validators,
+                "headroom_eth": a.headroom_eth,
+            }
+            for a in result.modules
+        ],
+    }
+
+
+class SweepModule(BaseModel):
+    """`Module` fields of an /api/modules entry; its other (derived) fields are ignored."""
+
+    address: str
+    module_id: Optional[int] = None
+    name: Optional[str] = None
+    module_type: Optional[str] = None
+    target_share_bps: Optional[int] = Field(None, ge=0, le=10_000)
+    is_active: Optional[bool] = None
+    is_deposits_paused: Optional[bool] = None
+    is_stopped: Optional[bool] = None
+    active_validators: Optional[int] = Field(None, ge=0)
+    depositable_validators: Optional[int] = Field(None, ge=0)
+    last_deposit_block: Optional[int] = None
+    max_deposits_per_block: Optional[int] = None
+    min_deposit_block_distance: Optional[int] = None
+
+
+class SweepRequest(BaseModel):
+    # ETH amounts to simulate, e.g. 0..2M in 1k steps
+    eth: List[Annotated[float, Field(ge=0, allow_inf_nan=False)]] = Field(..., min_length=1, max_length=100_000)
+    # Module state as returned by /api/modules; defaults to the current on-chain state
+    modules: Optional[List[SweepModule]] = None
+
+
+@app.post("/api/simulate/sweep", tags=["api"])
+async def api_simulate_sweep(
+    body: SweepRequest,
+    response: Response,
+    service: RouterService = Depends(deps.get_router_service),
+    follower: Optional[BlockFollower] = Depends(deps.get_follower),
+) -> Dict[str, Any]:
+    """Simulate many deposit sizes at once; per-module results are arrays aligned with `eth`."""
+    if body.modules is not None:
+        modules = [Module(**m.model_dump()) for m in body.modules]
+    else:
+        modules = await _load_modules(response, service, follower)
+    sweep = sweep_lowest_share_first(modules, body.eth)
+    return {
+        "eth": sweep.eth.tolist(),
+        "validators": sweep.validators.tolist(),
+        "total_validators": sweep.total_validators.tolist(),
+        "modules": [
+            {
+                **asdict(m),
+                "add_validators": sweep.add_validators[:, pos].tolist(),
+                "share_pct": sweep.share_pct[:, pos].tolist(),
+                "headroom_validators": sweep.headroom_validators[:, pos].tolist(),
+            }
+            for pos, m in enumerate(sweep.modules)
+        ],
+    }
+
+
 @app.get("/api/csm/state", tags=["api"])
-async def api_csm_state(service: CsmService = Depends(deps.get_csm_service)) -> Dict[str, Any]:
-    """Return combined CSM state: deposit queue and node operators with positions."""
-    return service.snapshot()
+async def api_csm_state(
+    request: Request,
+    response: Response,
+    block: Optional[int] = Query(None, ge=0, description="Past block to read from the snapshot archive"),
+    service: CsmService = Depends(deps.get_csm_service),
+    follower: Optional[BlockFollower] = Depends(deps.get_follower),
+    cache: Optional[SnapshotCache] = Depends(deps.get_snapshot_cache),
+    archive: Optional[SnapshotArchive] = Depends(deps.get_snapshot_archive),
+) -> Response:
+    """Return combined CSM state: deposit queue and node operators with positions.
+
+    The JSON is encoded once per block; `ETag` is the block, so unchanged state costs a 304.
+    With `block`, the state at that block is served from memory or the snapshot archive, else a 404.
+    The archive holds the blocks the follower polled and those backfilled; blocks between two polls
+    are missing until `python -m app.backfill` fills them in.
+    """
+    snapshot = await _pinned_csm(response, service, follower, cache, block, archive, historical=True)
+    return await _encoded_response(
+        request,
+        response,
+        cache,
+        "csm-state",
+        snapshot.get("block_number"),
+        lambda: dumps(snapshot_to_json(snapshot)),
+        "application/json",
+    )
+
+
+@app.get("/api/csm/state.ndjson", tags=["api"])
+async def api_csm_state_ndjson(service: CsmService = Depends(deps.get_csm_service)) -> StreamingResponse:
+    """Stream CSM state as NDJSON, read from the chain page by page at one pinned block.
+
+    The first line is {"type": "block", "block_number": N}, then one {"type": "queue_item", ...}
+    line per queue batch in queue order, then one {"type": "node_operator", ...} line per operator.
+    """
+    block = await call_service(service.adapter.block_number)
+
+    def line(kind: str, record: Dict[str, Any]) -> bytes:
+        return dumps({"type": kind, **record}) + b"\n"
+
+    if inspect.isasyncgenfunction(service.iter_queue):
+
+        async def lines() -> AsyncIterator[bytes]:
+            yield line("block", {"block_number": block})
+            async for item in service.iter_queue(block):
+                yield line("queue_item", item)
+            async for op in service.iter_node_operators(block):
+                yield line("node_operator", op)
+
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+    def sync_lines() -> Iterator[bytes]:
+        # Iterated in the threadpool by StreamingResponse
+        yield line("block", {"block_number": block})
+        for item in service.iter_queue(block):
+            yield line("queue_item", item)
+        for op in service.iter_node_operators(block):
+            yield line("node_operator", op)
+
+    return StreamingResponse(sync_lines(), media_type="application/x-ndjson")
+
+
+@app.get("/api/csm/queue", tags=["api"])
+async def api_csm_queue(
+    response: Response,
+    cursor: int = Query(0, ge=0, description="Queue index to start from (`next_cursor` of the previous page)"),
+    limit: int = Query(100, ge=1, le=1000),
+    block: Optional[int] = Query(None, ge=0, description="Block of the first page (`block_number`)"),
+    filters: CsmFilters = Depends(_csm_filters),
+    service: CsmService = Depends(deps.get_csm_service),
+    follower: Optional[BlockFollower] = Depends(deps.get_follower),
+    cache: Optional[SnapshotCache] = Depends(deps.get_snapshot_cache),
+    archive: Optional[SnapshotArchive] = Depends(deps.get_snapshot_archive),
+) -> Dict[str, Any]:
+    """A page of CSM deposit queue items in queue order, filtered by their node operators.
+
+    Pass the returned `block_number` as `block` with `next_cursor` to read the next page of the same state.
+    """
+    snapshot = await _pinned_csm(response, service, follower, cache, block, archive)
+    page = queue_page(snapshot, cursor, limit, filters)
+    return {"block_number": snapshot.get("block_number"), "items": page.items, "next_cursor": page.next_cursor}
+
+
+@app.get("/api/csm/node-operators", tags=["api"])
+async def api_csm_node_operators(
+    response: Response,
+    cursor: int = Query(0, ge=0, description="Node operator id to start from (`next_cursor` of the previous page)"),
+    limit: int = Query(100, ge=1, le=1000),
+    block: Optional[int] = Query(None, ge=0, description="Block of the first page (`block_number`)"),
+    filters: CsmFilters = Depends(_csm_filters),
+    service: CsmService = Depends(deps.get_csm_service),
+    follower: Optional[BlockFollower] = Depends(deps.get_follower),
+    cache: Optional[SnapshotCache] = Depends(deps.get_snapshot_cache),
+    archive: Optional[SnapshotArchive] = Depends(deps.get_snapshot_archive),
+) -> Dict[str, Any]:
+    """A page of CSM node operator records (with queue positions) by ascending id.
+
+    Pass the returned `block_number` as `block` with `next_cursor` to read the next page of the same state.
+    """
+    snapshot = await _pinned_csm(response, service, follower, cache, block, archive)
+    page = operators_page(snapshot, cursor, limit, filters)
+    return {"block_number": snapshot.get("block_number"), "items": page.items, "next_cursor": page.next_cursor}
+
+
+@app.get("/api/csm/operators", tags=["api"])
+async def api_csm_operators(
+    response: Response,
+    ids: str = Query(..., pattern=r"^\s*\d+(\s*,\s*\d+)*\s*$", description="Comma-separated node operator ids"),
+    service: CsmService = Depends(deps.get_csm_service),
+    follower: Optional[BlockFollower] = Depends(deps.get_follower),
+) -> Dict[str, Any]:
+    """Look up several node operators: records with their queue batches; unknown ids in `missing`."""
+    wanted = list(dict.fromkeys(int(x) for x in ids.split(",")))
+    if len(wanted) > 1000:
+        raise HTTPException(status_code=422, detail="At most 1000 ids per request")
+    snapshot = await _load_csm(response, service, follower)
+    index = service.queue_index(snapshot)
+    found = {no_id: index.operator(no_id) for no_id in wanted}
+    return {
+        "block_number": snapshot.get("block_number"),
+        "operators": [op for op in found.values() if op is not None],
+        "missing": [no_id for no_id, op in found.items() if op is None],
+    }
+
+
+@app.get("/api/csm/operators/{operator_id}", tags=["api"])
+async def api_csm_operator(
+    operator_id: int,
+    response: Response,
+    service: CsmService = Depends(deps.get_csm_service),
+    follower: Optional[BlockFollower] = Depends(deps.get_follower),
+) -> Dict[str, Any]:
+    """One node operator: its record, queue batches and the keys ahead of each batch."""
+    snapshot = await _load_csm(response, service, follower)
+    operator = service.queue_index(snapshot).operator(operator_id)
+    if operator is None:
+        raise HTTPException(status_code=404, detail=f"Node operator {operator_id} not found")
+    return {"block_number": snapshot.get("block_number"), **operator}
+
+
+@app.get("/api/csm/simulate", tags=["api"])
+async def api_csm_simulate(
+    response: Response,
+    eth: List[Annotated[float, Field(ge=0, allow_inf_nan=False)]] = Query(
+        ..., min_length=1, max_length=1000, description="ETH amounts sent to CSM (repeat for several)"
+    ),
+    service: CsmService = Depends(deps.get_csm_service),
+    follower: Optional[BlockFollower] = Depends(deps.get_follower),
+) -> Dict[str, Any]:
+    """Simulate sending each `eth` amount through the CSM FIFO deposit queue.
+
+    Per amount: keys deposited, where deposits stop in the queue and keys per node operator.
+    """
+    snapshot = await _load_csm(response, service, follower)
+    index = service.queue_index(snapshot)
+    results = []
+    for amount in eth:
+        deposit = index.deposit_eth(amount)
+        results.append({
+            "eth": amount,
+            "keys": deposit.keys,
+            "stop_queue_index": deposit.stop_queue_index,
+            "remaining_in_batch": deposit.remaining_in_batch,
+            "operators": [{"id": no_id, "keys": keys} for no_id, keys in deposit.operators.items()],
+        })
+    return {"block_number": snapshot.get("block_number"), "queue_keys": index.total_keys, "results": results}
 
 
 @app.get("/csm/snapshot", response_class=HTMLResponse, tags=["ui"])
-async def csm_snapshot(request: Request, service: CsmService = Depends(deps.get_csm_service)) -> Response:
+async def csm_snapshot(
+    request: Request,
+    service: CsmService = Depends(deps.get_csm_service),
+    follower: Optional[BlockFollower] = Depends(deps.get_follower),
+    cache: Optional[SnapshotCache] = Depends(deps.get_snapshot_cache),
+) -> Response:
     """Generate a self-contained HTML snapshot of the CSM page with embedded data.
 
     The resulting page does not fetch the backend; it embeds the current API data
-    (including block number) and renders client-side.
+    (including block number) and renders client-side. Rendered once per block.
     """
-    data = service.snapshot()
-    html = templates.TemplateResponse(
-        request, "csm.html", {"title": "CSM Queue (Snapshot)", "mode": "embedded", "initial_data_json": json.dumps(data)},
-    )
-    html.headers["Content-Disposition"] = (
-        f"attachment; filename=\"csm_snapshot_block_{data.get('block_number') or 'latest'}.html\""
-    )
-    return html
+    response = Response()
+    data = await _load_csm(response, service, follower)
+    block = data.get("block_number")
+    response.headers["Content-Disposition"] = f"attachment; filename=\"csm_snapshot_block_{block or 'latest'}.html\""
+
+    def render() -> bytes:
+        page = templates.TemplateResponse(
+            request,
+            "csm.html",
+            {
+                "title": "CSM Queue (Snapshot)",
+                "mode": "embedded",
+                "initial_data_json": dumps(snapshot_to_json(data)).decode(),
+            },
+        )
+        return bytes(page.body)
+
+    return await _encoded_response(request, response, cache, "csm-html", block, render, "text/html; charset=utf-8")
@@ -0,0 +1,292 @@
+"""Prometheus metrics: a minimal in-process registry rendered in the text exposition format.
+
+Recording a value is a dict update under a lock (a bisect more for histograms), so the
+instrumentation can stay on the hot paths. Served by `GET /metrics`.
+"""
+from __future__ import annotations
+
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from web3.middleware import Web3Middleware
+
+
+_TIME_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 5000)
+
+_registry: List["_Metric"] = []
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(str(v))}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, doc: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.doc = doc
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.doc}", f"# TYPE {self.name} {self.kind}", *self._samples()]
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, doc: str, labelnames: Sequence[str] = ()) -> None:
+        super().__init__(name, doc, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_labels(self.labelnames, k)} {v:g}" for k, v in items]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, *labels: str) -> None:
+        with self._lock:
+            self._values[labels] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self, name: str, doc: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = _TIME_BUCKETS
+    ) -> None:
+        super().__init__(name, doc, labelnames)
+        self.buckets = tuple(buckets)
+        # labels -> [per-bucket counts (last one is +Inf), sum]
+        self._values: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        pos = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                entry = self._values[labels] = ([0] * (len(self.buckets) + 1), [0.0])
+            entry[0][pos] += 1
+            entry[1][0] += value
+
+    def count(self, *labels: str) -> int:
+        entry = self._values.get(labels)
+        return sum(entry[0]) if entry is not None else 0
+
+    @contextmanager
+    def time(self, *labels: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *labels)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((k, (list(c), s[0])) for k, (c, s) in self._values.items())
+        out = []
+        for labels, (counts, total) in items:
+            cumulative = 0
+            for bound, n in zip([*self.buckets, float("inf")], counts):
+                cumulative += n
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{bound:g}"'
+                out.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}")
+            out.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {total:g}")
+            out.append(f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}")
+        return out
+
+
+def render() -> str:
+    """All metrics in the Prometheus text exposition format (version 0.0.4)."""
+    lines: List[str] = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+RPC_REQUESTS = Counter(
+    "rpc_requests_total", "JSON-RPC requests by method and contract function (eth_call)", ("method", "function")
+)
+RPC_ERRORS = Counter(
+    "rpc_request_errors_total", "JSON-RPC requests that raised or returned an error", ("method", "function")
+)
+RPC_SECONDS = Histogram(
+    "rpc_request_seconds", "JSON-RPC request latency as seen by the app", ("method", "function")
+)
+CONTRACT_CALLS = Counter(
+    "rpc_contract_calls_total", "Contract view calls, aggregated ones (Multicall3, batches) included", ("function",)
+)
+CONTRACT_CALL_ERRORS = Counter(
+    "rpc_contract_call_errors_total", "Contract view calls that reverted or could not be decoded", ("function",)
+)
+BUILD_RPC_REQUESTS = Histogram(
+    "snapshot_rpc_requests", "JSON-RPC requests per CSM snapshot / module list build", ("kind",), _COUNT_BUCKETS
+)
+STAGE_SECONDS = Histogram(
+    "snapshot_stage_seconds",
+    "Time per snapshot stage: get_queue, list_node_operators, compute_positions, serialize",
+    ("stage",),
+)
+QUEUE_BATCHES = Gauge("csm_queue_batches", "Batches in the CSM deposit queue at the last built snapshot")
+NODE_OPERATORS = Gauge("csm_node_operators", "CSM node operators at the last built snapshot")
+HTTP_SECONDS = Histogram(
+    "http_request_seconds", "API request latency by route", ("method", "route", "status")
+)
+
+
+# 4-byte selector (0x-prefixed hex) -> function name, for labelling eth_calls
+_selectors: Dict[str, str] = {}
+# RPC requests of the build running in this context (see `count_rpc`)
+_rpc_counter: ContextVar[Optional[List[int]]] = ContextVar("rpc_counter", default=None)
+
+
+def register_functions(abi: Sequence[Dict[str, Any]]) -> None:
+    """Remember the selectors of the functions in `abi` so their eth_calls are labelled by name."""
+    from eth_utils import function_abi_to_4byte_selector  # type: ignore
+
+    for entry in abi:
+        if entry.get("type") == "function":
+            _selectors.setdefault("0x" + bytes(function_abi_to_4byte_selector(entry)).hex(), entry["name"])
+
+
+def _function(method: str, params: Any) -> str:
+    if method != "eth_call" or not params or not isinstance(params[0], dict):
+        return ""
+    data = params[0].get("data") or params[0].get("input") or ""
+    if not isinstance(data, str):
+        data = "0x" + bytes(data).hex()
+    return _selectors.get(data[:10].lower(), "unknown")
+
+
+def observe_rpc(method: str, params: Any, seconds: float, ok: bool) -> None:
+    function = _function(method, params)
+    RPC_REQUESTS.inc(method, function)
+    if not ok:
+        RPC_ERRORS.inc(method, function)
+    RPC_SECONDS.observe(seconds, method, function)
+    counter = _rpc_counter.get()
+    if counter is not None:
+        counter[0] += 1
+
+
+def observe_contract_calls(calls: Sequence[Any], results: Sequence[Any]) -> None:
+    """Count aggregated calls (bound functions with `fn_name`) and their failed `CallResult`s."""
+    names = [getattr(fn, "fn_name", "unknown") for fn in calls]
+    for name, n in _tally(names).items():
+        CONTRACT_CALLS.inc(name, amount=n)
+    failed = [name for name, result in zip(names, results) if not result.success]
+    for name, n in _tally(failed).items():
+        CONTRACT_CALL_ERRORS.inc(name, amount=n)
+
+
+def _tally(names: Sequence[str]) -> Dict[str, int]:
+    out: Dict[str, int] = {}
+    for name in names:
+        out[name] = out.get(name, 0) + 1
+    return out
+
+
+@contextmanager
+def count_rpc(kind: str) -> Iterator[None]:
+    """Record the number of JSON-RPC requests made in this block (and the tasks it starts)."""
+    counter = [0]
+    token = _rpc_counter.set(counter)
+    try:
+        yield
+    finally:
+        _rpc_counter.reset(token)
+        BUILD_RPC_REQUESTS.observe(counter[0], kind)
+
+
+def _response_ok(response: Any) -> bool:
+    return not (isinstance(response, dict) and response.get("error") is not None)
+
+
+class RpcMetricsMiddleware(Web3Middleware):
+    """web3 middleware recording every request made through a `Web3` / `AsyncWeb3` instance."""
+
+    def wrap_make_request(self, make_request: Callable[..., Any]) -> Callable[..., Any]:
+        def middleware(method: Any, params: Any) -> Any:
+            started = time.perf_counter()
+            ok = False
+            try:
+                response = make_request(method, params)
+                ok = _response_ok(response)
+                return response
+            finally:
+                observe_rpc(method, params, time.perf_counter() - started, ok)
+
+        return middleware
+
+    async def async_wrap_make_request(self, make_request: Callable[..., Any]) -> Callable[..., Any]:
+        async def middleware(method: Any, params: Any) -> Any:
+            started = time.perf_counter()
+            ok = False
+            try:
+                response = await make_request(method, params)
+                ok = _response_ok(response)
+                return response
+            finally:
+                observe_rpc(method, params, time.perf_counter() - started, ok)
+
+        return middleware
+
+
+def instrument_web3(w3: Any) -> Any:
+    """Add `RpcMetricsMiddleware` to `w3` (once) and return it."""
+    if "rpc_metrics" not in w3.middleware_onion:
+        w3.middleware_onion.add(RpcMetricsMiddleware, name="rpc_metrics")
+    return w3
+
+
+class RouteMetricsMiddleware:
+    """ASGI middleware timing each HTTP request, labelled by its route's path template."""
+
+    def __init__(self, app: Any) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        status = [500]
+
+        async def send_status(message: Dict[str, Any]) -> None:
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_status)
+        finally:
+            route = getattr(scope.get("route"), "path", None) or "other"
+            HTTP_SECONDS.observe(time.perf_counter() - started, scope["method"], route, str(status[0]))
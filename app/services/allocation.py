@@ -0,0 +1,278 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+import math
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from app.models import Module
+
+
+VALIDATOR_ETH = 32
+
+
+@dataclass
+class ModuleAllocation:
+    module: Module
+    # Validators (and ETH) the module receives from the simulated deposit
+    add_validators: int
+    # Share of all validators after the deposit, in percent
+    share_pct: float
+    # Further validators the module could still take before hitting its limit or capacity
+    headroom_validators: int
+
+    @property
+    def add_eth(self) -> int:
+        return self.add_validators * VALIDATOR_ETH
+
+    @property
+    def headroom_eth(self) -> int:
+        return self.headroom_validators * VALIDATOR_ETH
+
+
+@dataclass
+class AllocationResult:
+    eth: float
+    # Validators deposited: min(eth // 32, total depositable validators)
+    validators: int
+    # Active validators of all modules after the deposit
+    total_validators: int
+    modules: List[ModuleAllocation]
+
+
+@dataclass
+class _Slot:
+    active: int
+    depositable: int
+    limit_frac: Optional[float]
+    eligible: bool
+    # Validators after the deposit can not exceed this (capacity and share limit)
+    max_after: int
+
+
+def is_eligible(m: Module) -> bool:
+    """Whether the module can receive deposits (not paused, stopped or inactive)."""
+    return not (m.is_deposits_paused is True or m.is_stopped is True or m.is_active is False)
+
+
+def max_after(active: int, depositable: int, limit_frac: Optional[float], eligible: bool, total_final: int) -> int:
+    """Most validators a module can end up with when the total grows to `total_final`."""
+    if not eligible:
+        return active
+    cap = active + depositable
+    if limit_frac is not None:
+        # Limit rounds up in validator units
+        cap = min(cap, math.ceil(limit_frac * total_final))
+    return cap
+
+
+def _slots(modules: Sequence[Module], total_final: int) -> List[_Slot]:
+    out = []
+    for m in modules:
+        active = m.active_validators or 0
+        depositable = m.depositable_validators or 0
+        limit_frac = m.target_share_bps / 10000 if m.target_share_bps is not None else None
+        eligible = is_eligible(m)
+        cap = max_after(active, depositable, limit_frac, eligible, total_final)
+        out.append(_Slot(active, depositable, limit_frac, eligible, cap))
+    return out
+
+
+def water_fill(starts: Sequence[int], caps: Sequence[int], amount: int) -> List[int]:
+    """Hand out `amount` units one at a time to the lowest entry below its cap.
+
+    Ties go to the earliest entry. Computed in O(M log M) from the breakpoints of the fill
+    curve: a level L is raised until the units run out, then the remainder goes to the
+    first entries (in order) sitting exactly at L. Units nobody can take stay unassigned.
+    """
+    deltas: Dict[int, int] = {}
+    for start, cap in zip(starts, caps):
+        if start < cap:
+            deltas[start] = deltas.get(start, 0) + 1
+            deltas[cap] = deltas.get(cap, 0) - 1
+    if not deltas:
+        return list(starts)
+    points = sorted(deltas)
+    level, extra = points[-1], 0
+    remaining, slope = amount, 0
+    for pos, point in enumerate(points):
+        # `slope` entries are filling between this breakpoint and the next
+        slope += deltas[point]
+        nxt = points[pos + 1] if pos + 1 < len(points) else None
+        if slope > 0 and (nxt is None or remaining < slope * (nxt - point)):
+            level, extra = point + remaining // slope, remaining % slope
+            break
+        if nxt is not None:
+            remaining -= slope * (nxt - point)
+    out = []
+    for start, cap in zip(starts, caps):
+        after = min(cap, level) if start < min(cap, level) else start
+        if extra and after == level and after < cap:
+            after += 1
+            extra -= 1
+        out.append(after)
+    return out
+
+
+def _headroom(slot: _Slot, after: int, total_final: int) -> int:
+    """Validators the module could take on top of `after`, as the cap grows with the total.
+
+    Largest m <= remaining depositable with `after + m <= ceil(f * (total_final + m))`: solved
+    in closed form, then nudged with the exact (floating point) predicate.
+    """
+    remaining = max(0, slot.depositable - (after - slot.active))
+    if remaining <= 0:
+        return 0
+    f = slot.limit_frac
+    if f is None or not f > 0 or not slot.eligible or f >= 1:
+        # f >= 1: the cap never binds before capacity does
+        return remaining
+
+    def fits(m: int) -> bool:
+        return after + m <= min(slot.active + slot.depositable, math.ceil(f * (total_final + m)))
+
+    # ceil(x) >= y  <=>  x > y - 1, so m < (f * T - after + 1) / (1 - f)
+    bound = (f * total_final - after + 1) / (1 - f)
+    m = min(remaining, max(0, math.ceil(bound) - 1))
+    while m < remaining and fits(m + 1):
+        m += 1
+    while m > 0 and not fits(m):
+        m -= 1
+    return m
+
+
+def current_shares(modules: Sequence[Module]) -> List[float]:
+    """Share of active validators per module, in percent (0 when nothing is active)."""
+    total = sum(m.active_validators or 0 for m in modules)
+    return [((m.active_validators or 0) / total * 100) if total > 0 else 0 for m in modules]
+
+
+def simulate_lowest_share_first(modules: Sequence[Module], eth: float) -> AllocationResult:
+    """Allocate `eth` across modules the way the StakingRouter does: lowest share first.
+
+    Each validator goes to the eligible module (not paused/stopped/inactive) with the fewest
+    validators, capped by its depositable capacity and its share limit of the final total.
+    Same result as `simulateLowestShareFirst` in the simulator page, in O(M log M).
+    """
+    wanted = max(0, math.floor(float(eth) / VALIDATOR_ETH))
+    validators, total_final, slots, afters = _allocate(modules, wanted)
+    shares = current_shares(modules) if total_final <= 0 else None
+    out = []
+    for pos, (m, slot, after) in enumerate(zip(modules, slots, afters)):
+        out.append(
+            ModuleAllocation(
+                module=m,
+                add_validators=after - slot.active,
+                share_pct=(after / total_final) * 100 if total_final > 0 else shares[pos],  # type: ignore[index]
+                headroom_validators=_headroom(slot, after, total_final),
+            )
+        )
+    return AllocationResult(eth=eth, validators=validators, total_validators=total_final, modules=out)
+
+
+def _allocate(modules: Sequence[Module], wanted: int) -> Tuple[int, int, List[_Slot], List[int]]:
+    total_depositable = sum(m.depositable_validators or 0 for m in modules)
+    validators = min(wanted, total_depositable)
+    total_final = sum(m.active_validators or 0 for m in modules) + validators
+    slots = _slots(modules, total_final)
+    starts = [s.active for s in slots]
+    caps = [s.max_after for s in slots]
+    return validators, total_final, slots, water_fill(starts, caps, validators)
+
+
+@dataclass
+class AllocationSweep:
+    """`simulate_lowest_share_first` for many ETH amounts at once.
+
+    NumPy arrays, indexed by [amount] or [amount, module] (modules in input order).
+    """
+
+    modules: List[Module]
+    eth: Any
+    validators: Any
+    total_validators: Any
+    add_validators: Any
+    share_pct: Any
+    headroom_validators: Any
+
+
+def sweep_lowest_share_first(modules: Sequence[Module], eth_amounts: Sequence[float]) -> AllocationSweep:
+    """Simulate every amount of `eth_amounts` in one vectorized pass.
+
+    Per amount, the start and cap breakpoints of the fill curve are sorted and the fill cost
+    is evaluated at each of them, so the level is located by comparison instead of by
+    simulation. Costs O(K * M^2) for K amounts and M modules; results equal the scalar engine.
+    """
+    import numpy as np  # type: ignore
+
+    eth = np.asarray(eth_amounts, dtype=float).reshape(-1)
+    active = np.array([m.active_validators or 0 for m in modules], dtype=np.int64)
+    depositable = np.array([m.depositable_validators or 0 for m in modules], dtype=np.int64)
+    has_limit = np.array([m.target_share_bps is not None for m in modules], dtype=bool)
+    frac = np.array([m.target_share_bps / 10000 if m.target_share_bps is not None else 0.0 for m in modules])
+    eligible = np.array([is_eligible(m) for m in modules], dtype=bool)
+
+    validators = np.minimum(np.maximum(0, np.floor(eth / VALIDATOR_ETH)).astype(np.int64), depositable.sum())
+    total = active.sum() + validators
+    if not modules:
+        empty = np.zeros((len(eth), 0), dtype=np.int64)
+        return AllocationSweep([], eth, validators, total, empty, empty.astype(float), empty)
+    # Caps per amount: capacity, and the share limit of that amount's final total (rounded up)
+    caps = np.broadcast_to(np.where(eligible, active + depositable, active), (len(eth), len(modules)))
+    limit_caps = np.ceil(frac[None, :] * total[:, None]).astype(np.int64)
+    caps = np.where(eligible & has_limit, np.minimum(caps, limit_caps), caps)
+    filling = caps > active
+    room = np.where(filling, caps - active, 0)
+
+    points = np.sort(np.concatenate([np.broadcast_to(active, caps.shape), caps], axis=1), axis=1)
+    # Validators needed to raise every module to each breakpoint (non-decreasing along a row)
+    cost = np.clip(points[:, :, None] - active[None, None, :], 0, room[:, None, :]).sum(axis=2)
+    rows = np.arange(len(eth))
+    last = (cost <= validators[:, None]).sum(axis=1) - 1
+    point = points[rows, last]
+    slope = (filling & (active <= point[:, None]) & (point[:, None] < caps)).sum(axis=1)
+    rest = validators - cost[rows, last]
+    level = np.where(slope > 0, point + rest // np.maximum(slope, 1), point)
+    extra = np.where(slope > 0, rest % np.maximum(slope, 1), 0)
+
+    target = np.minimum(caps, level[:, None])
+    after = np.where(filling & (active < target), target, active)
+    # The remainder goes to the first modules (in order) sitting exactly at the level
+    at_level = filling & (after == level[:, None]) & (after < caps)
+    after = after + (at_level & (np.cumsum(at_level, axis=1) <= extra[:, None]))
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        share = np.where(total[:, None] > 0, (after / total[:, None]) * 100, np.array(current_shares(modules)))
+        headroom = _sweep_headroom(np, active, depositable, frac, has_limit & eligible, after, total)
+    return AllocationSweep(
+        modules=list(modules),
+        eth=eth,
+        validators=validators,
+        total_validators=total,
+        add_validators=after - active,
+        share_pct=share,
+        headroom_validators=headroom,
+    )
+
+
+def _sweep_headroom(np: Any, active: Any, depositable: Any, frac: Any, limited: Any, after: Any, total: Any) -> Any:
+    """Vectorized `_headroom`: closed form, then nudged with the exact predicate."""
+    remaining = np.maximum(0, depositable - (after - active))
+    limited = limited & (frac > 0) & (frac < 1) & (remaining > 0)
+    t = total[:, None]
+
+    def fits(m: Any) -> Any:
+        return after + m <= np.minimum(active + depositable, np.ceil(frac * (t + m)))
+
+    bound = np.nan_to_num((frac * t - after + 1) / (1 - frac))
+    m = np.where(limited, np.clip(np.ceil(bound) - 1, 0, remaining), remaining).astype(np.int64)
+    while True:
+        up = limited & (m < remaining) & fits(m + 1)
+        if not up.any():
+            break
+        m = m + up
+    while True:
+        down = limited & (m > 0) & ~fits(m)
+        if not down.any():
+            break
+        m = m - down
+    return m
@@ -0,0 +1,250 @@
+from __future__ import annotations
+
+from array import array
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+
+# Value stored in signed columns for None / "not in the queue"
+_NONE = -1
+_MASK64 = (1 << 64) - 1
+# Derived views kept per OperatorColumns (see `OperatorColumns.view`)
+_MAX_VIEWS = 16
+
+
+def decode_batches(words: Sequence[int]) -> Tuple[array, array]:
+    """Decode packed queue Batch words into (node_operator_id, count) columns.
+
+    A Batch uint256 holds nodeOperatorId (bits 192..255), keysCount (128..191) and next
+    (0..127). Whole-column shifts are about twice as fast as viewing the words as uint64
+    limbs with NumPy, which first has to serialize every word to bytes.
+    """
+    words = [int(w) for w in words]
+    return array("Q", [w >> 192 for w in words]), array("Q", [(w >> 128) & _MASK64 for w in words])
+
+
+@dataclass
+class QueueColumns:
+    """CSM deposit queue batches as parallel uint64 columns, sorted by queue index.
+
+    Reads as a sequence of {"index", "node_operator_id", "count"} dicts, built on access;
+    `to_dicts` is meant for the API boundary only.
+    """
+
+    index: array = field(default_factory=lambda: array("Q"))
+    node_operator_id: array = field(default_factory=lambda: array("Q"))
+    count: array = field(default_factory=lambda: array("Q"))
+
+    @classmethod
+    def decode(cls, indices: Iterable[int], words: Sequence[int]) -> "QueueColumns":
+        ids, counts = decode_batches(words)
+        return cls(array("Q", indices), ids, counts)
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def __getitem__(self, pos: int) -> Dict[str, int]:
+        return {"index": self.index[pos], "node_operator_id": self.node_operator_id[pos], "count": self.count[pos]}
+
+    def __iter__(self) -> Iterator[Dict[str, int]]:
+        for i, no_id, cnt in self.rows():
+            yield {"index": i, "node_operator_id": no_id, "count": cnt}
+
+    def rows(self) -> Iterator[Tuple[int, int, int]]:
+        return zip(self.index, self.node_operator_id, self.count)
+
+    def to_dicts(self) -> List[Dict[str, int]]:
+        return list(self)
+
+    def copy(self) -> "QueueColumns":
+        return QueueColumns(array("Q", self.index), array("Q", self.node_operator_id), array("Q", self.count))
+
+    def find(self, index: int) -> Optional[int]:
+        """Position of the batch at queue `index`, or None."""
+        pos = bisect_left(self.index, index)
+        return pos if pos < len(self.index) and self.index[pos] == index else None
+
+    def drop_before(self, index: int) -> None:
+        """Remove batches below queue `index` (dequeued by deposits)."""
+        cut = bisect_left(self.index, index)
+        if cut:
+            del self.index[:cut], self.node_operator_id[:cut], self.count[:cut]
+
+    def update(self, other: "QueueColumns") -> None:
+        """Overwrite batches present in both; append the rest, which must follow the last batch."""
+        start = 0
+        for start, (i, no_id, cnt) in enumerate(other.rows()):
+            pos = self.find(i)
+            if pos is None:
+                break
+            self.node_operator_id[pos], self.count[pos] = no_id, cnt
+        else:
+            return
+        self.index.extend(other.index[start:])
+        self.node_operator_id.extend(other.node_operator_id[start:])
+        self.count.extend(other.count[start:])
+
+
+# Operator record fields stored as signed columns, in record order
+_OPERATOR_FIELDS = ("id", "deposited_keys", "depositable_keys", "enqueued_keys")
+_POSITION_FIELDS = ("first_queue_index", "queued_keys_total", "position_keys_ahead")
+
+
+@dataclass
+class OperatorColumns:
+    """Node operator records (see `CsmService.list_node_operators`) plus their queue positions
+    as parallel columns; reads as a sequence of the original record dicts, built on access."""
+
+    id: array = field(default_factory=lambda: array("q"))
+    deposited_keys: array = field(default_factory=lambda: array("q"))
+    depositable_keys: array = field(default_factory=lambda: array("q"))
+    enqueued_keys: array = field(default_factory=lambda: array("q"))
+    # 1 / 0, or -1 when unknown
+    is_active: array = field(default_factory=lambda: array("b"))
+    # -1 for operators without batches in the queue
+    first_queue_index: array = field(default_factory=lambda: array("q"))
+    queued_keys_total: array = field(default_factory=lambda: array("q"))
+    position_keys_ahead: array = field(default_factory=lambda: array("q"))
+    # node operator id -> row, built on first lookup
+    _rows: Optional[Dict[int, int]] = field(default=None, compare=False, repr=False)
+    # key -> value derived from the columns, dropped when they change
+    _views: Dict[Any, Any] = field(default_factory=dict, compare=False, repr=False)
+
+    @classmethod
+    def from_records(
+        cls, records: Iterable[Mapping[str, Any]], positions: Optional[Mapping[int, Mapping[str, int]]] = None
+    ) -> "OperatorColumns":
+        out = cls()
+        positions = positions or {}
+        for op in records:
+            for name in _OPERATOR_FIELDS:
+                value = op.get(name)
+                getattr(out, name).append(_NONE if value is None else int(value))
+            active = op.get("is_active")
+            out.is_active.append(_NONE if active is None else int(bool(active)))
+            pos = positions.get(int(op["id"])) or {}
+            for name in _POSITION_FIELDS:
+                getattr(out, name).append(int(pos.get(name, _NONE)))
+        return out
+
+    def __len__(self) -> int:
+        return len(self.id)
+
+    def __getitem__(self, row: int) -> Dict[str, Any]:
+        return self.record(row)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for row in range(len(self.id)):
+            yield self.record(row)
+
+    def record(self, row: int) -> Dict[str, Any]:
+        out: Dict[str, Any] = {}
+        for name in _OPERATOR_FIELDS:
+            value = getattr(self, name)[row]
+            out[name] = None if value == _NONE else value
+        active = self.is_active[row]
+        out["is_active"] = None if active == _NONE else bool(active)
+        if self.first_queue_index[row] != _NONE:
+            for name in _POSITION_FIELDS:
+                out[name] = getattr(self, name)[row]
+        return out
+
+    def copy(self) -> "OperatorColumns":
+        return OperatorColumns(**{name: array(col.typecode, col) for name, col in self.columns()})
+
+    def update(self, other: "OperatorColumns") -> None:
+        """Overwrite the rows of operators present in both; append the rest."""
+        self._views.clear()
+        if other.id == self.id:
+            # Every row changed (e.g. queue positions after a deposit): swap whole columns
+            for name, col in self.columns():
+                col[:] = getattr(other, name)
+            return
+        if self._rows is None:
+            self._rows = {no_id: row for row, no_id in enumerate(self.id)}
+        rows = [self._rows.get(no_id) for no_id in other.id]
+        added = [pos for pos, row in enumerate(rows) if row is None]
+        for name, col in self.columns():
+            src = getattr(other, name)
+            for pos, row in enumerate(rows):
+                if row is not None:
+                    col[row] = src[pos]
+            col.extend(src[pos] for pos in added)
+        for row, pos in enumerate(added, start=len(self.id) - len(added)):
+            self._rows[other.id[pos]] = row
+
+    def columns(self, positions: bool = True) -> Iterator[Tuple[str, array]]:
+        """(name, column) pairs, in record order; without the queue position columns if not `positions`."""
+        for name in _OPERATOR_FIELDS + ("is_active",) + (_POSITION_FIELDS if positions else ()):
+            yield name, getattr(self, name)
+
+    def set_positions(self, positions: Mapping[int, Mapping[str, int]]) -> None:
+        """Overwrite the queue position columns (node operator id -> fields, see `from_records`)."""
+        self._views.clear()
+        for name in _POSITION_FIELDS:
+            values = (int((positions.get(no_id) or {}).get(name, _NONE)) for no_id in self.id)
+            getattr(self, name)[:] = array("q", values)
+
+    def get(self, no_id: int) -> Optional[Dict[str, Any]]:
+        """Record of node operator `no_id`, or None."""
+        if self._rows is None:
+            self._rows = {no_id: row for row, no_id in enumerate(self.id)}
+        row = self._rows.get(no_id)
+        return None if row is None else self.record(row)
+
+    def view(self, key: Any, build: Callable[[], Any]) -> Any:
+        """`build()`, computed once per `key` while the columns are unchanged.
+
+        For indexes derived from the whole snapshot, such as the filtered operator order of the
+        paginated endpoints; the oldest of more than `_MAX_VIEWS` keys is dropped.
+        """
+        try:
+            return self._views[key]
+        except KeyError:
+            pass
+        value = build()
+        if len(self._views) >= _MAX_VIEWS:
+            self._views.pop(next(iter(self._views)), None)
+        self._views[key] = value
+        return value
+
+    def depositable(self) -> Dict[int, int]:
+        """node operator id -> depositable keys, for operators where it is known."""
+        return {no_id: keys for no_id, keys in zip(self.id, self.depositable_keys) if keys != _NONE}
+
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        return list(self)
+
+
+def queue_columns(items: Any) -> QueueColumns:
+    """`items` as QueueColumns: as is when columnar, else built from {"index", ...} dicts."""
+    if isinstance(items, QueueColumns):
+        return items
+    out = QueueColumns()
+    for it in items or []:
+        out.index.append(int(it["index"]))
+        out.node_operator_id.append(int(it["node_operator_id"]))
+        out.count.append(int(it["count"]))
+    return out
+
+
+def operator_columns(ops: Any) -> OperatorColumns:
+    """`ops` as OperatorColumns: as is when columnar, else built from records with their positions."""
+    if isinstance(ops, OperatorColumns):
+        return ops
+    ops = list(ops or [])
+    # Plain records already carry their queue position fields
+    return OperatorColumns.from_records(ops, {int(op["id"]): op for op in ops})
+
+
+def snapshot_to_json(snapshot: Dict[str, Any]) -> Dict[str, Any]:
+    """CSM snapshot with its columnar parts converted to plain lists of dicts."""
+    queue = snapshot.get("queue")
+    operators = snapshot.get("node_operators")
+    out = dict(snapshot)
+    if isinstance(queue, dict) and isinstance(queue.get("items"), QueueColumns):
+        out["queue"] = {**queue, "items": queue["items"].to_dicts()}
+    if isinstance(operators, OperatorColumns):
+        out["node_operators"] = operators.to_dicts()
+    return out
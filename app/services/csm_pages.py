@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+from array import array
+from bisect import bisect_left
+from dataclasses import dataclass, replace
+from typing import Any, Dict, FrozenSet, List, Mapping, Optional, Tuple
+
+from app.services.csm_columns import OperatorColumns, operator_columns, queue_columns
+
+
+@dataclass(frozen=True)
+class CsmFilters:
+    """Filters of the paginated CSM endpoints; all given ones must hold."""
+
+    # Only active node operators (or their batches)
+    active_only: bool = False
+    # Only node operators with depositable keys (or their batches)
+    has_depositable: bool = False
+    # Only node operators with batches in the queue; every queue item passes
+    in_queue: bool = False
+    operator_ids: Optional[FrozenSet[int]] = None
+
+
+@dataclass
+class Page:
+    """One page of records plus the cursor of the next one (None on the last page)."""
+
+    items: List[Dict[str, Any]]
+    next_cursor: Optional[int]
+
+
+def _matching_operators(ops: OperatorColumns, filters: CsmFilters) -> Optional[FrozenSet[int]]:
+    """Ids of operators passing the operator-level filters; None when nothing is filtered."""
+    if not (filters.active_only or filters.has_depositable or filters.in_queue):
+        return filters.operator_ids
+    ids = frozenset(
+        no_id
+        for no_id, active, depositable, first in zip(
+            ops.id, ops.is_active, ops.depositable_keys, ops.first_queue_index
+        )
+        if (not filters.active_only or active == 1)
+        and (not filters.has_depositable or depositable > 0)
+        and (not filters.in_queue or first >= 0)
+    )
+    return ids if filters.operator_ids is None else ids & filters.operator_ids
+
+
+def queue_page(snapshot: Mapping[str, Any], cursor: int, limit: int, filters: CsmFilters) -> Page:
+    """Queue items of `snapshot` from queue index `cursor` on, in queue order.
+
+    Operator filters apply to the operator owning each batch; `in_queue` is a no-op here.
+    """
+    queue = queue_columns((snapshot.get("queue") or {}).get("items"))
+    ops = operator_columns(snapshot.get("node_operators"))
+    filters = replace(filters, in_queue=False)
+    allowed = ops.view(("queue", filters), lambda: _matching_operators(ops, filters))
+    items: List[Dict[str, Any]] = []
+    for pos in range(bisect_left(queue.index, cursor), len(queue)):
+        if allowed is not None and queue.node_operator_id[pos] not in allowed:
+            continue
+        if len(items) == limit:
+            return Page(items, queue.index[pos])
+        items.append(queue[pos])
+    return Page(items, None)
+
+
+def _operator_order(ops: OperatorColumns, filters: CsmFilters) -> Tuple[array, array]:
+    """(ids, rows) of the operators passing `filters`, by ascending id."""
+    allowed = _matching_operators(ops, filters)
+    pairs = sorted((no_id, row) for row, no_id in enumerate(ops.id) if allowed is None or no_id in allowed)
+    return array("q", (no_id for no_id, _ in pairs)), array("q", (row for _, row in pairs))
+
+
+def operators_page(snapshot: Mapping[str, Any], cursor: int, limit: int, filters: CsmFilters) -> Page:
+    """Node operator records of `snapshot` from id `cursor` on, by ascending id.
+
+    The filtered order is computed on the first page and kept with the snapshot's operator
+    columns, so every further page of the same block and filters is a bisect and a slice.
+    """
+    ops = operator_columns(snapshot.get("node_operators"))
+    ids, rows = ops.view(("operators", filters), lambda: _operator_order(ops, filters))
+    start = bisect_left(ids, cursor)
+    end = min(start + limit, len(ids))
+    items = [ops.record(row) for row in rows[start:end]]
+    return Page(items, ids[end] if end < len(ids) else None)
@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+from app.services.csm_columns import OperatorColumns, QueueColumns
+
+
+KEY_ETH = 32
+
+
+@dataclass
+class QueueDeposit:
+    """Outcome of depositing `keys` keys through the CSM queue."""
+
+    # Keys deposited: the requested ones, or fewer when the queue runs out
+    keys: int
+    # Queue index of the batch the last key came from (None if nothing was deposited)
+    stop_queue_index: Optional[int] = None
+    # Keys of that batch left in the queue afterwards (0 if it was fully consumed)
+    remaining_in_batch: int = 0
+    # node operator id -> keys deposited, in queue order
+    operators: Dict[int, int] = field(default_factory=dict)
+
+
+class QueueIndex:
+    """Prefix sums over the CSM deposit queue, for FIFO deposit simulation.
+
+    Built in one walk over the queue items (in queue order). Batches are consumed from the
+    head, each at most by its operator's depositable keys still left (a batch of an operator
+    without depositable keys is skipped, as the contract does). `cumulative[i]` holds the
+    keys deposited once batches 0..i-1 are consumed; per operator, its batch positions and
+    cumulative keys are kept as well, so `deposit` costs O(log n) plus the operators reached,
+    and `operator` O(k) in the operator's k batches.
+    """
+
+    def __init__(
+        self,
+        items: Sequence[Mapping[str, Any]],
+        depositable: Optional[Mapping[int, int]] = None,
+        operators: Any = None,
+    ) -> None:
+        n = len(items)
+        # node operator id -> operator record, as served by the API (a mapping or OperatorColumns)
+        self.operators: Any = operators or {}
+        self.queue_indices: List[int] = [0] * n
+        self.operator_ids: List[int] = [0] * n
+        self.counts: List[int] = [0] * n
+        # Keys of all batches ahead of batch i, whether depositable or not
+        self.keys_ahead: List[int] = [0] * (n + 1)
+        # Keys deposited once batches 0..i-1 are consumed
+        self.cumulative: List[int] = [0] * (n + 1)
+        # node operator id -> its batch positions / cumulative deposited keys (leading 0)
+        self.operator_positions: Dict[int, List[int]] = {}
+        self.operator_cumulative: Dict[int, List[int]] = {}
+        left = dict(depositable) if depositable is not None else None
+        if isinstance(items, QueueColumns):
+            rows: Iterable[Tuple[int, int, int]] = items.rows()
+        else:
+            rows = (
+                (
+                    int(it["index"]) if "index" in it else int(it.get("idx", 0)),
+                    int(it["node_operator_id"]),
+                    int(it["count"]),
+                )
+                for it in items
+            )
+        for pos, (queue_index, no_id, count) in enumerate(rows):
+            usable = count
+            if left is not None:
+                usable = min(count, max(0, left.get(no_id, count)))
+                if no_id in left:
+                    left[no_id] -= usable
+            self.queue_indices[pos] = queue_index
+            self.operator_ids[pos] = no_id
+            self.counts[pos] = count
+            self.keys_ahead[pos + 1] = self.keys_ahead[pos] + count
+            self.cumulative[pos + 1] = self.cumulative[pos] + usable
+            positions = self.operator_positions.get(no_id)
+            if positions is None:
+                positions = self.operator_positions[no_id] = []
+                self.operator_cumulative[no_id] = [0]
+            positions.append(pos)
+            cumulative = self.operator_cumulative[no_id]
+            cumulative.append(cumulative[-1] + usable)
+        # Operators by first batch position, to list the ones a deposit reaches
+        self._by_first = sorted(self.operator_positions, key=lambda no_id: self.operator_positions[no_id][0])
+        self._first = [self.operator_positions[no_id][0] for no_id in self._by_first]
+
+    @classmethod
+    def from_snapshot(cls, snapshot: Mapping[str, Any]) -> "QueueIndex":
+        """Index a CSM snapshot; operators' `depositable_keys` cap what their batches yield."""
+        ops = snapshot.get("node_operators") or []
+        operators: Mapping[int, Any]
+        if isinstance(ops, OperatorColumns):
+            operators, depositable = ops, ops.depositable()
+        else:
+            operators = {int(op["id"]): op for op in ops}
+            depositable = {
+                no_id: int(op["depositable_keys"])
+                for no_id, op in operators.items()
+                if op.get("depositable_keys") is not None
+            }
+        return cls((snapshot.get("queue") or {}).get("items") or [], depositable, operators)
+
+    @property
+    def total_keys(self) -> int:
+        """Keys the whole queue can deposit."""
+        return self.cumulative[-1]
+
+    def positions(self) -> Dict[int, Dict[str, int]]:
+        """Queue position metrics per node operator (see `_CsmBase._compute_positions`)."""
+        out: Dict[int, Dict[str, int]] = {}
+        for no_id, positions in self.operator_positions.items():
+            first = positions[0]
+            out[no_id] = {
+                "first_queue_index": self.queue_indices[first],
+                "queued_keys_total": sum(self.counts[p] for p in positions),
+                "position_keys_ahead": self.keys_ahead[first],
+            }
+        return out
+
+    def operator(self, no_id: int) -> Optional[Dict[str, Any]]:
+        """Operator record plus its queue batches with the keys ahead of each; None if unknown."""
+        record = self.operators.get(no_id)
+        positions = self.operator_positions.get(no_id, [])
+        if record is None and not positions:
+            return None
+        out = dict(record) if record is not None else {"id": no_id}
+        out["batches"] = [
+            {"index": self.queue_indices[p], "count": self.counts[p], "keys_ahead": self.keys_ahead[p]}
+            for p in positions
+        ]
+        return out
+
+    def deposit(self, keys: int) -> QueueDeposit:
+        """Consume `keys` keys from the head of the queue."""
+        keys = min(max(0, keys), self.total_keys)
+        if keys <= 0:
+            return QueueDeposit(keys=0)
+        # Batch holding the last key: first position whose cumulative count reaches `keys`
+        stop = bisect_left(self.cumulative, keys) - 1
+        stop_operator = self.operator_ids[stop]
+        used = keys - self.cumulative[stop]
+        operators: Dict[int, int] = {}
+        for no_id in self._by_first[: bisect_right(self._first, stop)]:
+            # Batches before `stop` are consumed whole
+            got = self.operator_cumulative[no_id][bisect_left(self.operator_positions[no_id], stop)]
+            if no_id == stop_operator:
+                got += used
+            if got > 0:
+                operators[no_id] = got
+        return QueueDeposit(
+            keys=keys,
+            stop_queue_index=self.queue_indices[stop],
+            remaining_in_batch=self.counts[stop] - used,
+            operators=operators,
+        )
+
+    def deposit_eth(self, eth: float) -> QueueDeposit:
+        return self.deposit(int(eth // KEY_ETH))
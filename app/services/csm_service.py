@@ -1,27 +1,162 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import Any, Dict, List, Optional, Tuple
+import asyncio
+from dataclasses import dataclass, field
+import logging
+import threading
+from typing import Any, AsyncIterator, Awaitable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
 
+from app import metrics
 from app.config import Config
+from app.services.csm_columns import OperatorColumns, QueueColumns
+from app.services.csm_queue import QueueIndex
+from app.services.single_flight import SingleFlight
+from app.services.snapshot_cache import SnapshotCache
+
+
+logger = logging.getLogger(__name__)
 
 
 @dataclass
-class QueueItem:
-    index: int
-    node_operator_id: int
-    count: int
+class _QueueMirror:
+    """Local copy of the deposit queue [head, tail) as of `block`."""
+
+    block: int
+    block_hash: Any
+    head: int
+    tail: int
+    # Batches [head, tail) in queue order; mutated in place by syncs
+    items: QueueColumns = field(default_factory=QueueColumns)
+
+
+@dataclass
+class _OperatorMirror:
+    """Local copy of all node operator records as of `block`."""
+
+    block: int
+    block_hash: Any
+    # Block of the last full (non log-driven) read
+    reconciled_block: int
+    # node operator id -> record, in id order. Records are replaced, never mutated.
+    records: Dict[int, Dict[str, Any]] = field(default_factory=dict)
+
+
+# CSM events after which an operator's keys, deposits, vetting or active flag must be re-read
+OPERATOR_EVENTS = (
+    "NodeOperatorAdded",
+    "BatchEnqueued",
+    "TotalSigningKeysCountChanged",
+    "DepositableSigningKeysCountChanged",
+    "DepositedSigningKeysCountChanged",
+    "VettedSigningKeysCountChanged",
+    "VettedSigningKeysCountDecreased",
+    "ExitedSigningKeysCountChanged",
+    "StuckSigningKeysCountChanged",
+    "TargetValidatorsCountChanged",
+)
+
+
+def _queue_sync_indices(mirror: _QueueMirror, head: int, tail: int) -> List[int]:
+    """Queue indices to read when moving `mirror` to [head, tail): new batches plus the head batch."""
+    fetch = list(range(max(mirror.tail, head), tail))
+    if head < mirror.tail:
+        fetch.insert(0, head)
+    return fetch
+
+
+def _apply_queue_sync(
+    mirror: _QueueMirror,
+    block: int,
+    block_hash: Any,
+    head: int,
+    tail: int,
+    fetched: QueueColumns,
+) -> bool:
+    """Move `mirror` to `block` using items read at `_queue_sync_indices`.
+
+    Returns False (mirror untouched) when the head batch changed in a way other than a
+    partial deposit, i.e. the queue must be re-read.
+    """
+    old_pos, new_pos = mirror.items.find(head), fetched.find(head)
+    if old_pos is not None and new_pos is not None and not (
+        fetched.node_operator_id[new_pos] == mirror.items.node_operator_id[old_pos]
+        and fetched.count[new_pos] <= mirror.items.count[old_pos]
+    ):
+        return False
+    mirror.items.drop_before(head)
+    mirror.items.update(fetched)
+    mirror.block, mirror.block_hash = block, block_hash
+    mirror.head, mirror.tail = head, tail
+    return True
 
 
-class CsmService:
-    def __init__(self, cfg: Config, adapter: Any) -> None:
+def _operator_keys(ids: List[int], infos: List[Any]) -> Dict[int, Tuple[int, int, int]]:
+    """(deposited, depositable, enqueued) per id from getNodeOperator results; failures are left out."""
+    keys: Dict[int, Tuple[int, int, int]] = {}
+    for node_id, res in zip(ids, infos):
+        if not res.success:
+            continue
+        # Prefer compact summary from getNodeOperator (struct with depositable and deposited keys)
+        try:
+            info = res.value
+            # info layout per ABI
+            keys[node_id] = (int(info[2]), int(info[5]), int(info[9]))
+        except Exception:
+            pass
+    return keys
+
+
+def _operator_records(
+    ids: List[int], keys: Dict[int, Tuple[int, int, int]], actives: List[Any]
+) -> List[Dict[str, Any]]:
+    items: List[Dict[str, Any]] = []
+    for node_id, active in zip(ids, actives):
+        deposited, depositable, enqueued = keys[node_id]
+        # Active flag if available
+        is_active = bool(active.value) if active.success else None
+        items.append(
+            {
+                "id": int(node_id),
+                "deposited_keys": deposited,
+                "depositable_keys": depositable,
+                "enqueued_keys": enqueued,
+                "is_active": is_active,
+            }
+        )
+    return items
+
+
+def _operator_ids_from_logs(logs: Iterable[Any]) -> set:
+    """Node operator ids named (first indexed topic) by CSM logs."""
+    changed = set()
+    for log in logs:
+        topics = log["topics"]
+        if len(topics) > 1:
+            changed.add(int.from_bytes(bytes(topics[1]), "big"))
+    return changed
+
+
+class _CsmBase:
+    """State and I/O-free helpers shared by `CsmService` and `AsyncCsmService`."""
+
+    def __init__(self, cfg: Config, adapter: Any, cache: Optional[SnapshotCache] = None) -> None:
         self.cfg = cfg
         self.adapter = adapter
+        self.cache = cache
+        # Concurrent snapshots share a build when there is no cache entry to share (see `snapshot`)
+        self.flights = SingleFlight()
         if not cfg.csm_address:
             raise RuntimeError(
                 "COMMUNITY_STAKING_MODULE_ADDRESS is not set. Provide the CSM contract address."
             )
         self._contract = adapter.contract(cfg.csm_address, cfg.csm_abi)
+        self._queue_mirror: Optional[_QueueMirror] = None
+        # Incremental queue sync counters: full re-reads, incremental syncs, items fetched
+        self.queue_sync_stats: Dict[str, int] = {"full": 0, "incremental": 0, "items_fetched": 0}
+        self._operators_mirror: Optional[_OperatorMirror] = None
+        self.operator_sync_stats: Dict[str, int] = {"full": 0, "incremental": 0, "operators_fetched": 0}
+        self._operator_topics: Optional[List[str]] = None
+        self._queue_index: Optional[Tuple[int, QueueIndex]] = None
 
     @staticmethod
     def _decode_batch(packed: int) -> Tuple[int, int]:
@@ -38,126 +173,511 @@ class CsmService:
         count = int(hi128 & ((1 << 64) - 1))
         return node_operator_id, count
 
-    def get_queue(self) -> Dict[str, Any]:
-        head, tail = self._contract.functions.depositQueue().call()
-        head_i = int(head)
-        tail_i = int(tail)
-        items: List[QueueItem] = []
-        for i in range(head_i, tail_i):
-            packed = int(self._contract.functions.depositQueueItem(i).call())
-            no_id, cnt = self._decode_batch(packed)
-            items.append(QueueItem(index=i, node_operator_id=no_id, count=cnt))
+    @staticmethod
+    def _queue_dict(head: int, tail: int, items: QueueColumns) -> Dict[str, Any]:
+        # Items stay columnar; `snapshot_to_json` turns them into dicts for the API
+        return {"head": head, "tail": tail, "size": max(0, tail - head), "items": items}
+
+    def _operator_log_filters(self, from_block: int, to_block: int) -> List[Dict[str, Any]]:
+        """eth_getLogs filters for OPERATOR_EVENTS, split into CSM_LOG_BLOCK_RANGE chunks."""
+        if self._operator_topics is None:
+            from eth_utils import event_abi_to_log_topic  # type: ignore
+
+            self._operator_topics = [
+                "0x" + bytes(event_abi_to_log_topic(e)).hex()
+                for e in self._contract.abi
+                if e.get("type") == "event" and e.get("name") in OPERATOR_EVENTS
+            ]
+        step = max(1, self.cfg.csm_log_block_range)
+        return [
+            {
+                "address": self._contract.address,
+                "fromBlock": start,
+                "toBlock": min(to_block, start + step - 1),
+                "topics": [self._operator_topics],
+            }
+            for start in range(from_block, to_block + 1, step)
+        ]
+
+    @staticmethod
+    def _compute_positions(queue_items: Sequence[Dict[str, Any]]) -> Dict[int, Dict[str, int]]:
+        """Compute queue position metrics per node operator.
+
+        For each node operator id, returns first occurrence index, total queued keys, and
+        the number of keys ahead of their first batch (position_keys_ahead).
+        """
+        return QueueIndex(queue_items).positions()
+
+    def queue_index(self, snapshot: Dict[str, Any]) -> QueueIndex:
+        """FIFO deposit index of `snapshot`; the one of the latest indexed block is kept."""
+        block = snapshot.get("block_number")
+        cached = self._queue_index
+        if block is not None and cached is not None and cached[0] == block:
+            return cached[1]
+        index = QueueIndex.from_snapshot(snapshot)
+        if block is not None:
+            self._queue_index = (block, index)
+        return index
+
+    @classmethod
+    def _assemble_snapshot(
+        cls, queue: Dict[str, Any], operators: List[Dict[str, Any]], block_identifier: Any
+    ) -> Dict[str, Any]:
+        with metrics.STAGE_SECONDS.time("compute_positions"):
+            positions = cls._compute_positions(queue["items"]) if queue.get("items") else {}
+        block_number: Optional[int] = block_identifier if isinstance(block_identifier, int) else None
+        metrics.QUEUE_BATCHES.set(len(queue.get("items") or ()))
+        metrics.NODE_OPERATORS.set(len(operators))
         return {
-            "head": head_i,
-            "tail": tail_i,
-            "size": max(0, tail_i - head_i),
-            "items": [item.__dict__ for item in items],
+            "queue": queue,
+            "node_operators": OperatorColumns.from_records(operators, positions),
+            "block_number": block_number,
         }
 
-    def list_node_operators(self) -> List[Dict[str, Any]]:
+
+class CsmService(_CsmBase):
+    def __init__(self, cfg: Config, adapter: Any, cache: Optional[SnapshotCache] = None) -> None:
+        super().__init__(cfg, adapter, cache)
+        self._queue_lock = threading.Lock()
+        self._operators_lock = threading.Lock()
+
+    def get_queue(self, block_identifier: Any = None, full: bool = False) -> Dict[str, Any]:
+        """Return the deposit queue [head, tail) at `block_identifier`.
+
+        For a concrete block number the queue is served from an incrementally synced mirror
+        (see `_sync_queue`) unless `full` is set or CSM_INCREMENTAL_QUEUE is disabled; other
+        block identifiers always re-read every item.
+        """
+        if full or not self.cfg.csm_incremental_queue or not isinstance(block_identifier, int):
+            head, tail, items = self._read_queue_full(block_identifier)
+            return self._queue_dict(head, tail, items)
+        with self._queue_lock:
+            mirror = self._sync_queue(block_identifier)
+            if mirror.block != block_identifier:
+                # Historical read older than the mirror; served without touching it
+                head, tail, items = self._read_queue_full(block_identifier)
+                return self._queue_dict(head, tail, items)
+            return self._queue_dict(mirror.head, mirror.tail, mirror.items.copy())
+
+    def _read_queue_bounds(self, block_identifier: Any) -> Tuple[int, int]:
+        head, tail = self._contract.functions.depositQueue().call(block_identifier=block_identifier)
+        return int(head), int(tail)
+
+    def _read_queue_items(self, indices: Iterable[int], block_identifier: Any) -> QueueColumns:
+        fns = self._contract.functions
+        indices = list(indices)
+        calls = [fns.depositQueueItem(i) for i in indices]
+        results = self.adapter.call_many(calls, block_identifier)
+        # Retry a failed item directly so a persistent error surfaces as before
+        words = [
+            res.value if res.success else call.call(block_identifier=block_identifier)
+            for call, res in zip(calls, results)
+        ]
+        self.queue_sync_stats["items_fetched"] += len(indices)
+        return QueueColumns.decode(indices, words)
+
+    def _read_queue_full(self, block_identifier: Any) -> Tuple[int, int, QueueColumns]:
+        head, tail = self._read_queue_bounds(block_identifier)
+        return head, tail, self._read_queue_items(range(head, tail), block_identifier)
+
+    def _sync_queue(self, block: int) -> _QueueMirror:
+        """Bring the queue mirror to `block`, reading as few items as possible.
+
+        The queue is FIFO with monotonic head/tail, and only the head batch changes in place
+        (its count shrinks when partially deposited). A sync therefore drops items below the
+        new head, fetches [old tail, new tail) and re-reads the head batch. Everything is
+        re-read when a consistency check fails: the mirrored block was reorged out, head or
+        tail moved backwards, or the head batch changed in any other way.
+        Blocks older than the mirror leave it untouched and are returned as is.
+        """
+        mirror = self._queue_mirror
+        if mirror is not None and block <= mirror.block:
+            return mirror
+        header = self.adapter.get_block(block)
+        head, tail = self._read_queue_bounds(block)
+        if (
+            mirror is not None
+            and head >= mirror.head
+            and tail >= mirror.tail
+            and self._mirror_is_canonical(mirror, block, header)
+        ):
+            fetched = self._read_queue_items(_queue_sync_indices(mirror, head, tail), block)
+            if _apply_queue_sync(mirror, block, header["hash"], head, tail, fetched):
+                self.queue_sync_stats["incremental"] += 1
+                return mirror
+            logger.debug("CSM queue head batch %s changed unexpectedly; re-reading the queue", head)
+        items = self._read_queue_items(range(head, tail), block)
+        self._queue_mirror = _QueueMirror(block, header["hash"], head, tail, items)
+        self.queue_sync_stats["full"] += 1
+        return self._queue_mirror
+
+    def _mirror_is_canonical(self, mirror: Any, block: int, header: Any) -> bool:
+        """Whether the block the mirror was synced at is still part of the chain."""
+        if block == mirror.block + 1:
+            return header["parentHash"] == mirror.block_hash
+        try:
+            return self.adapter.get_block(mirror.block)["hash"] == mirror.block_hash
+        except Exception:
+            return False
+
+    def list_node_operators(self, block_identifier: Any = None, full: bool = False) -> List[Dict[str, Any]]:
         """List node operators with key counts and status flags.
 
         Returns dicts with keys: id, deposited_keys, depositable_keys, enqueued_keys, is_active.
+        For a concrete block number records come from a mirror kept up to date from event logs
+        (see `_sync_operators`) unless `full` is set or CSM_INCREMENTAL_OPERATORS is disabled.
         """
-        count = int(self._contract.functions.getNodeOperatorsCount().call())
-        ids: List[int] = []
+        if full or not self.cfg.csm_incremental_operators or not isinstance(block_identifier, int):
+            return self._read_operators(self._read_operator_ids(block_identifier), block_identifier)
+        with self._operators_lock:
+            mirror = self._sync_operators(block_identifier)
+            if mirror.block != block_identifier:
+                # Historical read older than the mirror; served without touching it
+                return self._read_operators(self._read_operator_ids(block_identifier), block_identifier)
+            return list(mirror.records.values())
+
+    def _read_operator_ids(self, block_identifier: Any) -> List[int]:
+        return [i for page in self._operator_id_pages(block_identifier) for i in page]
+
+    def _operator_id_pages(self, block_identifier: Any) -> Iterator[List[int]]:
         # Fetch in a single call if small; otherwise page by 500
-        if count <= 500:
-            ids = list(map(int, self._contract.functions.getNodeOperatorIds(0, count).call()))
-        else:
-            off = 0
-            while off < count:
-                lim = min(500, count - off)
-                batch = self._contract.functions.getNodeOperatorIds(off, lim).call()
-                ids.extend(map(int, batch))
-                off += lim
-
-        items: List[Dict[str, Any]] = []
-        for node_id in ids:
-            # Prefer compact summary from getNodeOperator (struct with depositable and deposited keys)
+        fns = self._contract.functions
+        count = int(fns.getNodeOperatorsCount().call(block_identifier=block_identifier))
+        for off in range(0, count, 500):
+            page = fns.getNodeOperatorIds(off, min(500, count - off)).call(block_identifier=block_identifier)
+            yield list(map(int, page))
+
+    def iter_queue(self, block_identifier: Any) -> Iterator[Dict[str, int]]:
+        """Yield queue items [head, tail) at `block_identifier`, fetched MULTICALL_BATCH_SIZE at a time.
+
+        Unlike `get_queue`, only one page is held in memory; the mirror is not used.
+        """
+        head, tail = self._read_queue_bounds(block_identifier)
+        step = max(1, self.cfg.multicall_batch_size)
+        for start in range(head, tail, step):
+            yield from self._read_queue_items(range(start, min(tail, start + step)), block_identifier)
+
+    def iter_node_operators(self, block_identifier: Any) -> Iterator[Dict[str, Any]]:
+        """Yield node operator records (see `list_node_operators`), fetched one id page at a time."""
+        for ids in self._operator_id_pages(block_identifier):
+            yield from self._read_operators(ids, block_identifier)
+
+    def _read_operators(self, ids: List[int], block_identifier: Any) -> List[Dict[str, Any]]:
+        # Operator structs and active flags for all ids in one aggregated read
+        fns = self._contract.functions
+        n = len(ids)
+        results = self.adapter.call_many(
+            [fns.getNodeOperator(i) for i in ids] + [fns.getNodeOperatorIsActive(i) for i in ids],
+            block_identifier,
+        )
+        infos, actives = results[:n], results[n:]
+
+        keys = _operator_keys(ids, infos)
+        # Fallback to summary view if getNodeOperator failed or its layout differs
+        missing = [node_id for node_id in ids if node_id not in keys]
+        if missing:
+            summary_calls = [fns.getNodeOperatorSummary(i) for i in missing]
+            summaries = self.adapter.call_many(summary_calls, block_identifier)
+            for node_id, call, res in zip(missing, summary_calls, summaries):
+                s = res.value if res.success else call.call(block_identifier=block_identifier)
+                keys[node_id] = (int(s[6]), int(s[7]), 0)
+
+        self.operator_sync_stats["operators_fetched"] += len(ids)
+        return _operator_records(ids, keys, actives)
+
+    def _sync_operators(self, block: int) -> _OperatorMirror:
+        """Bring the operator mirror to `block`, re-reading only operators that emitted events.
+
+        Scans CSM logs (OPERATOR_EVENTS) since the mirrored block and re-reads the operators
+        they name. Everything is re-read when the mirrored block was reorged out, the log scan
+        fails, the operator count disagrees with the mirror, or CSM_OPERATORS_RECONCILE_BLOCKS
+        have passed since the last full read (safety net for state changes without events).
+        Blocks older than the mirror leave it untouched and are returned as is.
+        """
+        mirror = self._operators_mirror
+        if mirror is not None and block <= mirror.block:
+            return mirror
+        header = self.adapter.get_block(block)
+        if (
+            mirror is not None
+            and block - mirror.reconciled_block < self.cfg.csm_operators_reconcile_blocks
+            and self._mirror_is_canonical(mirror, block, header)
+        ):
             try:
-                info = self._contract.functions.getNodeOperator(node_id).call()
-                # info layout per ABI
-                deposited = int(info[2])
-                depositable = int(info[5])
-                enqueued = int(info[9])
+                changed = self._operators_with_events(mirror.block + 1, block)
             except Exception:
-                # Fallback to summary view if layout differs
-                s = self._contract.functions.getNodeOperatorSummary(node_id).call()
-                deposited = int(s[6])
-                depositable = int(s[7])
-                enqueued = 0
-            # Active flag if available
+                logger.debug(
+                    "CSM log scan %s..%s failed; re-reading all operators", mirror.block + 1, block, exc_info=True
+                )
+                changed = None
+            if changed is not None:
+                count = int(self._contract.functions.getNodeOperatorsCount().call(block_identifier=block))
+                new_ids = sorted(i for i in changed if i not in mirror.records)
+                if count == len(mirror.records) + len(new_ids):
+                    ids = sorted(changed)
+                    for op in self._read_operators(ids, block):
+                        mirror.records[int(op["id"])] = op
+                    mirror.block, mirror.block_hash = block, header["hash"]
+                    self.operator_sync_stats["incremental"] += 1
+                    return mirror
+                logger.debug("CSM operator count %s disagrees with mirror; re-reading all operators", count)
+        operators = self._read_operators(self._read_operator_ids(block), block)
+        records = {int(op["id"]): op for op in operators}
+        self._operators_mirror = _OperatorMirror(block, header["hash"], block, records)
+        self.operator_sync_stats["full"] += 1
+        return self._operators_mirror
+
+    def _operators_with_events(self, from_block: int, to_block: int) -> set:
+        """Ids of node operators named by OPERATOR_EVENTS logs in [from_block, to_block]."""
+        changed = set()
+        for flt in self._operator_log_filters(from_block, to_block):
+            changed.update(_operator_ids_from_logs(self.adapter.get_logs(flt)))
+        return changed
+
+    def snapshot(self, block_identifier: Any = None) -> Dict[str, Any]:
+        """Return combined state: queue, node operators enriched with positions in queue.
+
+        All reads are pinned to one block: `block_identifier` or, by default, the current block
+        number fetched first. Concurrent calls for one block share a build; with a cache, a
+        snapshot is built at most once per block.
+        """
+        block = block_identifier
+        if block is None:
+            # Best-effort current block number (for context and pinning)
             try:
-                is_active = bool(self._contract.functions.getNodeOperatorIsActive(node_id).call())
+                block = self.adapter.block_number()
             except Exception:
-                is_active = None
-
-            items.append(
-                {
-                    "id": int(node_id),
-                    "deposited_keys": deposited,
-                    "depositable_keys": depositable,
-                    "enqueued_keys": enqueued,
-                    "is_active": is_active,
-                }
-            )
-        return items
+                block = None
+        if self.cache is not None and isinstance(block, int):
+            return self.cache.get_or_build(("csm", block), lambda: self._build_snapshot(block))
+        # Nothing to cache under: concurrent calls share a build here instead
+        return self.flights.do(("csm", block), lambda: self._build_snapshot(block))
 
-    @staticmethod
-    def _compute_positions(queue_items: List[Dict[str, Any]]) -> Dict[int, Dict[str, int]]:
-        """Compute queue position metrics per node operator.
+    def _build_snapshot(self, block_identifier: Any) -> Dict[str, Any]:
+        with metrics.count_rpc("csm"):
+            with metrics.STAGE_SECONDS.time("get_queue"):
+                queue = self.get_queue(block_identifier)
+            with metrics.STAGE_SECONDS.time("list_node_operators"):
+                operators = self.list_node_operators(block_identifier)
+        return self._assemble_snapshot(queue, operators, block_identifier)
 
-        For each node operator id, returns first occurrence index, total queued keys, and
-        the number of keys ahead of their first batch (position_keys_ahead).
-        """
-        pos: Dict[int, Dict[str, int]] = {}
-        ahead = 0
-        for item in queue_items:
-            idx = int(item["index"]) if "index" in item else int(item.get("idx", 0))
-            no_id = int(item["node_operator_id"])
-            cnt = int(item["count"])
-            entry = pos.get(no_id)
-            if entry is None:
-                pos[no_id] = {
-                    "first_queue_index": idx,
-                    "queued_keys_total": cnt,
-                    "position_keys_ahead": ahead,
-                }
-            else:
-                entry["queued_keys_total"] += cnt
-            ahead += cnt
-        return pos
-
-    def snapshot(self) -> Dict[str, Any]:
-        """Return combined state: queue, node operators enriched with positions in queue."""
-        queue = self.get_queue()
-        operators = self.list_node_operators()
-        positions = self._compute_positions(queue["items"]) if queue.get("items") else {}
-        enriched_ops: List[Dict[str, Any]] = []
-        for op in operators:
-            pos = positions.get(int(op["id"]))
-            if pos:
-                op = {**op, **pos}
-            enriched_ops.append(op)
-        # Best-effort current block number (for context)
-        block_number: Optional[int]
+
+class AsyncCsmService(_CsmBase):
+    """asyncio counterpart of `CsmService` over an `AsyncEthAdapter`.
+
+    Serves the same data from the same incremental mirrors and cache; independent reads
+    (queue and operators, header and queue bounds, operator id pages) run concurrently.
+    """
+
+    def __init__(self, cfg: Config, adapter: Any, cache: Optional[SnapshotCache] = None) -> None:
+        super().__init__(cfg, adapter, cache)
+        self._queue_lock = asyncio.Lock()
+        self._operators_lock = asyncio.Lock()
+
+    async def get_queue(self, block_identifier: Any = None, full: bool = False) -> Dict[str, Any]:
+        """Return the deposit queue [head, tail) at `block_identifier` (see `CsmService.get_queue`)."""
+        if full or not self.cfg.csm_incremental_queue or not isinstance(block_identifier, int):
+            head, tail, items = await self._read_queue_full(block_identifier)
+            return self._queue_dict(head, tail, items)
+        async with self._queue_lock:
+            mirror = await self._sync_queue(block_identifier)
+            if mirror.block != block_identifier:
+                head, tail, items = await self._read_queue_full(block_identifier)
+                return self._queue_dict(head, tail, items)
+            return self._queue_dict(mirror.head, mirror.tail, mirror.items.copy())
+
+    async def _read_queue_bounds(self, block_identifier: Any) -> Tuple[int, int]:
+        head, tail = await self.adapter.call(self._contract.functions.depositQueue(), block_identifier)
+        return int(head), int(tail)
+
+    async def _read_queue_items(self, indices: Iterable[int], block_identifier: Any) -> QueueColumns:
+        fns = self._contract.functions
+        indices = list(indices)
+        calls = [fns.depositQueueItem(i) for i in indices]
+        results = await self.adapter.call_many(calls, block_identifier)
+        # Retry a failed item directly so a persistent error surfaces as before
+        words = [
+            res.value if res.success else await self.adapter.call(call, block_identifier)
+            for call, res in zip(calls, results)
+        ]
+        self.queue_sync_stats["items_fetched"] += len(indices)
+        return QueueColumns.decode(indices, words)
+
+    async def _read_queue_full(self, block_identifier: Any) -> Tuple[int, int, QueueColumns]:
+        head, tail = await self._read_queue_bounds(block_identifier)
+        return head, tail, await self._read_queue_items(range(head, tail), block_identifier)
+
+    async def _sync_queue(self, block: int) -> _QueueMirror:
+        """Bring the queue mirror to `block`; same rules as `CsmService._sync_queue`."""
+        mirror = self._queue_mirror
+        if mirror is not None and block <= mirror.block:
+            return mirror
+        header, (head, tail) = await asyncio.gather(self.adapter.get_block(block), self._read_queue_bounds(block))
+        if (
+            mirror is not None
+            and head >= mirror.head
+            and tail >= mirror.tail
+            and await self._mirror_is_canonical(mirror, block, header)
+        ):
+            fetched = await self._read_queue_items(_queue_sync_indices(mirror, head, tail), block)
+            if _apply_queue_sync(mirror, block, header["hash"], head, tail, fetched):
+                self.queue_sync_stats["incremental"] += 1
+                return mirror
+            logger.debug("CSM queue head batch %s changed unexpectedly; re-reading the queue", head)
+        items = await self._read_queue_items(range(head, tail), block)
+        self._queue_mirror = _QueueMirror(block, header["hash"], head, tail, items)
+        self.queue_sync_stats["full"] += 1
+        return self._queue_mirror
+
+    async def _mirror_is_canonical(self, mirror: Any, block: int, header: Any) -> bool:
+        if block == mirror.block + 1:
+            return header["parentHash"] == mirror.block_hash
         try:
-            block_number = int(self.adapter.web3.eth.block_number)  # type: ignore[attr-defined]
+            return (await self.adapter.get_block(mirror.block))["hash"] == mirror.block_hash
         except Exception:
-            block_number = None
-        return {
-            "queue": queue,
-            "node_operators": enriched_ops,
-            "block_number": block_number,
-        }
+            return False
+
+    async def list_node_operators(self, block_identifier: Any = None, full: bool = False) -> List[Dict[str, Any]]:
+        """List node operators with key counts and status flags (see `CsmService.list_node_operators`)."""
+        if full or not self.cfg.csm_incremental_operators or not isinstance(block_identifier, int):
+            return await self._read_operators(await self._read_operator_ids(block_identifier), block_identifier)
+        async with self._operators_lock:
+            mirror = await self._sync_operators(block_identifier)
+            if mirror.block != block_identifier:
+                return await self._read_operators(await self._read_operator_ids(block_identifier), block_identifier)
+            return list(mirror.records.values())
+
+    async def iter_queue(self, block_identifier: Any) -> AsyncIterator[Dict[str, int]]:
+        """Async `CsmService.iter_queue`: one page of queue items in memory at a time."""
+        head, tail = await self._read_queue_bounds(block_identifier)
+        step = max(1, self.cfg.multicall_batch_size)
+        for start in range(head, tail, step):
+            for item in await self._read_queue_items(range(start, min(tail, start + step)), block_identifier):
+                yield item
+
+    async def iter_node_operators(self, block_identifier: Any) -> AsyncIterator[Dict[str, Any]]:
+        """Async `CsmService.iter_node_operators`: one page of operator records at a time."""
+        fns = self._contract.functions
+        count = int(await self.adapter.call(fns.getNodeOperatorsCount(), block_identifier))
+        for off in range(0, count, 500):
+            page = await self.adapter.call(fns.getNodeOperatorIds(off, min(500, count - off)), block_identifier)
+            for op in await self._read_operators([int(i) for i in page], block_identifier):
+                yield op
+
+    async def _read_operator_ids(self, block_identifier: Any) -> List[int]:
+        fns = self._contract.functions
+        count = int(await self.adapter.call(fns.getNodeOperatorsCount(), block_identifier))
+        # Pages of 500 ids, fetched concurrently
+        pages = await asyncio.gather(
+            *(
+                self.adapter.call(fns.getNodeOperatorIds(off, min(500, count - off)), block_identifier)
+                for off in range(0, count, 500)
+            )
+        )
+        return [int(i) for page in pages for i in page]
+
+    async def _read_operators(self, ids: List[int], block_identifier: Any) -> List[Dict[str, Any]]:
+        fns = self._contract.functions
+        n = len(ids)
+        results = await self.adapter.call_many(
+            [fns.getNodeOperator(i) for i in ids] + [fns.getNodeOperatorIsActive(i) for i in ids],
+            block_identifier,
+        )
+        infos, actives = results[:n], results[n:]
+
+        keys = _operator_keys(ids, infos)
+        missing = [node_id for node_id in ids if node_id not in keys]
+        if missing:
+            summary_calls = [fns.getNodeOperatorSummary(i) for i in missing]
+            summaries = await self.adapter.call_many(summary_calls, block_identifier)
+            for node_id, call, res in zip(missing, summary_calls, summaries):
+                s = res.value if res.success else await self.adapter.call(call, block_identifier)
+                keys[node_id] = (int(s[6]), int(s[7]), 0)
+
+        self.operator_sync_stats["operators_fetched"] += len(ids)
+        return _operator_records(ids, keys, actives)
+
+    async def _sync_operators(self, block: int) -> _OperatorMirror:
+        """Bring the operator mirror to `block`; same rules as `CsmService._sync_operators`."""
+        mirror = self._operators_mirror
+        if mirror is not None and block <= mirror.block:
+            return mirror
+        header = await self.adapter.get_block(block)
+        if (
+            mirror is not None
+            and block - mirror.reconciled_block < self.cfg.csm_operators_reconcile_blocks
+            and await self._mirror_is_canonical(mirror, block, header)
+        ):
+            try:
+                changed = await self._operators_with_events(mirror.block + 1, block)
+            except Exception:
+                logger.debug(
+                    "CSM log scan %s..%s failed; re-reading all operators", mirror.block + 1, block, exc_info=True
+                )
+                changed = None
+            if changed is not None:
+                count = int(await self.adapter.call(self._contract.functions.getNodeOperatorsCount(), block))
+                new_ids = sorted(i for i in changed if i not in mirror.records)
+                if count == len(mirror.records) + len(new_ids):
+                    for op in await self._read_operators(sorted(changed), block):
+                        mirror.records[int(op["id"])] = op
+                    mirror.block, mirror.block_hash = block, header["hash"]
+                    self.operator_sync_stats["incremental"] += 1
+                    return mirror
+                logger.debug("CSM operator count %s disagrees with mirror; re-reading all operators", count)
+        operators = await self._read_operators(await self._read_operator_ids(block), block)
+        records = {int(op["id"]): op for op in operators}
+        self._operators_mirror = _OperatorMirror(block, header["hash"], block, records)
+        self.operator_sync_stats["full"] += 1
+        return self._operators_mirror
+
+    async def _operators_with_events(self, from_block: int, to_block: int) -> set:
+        filters = self._operator_log_filters(from_block, to_block)
+        changed = set()
+        for logs in await asyncio.gather(*(self.adapter.get_logs(flt) for flt in filters)):
+            changed.update(_operator_ids_from_logs(logs))
+        return changed
+
+    async def snapshot(self, block_identifier: Any = None) -> Dict[str, Any]:
+        """Return combined state pinned to one block (see `CsmService.snapshot`)."""
+        block = block_identifier
+        if block is None:
+            try:
+                block = await self.adapter.block_number()
+            except Exception:
+                block = None
+        if self.cache is not None and isinstance(block, int):
+            return await self.cache.get_or_build_async(("csm", block), lambda: self._build_snapshot(block))
+        return await self.flights.do_async(("csm", block), lambda: self._build_snapshot(block))
+
+    async def _build_snapshot(self, block_identifier: Any) -> Dict[str, Any]:
+        async def timed(stage: str, read: Awaitable[Any]) -> Any:
+            with metrics.STAGE_SECONDS.time(stage):
+                return await read
+
+        with metrics.count_rpc("csm"):
+            queue, operators = await asyncio.gather(
+                timed("get_queue", self.get_queue(block_identifier)),
+                timed("list_node_operators", self.list_node_operators(block_identifier)),
+            )
+        return self._assemble_snapshot(queue, operators, block_identifier)
+
+
+def make_csm_service(cfg: Config | None = None, cache: Optional[SnapshotCache] = None) -> CsmService:
+    cfg = cfg or __import__("app.config", fromlist=["load_config"]).load_config()
+    from app.eth.adapter import make_eth_adapter  # type: ignore
+
+    adapter = make_eth_adapter(cfg)
+    return CsmService(cfg, adapter, cache=cache)
 
 
-def make_csm_service(cfg: Config | None = None) -> CsmService:
+def make_async_csm_service(
+    cfg: Config | None = None, adapter: Any = None, cache: Optional[SnapshotCache] = None
+) -> AsyncCsmService:
+    """Build an `AsyncCsmService`; pass `adapter` to share one connection pool between services."""
     cfg = cfg or __import__("app.config", fromlist=["load_config"]).load_config()
-    from web3 import Web3  # type: ignore
-    from app.eth.adapter import EthAdapter  # type: ignore
+    if adapter is None:
+        from app.eth.async_adapter import make_async_eth_adapter  # type: ignore
 
-    web3 = Web3(Web3.HTTPProvider(cfg.eth_rpc_url, request_kwargs={"timeout": cfg.eth_rpc_timeout}))
-    adapter = EthAdapter(web3)
-    return CsmService(cfg, adapter)
+        adapter = make_async_eth_adapter(cfg)
+    return AsyncCsmService(cfg, adapter, cache=cache)
@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+import gzip
+from typing import Any, Dict, Optional
+
+
+# Compression is paid once per block; these levels keep that well under a block time
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+
+@dataclass(frozen=True)
+class EncodedBody:
+    """A response body serialized once, plus its compressed variants."""
+
+    # Strong ETag (quoted), or None when the body is not pinned to a block
+    etag: Optional[str]
+    media_type: str
+    identity: bytes
+    gzip: bytes
+    br: bytes
+
+    def variant(self, encoding: Optional[str]) -> bytes:
+        if encoding == "br":
+            return self.br
+        if encoding == "gzip":
+            return self.gzip
+        return self.identity
+
+
+def dumps(value: Any) -> bytes:
+    """Serialize to JSON bytes with orjson."""
+    import orjson  # type: ignore
+
+    return orjson.dumps(value)
+
+
+def encode_body(body: bytes, media_type: str, etag: Optional[str] = None) -> EncodedBody:
+    import brotli  # type: ignore
+
+    return EncodedBody(
+        etag=etag,
+        media_type=media_type,
+        identity=body,
+        gzip=gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0),
+        br=brotli.compress(body, quality=BROTLI_QUALITY),
+    )
+
+
+def block_etag(kind: str, block: Any) -> Optional[str]:
+    """Strong ETag for a `kind` of response at `block`; None without a block number."""
+    return f'"{kind}-{block}"' if isinstance(block, int) else None
+
+
+def pick_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """Preferred stored encoding ("br", "gzip" or None for identity) for an Accept-Encoding header.
+
+    The encoding with the highest q-value wins, br before gzip on a tie; q=0 rules one out. Identity
+    only wins when weighted (itself or through `*`) above both, so an unlisted identity never does.
+    """
+    if not accept_encoding:
+        return None
+    weights: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        name, *params = part.split(";")
+        q = 1.0
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    q = min(1.0, max(0.0, float(value)))
+                except ValueError:
+                    q = 0.0
+        weights[name.strip().lower()] = q
+    star = weights.get("*", 0.0)
+    # max() keeps the first of equal weights
+    encoding = max(("br", "gzip"), key=lambda e: weights.get(e, star))
+    q = weights.get(encoding, star)
+    return encoding if q > 0 and q >= weights.get("identity", star) else None
+
+
+def etag_matches(if_none_match: Optional[str], etag: Optional[str]) -> bool:
+    """Whether an If-None-Match header matches `etag` (weak comparison, as RFC 9110 asks)."""
+    if not if_none_match or etag is None:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
@@ -0,0 +1,200 @@
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass, replace
+import inspect
+import logging
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from app.models import Module
+
+
+logger = logging.getLogger(__name__)
+
+
+async def call_service(fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """Await async service methods; run blocking (sync) ones in the threadpool.
+
+    Keeps slow RPC reads of the sync services from stalling the event loop.
+    """
+    if inspect.iscoroutinefunction(fn):
+        return await fn(*args, **kwargs)
+    from starlette.concurrency import run_in_threadpool  # type: ignore
+
+    return await run_in_threadpool(fn, *args, **kwargs)
+
+
+@dataclass(frozen=True)
+class FollowedSnapshot:
+    """Chain state precomputed at `block`; replaced as a whole, never mutated."""
+
+    block: int
+    # `CsmService.snapshot()` / `RouterService.list_modules()` results; None if unavailable
+    csm: Optional[Dict[str, Any]]
+    modules: Optional[List[Module]]
+    # Clock reading when the snapshot was built
+    built_at: float
+    # Loaded from the snapshot store at startup; served until the first refresh replaces it
+    restored: bool = False
+
+
+class BlockFollower:
+    """Follow new blocks by polling and keep the latest CSM snapshot and module list in memory.
+
+    Every `poll_interval` seconds the current block number is read; on a new block both are
+    rebuilt at that block and swapped in atomically, so readers never see a partial update.
+    `age()` is the time since a poll last confirmed the snapshot block is the chain head.
+    With `max_staleness`, `latest()` waits (up to `wait_timeout`) for a refresh when the
+    snapshot is older than that, and returns None if none completes in time.
+
+    With a `store` (see `SnapshotStore`), every new snapshot is saved, and until the first
+    refresh `latest()` serves the last saved one, however old, so a restart does not wait
+    for the chain. With an `archive` (see `SnapshotArchive`), every new snapshot is archived
+    for historical queries as well.
+    """
+
+    def __init__(
+        self,
+        block_number: Callable[[], Any],
+        csm: Any = None,
+        router: Any = None,
+        poll_interval: float = 2.0,
+        max_staleness: Optional[float] = None,
+        wait_timeout: float = 20.0,
+        clock: Callable[[], float] = time.monotonic,
+        store: Any = None,
+        archive: Any = None,
+    ) -> None:
+        self.block_number = block_number
+        self.csm = csm
+        self.router = router
+        self.poll_interval = poll_interval
+        self.max_staleness = max_staleness
+        self.wait_timeout = wait_timeout
+        self.clock = clock
+        self.store = store
+        self.archive = archive
+        self.state: Optional[FollowedSnapshot] = None
+        self.stats: Dict[str, int] = {"polls": 0, "refreshes": 0, "failures": 0}
+        self._checked_at: Optional[float] = None
+        self._refreshed: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._restoring: Optional[asyncio.Task] = None
+
+    def age(self) -> Optional[float]:
+        if self._checked_at is None:
+            return None
+        return max(0.0, self.clock() - self._checked_at)
+
+    def _is_fresh(self) -> bool:
+        if self.state is None:
+            return False
+        if self.max_staleness is None:
+            return True
+        age = self.age()
+        return age is not None and age <= self.max_staleness
+
+    async def latest(self) -> Optional[FollowedSnapshot]:
+        """Return the latest snapshot, waiting for a refresh when it is too stale."""
+        if self.state is None and self.store is not None:
+            if self._restoring is None:
+                self._restoring = asyncio.get_running_loop().create_task(self._restore())
+            await self._restoring
+        if self.state is not None and self.state.restored:
+            return self.state
+        if self._is_fresh():
+            return self.state
+        if self._task is None:
+            # Not following: nothing will refresh the snapshot
+            return None
+        if self._refreshed is None:
+            self._refreshed = asyncio.Event()
+        try:
+            await asyncio.wait_for(self._refreshed.wait(), self.wait_timeout)
+        except asyncio.TimeoutError:
+            logger.debug("No snapshot refresh within %.1fs", self.wait_timeout)
+        return self.state if self._is_fresh() else None
+
+    async def refresh(self) -> FollowedSnapshot:
+        """Poll the block number once; rebuild and swap the snapshot if the block changed."""
+        block = int(await call_service(self.block_number))
+        self.stats["polls"] += 1
+        state = self.state
+        if state is None or state.block != block:
+            csm, modules = await asyncio.gather(
+                self._build(self.csm, "snapshot", block), self._build(self.router, "list_modules", block)
+            )
+            if csm is not None and hasattr(self.csm, "queue_index"):
+                # Index the new snapshot now rather than on the first operator lookup
+                await call_service(self.csm.queue_index, csm)
+            state = FollowedSnapshot(block, csm, modules, self.clock())
+            self.state = state
+            self.stats["refreshes"] += 1
+            logger.debug("Snapshot refreshed at block %s", block)
+            built = True
+        else:
+            built = False
+            if state.restored:
+                # The stored snapshot is still the chain head
+                state = self.state = replace(state, restored=False)
+        self._checked_at = self.clock()
+        if self._refreshed is not None:
+            self._refreshed.set()
+            self._refreshed = None
+        if built:
+            await self._save(state)
+        return state
+
+    async def _restore(self) -> None:
+        stored = await call_service(self.store.load)
+        if stored is None or self.state is not None:
+            return
+        self.state = FollowedSnapshot(stored.block, stored.csm, stored.modules, self.clock(), restored=True)
+        # Age counts from when the snapshot was saved
+        self._checked_at = self.clock() - max(0.0, time.time() - stored.saved_at)
+        logger.info("Serving the stored snapshot of block %s until the first refresh", stored.block)
+
+    async def _save(self, state: FollowedSnapshot) -> None:
+        for target, method in ((self.store, "save"), (self.archive, "append")):
+            if target is None:
+                continue
+            try:
+                await call_service(getattr(target, method), state.block, state.csm, state.modules)
+            except Exception:
+                logger.warning("Cannot %s the snapshot of block %s", method, state.block, exc_info=True)
+
+    async def _build(self, service: Any, method: str, block: int) -> Any:
+        if service is None:
+            return None
+        try:
+            return await call_service(getattr(service, method), block)
+        except Exception:
+            # Leave this part empty; requests fall back to reading it directly
+            logger.warning("Follower failed to build %s at block %s", method, block, exc_info=True)
+            return None
+
+    async def run(self) -> None:
+        while True:
+            try:
+                await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                self.stats["failures"] += 1
+                logger.warning("Block follower poll failed", exc_info=True)
+            await asyncio.sleep(self.poll_interval)
+
+    def start(self) -> None:
+        """Start following in a background task of the running event loop."""
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self.run())
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
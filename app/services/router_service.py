@@ -1,16 +1,44 @@
 from __future__ import annotations
 
 from dataclasses import asdict
-from typing import List
+from typing import Any, List, Optional
 
+from app import metrics
 from app.config import Config
 from app.models import Module
+from app.services.single_flight import SingleFlight
+from app.services.snapshot_cache import SnapshotCache
+
+
+def _modules_from_raw(raw: List[dict]) -> List[Module]:
+    return [
+        Module(
+            address=item.get("address", "0x0"),
+            module_id=item.get("id"),
+            name=item.get("name"),
+            module_type=item.get("type"),
+            target_share_bps=item.get("target_share_bps"),
+            is_active=item.get("is_active"),
+            is_deposits_paused=item.get("is_deposits_paused"),
+            is_stopped=item.get("is_stopped"),
+            active_validators=item.get("active_validators"),
+            depositable_validators=item.get("depositable_validators"),
+            last_deposit_block=item.get("last_deposit_block"),
+            max_deposits_per_block=item.get("max_deposits_per_block"),
+            min_deposit_block_distance=item.get("min_deposit_block_distance"),
+        )
+        for item in raw
+    ]
 
 
 class RouterService:
-    def __init__(self, cfg: Config, adapter: EthAdapter) -> None:
+    def __init__(self, cfg: Config, adapter: EthAdapter, cache: Optional[SnapshotCache] = None) -> None:
         self.cfg = cfg
         self.adapter = adapter
+        self.cache = cache
+        # Concurrent reads share a fetch when there is no cache entry to share (see `list_modules`)
+        self.flights = SingleFlight()
+        self._router_address: Optional[str] = None
 
     def _resolve_router_address(self) -> str:
         if self.cfg.staking_router_address:
@@ -19,42 +47,102 @@ class RouterService:
             raise RuntimeError(
                 "No STAKING_ROUTER_ADDRESS provided and LIDO_LOCATOR_ADDRESS is missing."
             )
-        return self.adapter.resolve_staking_router(self.cfg.lido_locator_address, self.cfg.locator_abi)
-
-    def list_modules(self) -> List[Module]:
-        router_address = self._resolve_router_address()
-        # Will raise NotImplementedError until ABI is provided and enumerator implemented.
-        raw = self.adapter.list_modules(router_address, self.cfg.router_abi)
-        return [
-            Module(
-                address=item.get("address", "0x0"),
-                module_id=item.get("id"),
-                name=item.get("name"),
-                module_type=item.get("type"),
-                target_share_bps=item.get("target_share_bps"),
-                is_active=item.get("is_active"),
-                is_deposits_paused=item.get("is_deposits_paused"),
-                is_stopped=item.get("is_stopped"),
-                active_validators=item.get("active_validators"),
-                depositable_validators=item.get("depositable_validators"),
-                last_deposit_block=item.get("last_deposit_block"),
-                max_deposits_per_block=item.get("max_deposits_per_block"),
-                min_deposit_block_distance=item.get("min_deposit_block_distance"),
+        # The router address is fixed per deployment; resolve it via the locator only once.
+        if self._router_address is None:
+            self._router_address = self.adapter.resolve_staking_router(
+                self.cfg.lido_locator_address, self.cfg.locator_abi
             )
-            for item in raw
-        ]
+        return self._router_address
+
+    def list_modules(self, block_identifier: Any = None) -> List[Module]:
+        """Return staking modules, read at `block_identifier` (default: latest).
+
+        With a cache, reads are pinned to the current block number (fetched first) and the
+        module list is built at most once per block. Concurrent calls for one block share a fetch.
+        """
+        if self.cache is None:
+            return self.flights.do(("modules", block_identifier), lambda: self._fetch_modules(block_identifier))
+        block = block_identifier if block_identifier is not None else self.adapter.block_number()
+        if not isinstance(block, int):
+            # Nothing to cache under: concurrent calls share a fetch here instead
+            return self.flights.do(("modules", block), lambda: self._fetch_modules(block))
+        return self.cache.get_or_build(("modules", block), lambda: self._fetch_modules(block))
+
+    def _fetch_modules(self, block_identifier: Any) -> List[Module]:
+        with metrics.count_rpc("modules"):
+            router_address = self._resolve_router_address()
+            # Only pass a block when pinning, so adapters without block support keep working
+            kwargs = {"block_identifier": block_identifier} if block_identifier is not None else {}
+            raw = self.adapter.list_modules(router_address, self.cfg.router_abi, **kwargs)
+        return _modules_from_raw(raw)
 
     @staticmethod
     def serialize(modules: List[Module]) -> List[dict]:
         return [asdict(m) for m in modules]
 
 
-def make_router_service(cfg: Config | None = None) -> RouterService:
+class AsyncRouterService:
+    """asyncio counterpart of `RouterService` over an `AsyncEthAdapter`."""
+
+    def __init__(self, cfg: Config, adapter: Any, cache: Optional[SnapshotCache] = None) -> None:
+        self.cfg = cfg
+        self.adapter = adapter
+        self.cache = cache
+        # Concurrent reads share a fetch when there is no cache entry to share (see `list_modules`)
+        self.flights = SingleFlight()
+        self._router_address: Optional[str] = None
+
+    async def _resolve_router_address(self) -> str:
+        if self.cfg.staking_router_address:
+            return self.cfg.staking_router_address
+        if not self.cfg.lido_locator_address:
+            raise RuntimeError(
+                "No STAKING_ROUTER_ADDRESS provided and LIDO_LOCATOR_ADDRESS is missing."
+            )
+        if self._router_address is None:
+            self._router_address = await self.adapter.resolve_staking_router(
+                self.cfg.lido_locator_address, self.cfg.locator_abi
+            )
+        return self._router_address
+
+    async def list_modules(self, block_identifier: Any = None) -> List[Module]:
+        """Return staking modules (see `RouterService.list_modules`)."""
+        if self.cache is None:
+            return await self.flights.do_async(
+                ("modules", block_identifier), lambda: self._fetch_modules(block_identifier)
+            )
+        block = block_identifier if block_identifier is not None else await self.adapter.block_number()
+        if not isinstance(block, int):
+            return await self.flights.do_async(("modules", block), lambda: self._fetch_modules(block))
+        return await self.cache.get_or_build_async(("modules", block), lambda: self._fetch_modules(block))
+
+    async def _fetch_modules(self, block_identifier: Any) -> List[Module]:
+        with metrics.count_rpc("modules"):
+            router_address = await self._resolve_router_address()
+            raw = await self.adapter.list_modules(
+                router_address, self.cfg.router_abi, block_identifier=block_identifier
+            )
+        return _modules_from_raw(raw)
+
+    serialize = staticmethod(RouterService.serialize)
+
+
+def make_router_service(cfg: Config | None = None, cache: Optional[SnapshotCache] = None) -> RouterService:
     cfg = cfg or __import__("app.config", fromlist=["load_config"]).load_config()
     # Lazy imports to avoid hard dependency during tests that stub the service
-    from web3 import Web3  # type: ignore
-    from app.eth.adapter import EthAdapter  # type: ignore
+    from app.eth.adapter import make_eth_adapter  # type: ignore
+
+    adapter = make_eth_adapter(cfg)
+    return RouterService(cfg, adapter, cache=cache)
+
+
+def make_async_router_service(
+    cfg: Config | None = None, adapter: Any = None, cache: Optional[SnapshotCache] = None
+) -> AsyncRouterService:
+    """Build an `AsyncRouterService`; pass `adapter` to share one connection pool between services."""
+    cfg = cfg or __import__("app.config", fromlist=["load_config"]).load_config()
+    if adapter is None:
+        from app.eth.async_adapter import make_async_eth_adapter  # type: ignore
 
-    web3 = Web3(Web3.HTTPProvider(cfg.eth_rpc_url, request_kwargs={"timeout": cfg.eth_rpc_timeout}))
-    adapter = EthAdapter(web3)
-    return RouterService(cfg, adapter)
+        adapter = make_async_eth_adapter(cfg)
+    return AsyncRouterService(cfg, adapter, cache=cache)
@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, List
+
+
+class _Call:
+    __slots__ = ("done", "value", "error")
+
+    def __init__(self, done: Any) -> None:
+        self.done = done
+        self.value: Any = None
+        self.error: BaseException | None = None
+
+
+class SingleFlight:
+    """Coalesce concurrent calls for the same key: one runs, the others wait and share its outcome.
+
+    `do()` coalesces threads, `do_async()` coroutines; the two never wait on each other. An
+    exception reaches every waiter, and nothing is remembered once the call ends.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self._async_calls: Dict[Hashable, _Call] = {}
+        self.calls = 0
+        # Callers that got the result of a call already running, in total and right now
+        self.coalesced = 0
+        self.waiting = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = self._calls[key] = _Call(threading.Event())
+                self.calls += 1
+                leader = True
+            else:
+                self._join()
+                leader = False
+        if not leader:
+            try:
+                call.done.wait()
+            finally:
+                self._leave()
+            return self._outcome(call)
+        try:
+            call.value = fn()
+        except BaseException as exc:
+            call.error = exc
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.value
+
+    async def do_async(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Like `do()`, for coroutines of one event loop.
+
+        The call runs in a task of its own, so a caller that is cancelled (a client that went
+        away) does not cancel it for the others.
+        """
+        with self._lock:
+            call = self._async_calls.get(key)
+            joined = call is not None
+            if call is None:
+                task = asyncio.ensure_future(fn())
+                call = self._async_calls[key] = _Call(task)
+                task.add_done_callback(lambda t, key=key, call=call: self._finish_async(key, call, t))
+                self.calls += 1
+            else:
+                self._join()
+        try:
+            return await asyncio.shield(call.done)
+        finally:
+            if joined:
+                self._leave()
+
+    def _finish_async(self, key: Hashable, call: _Call, task: "asyncio.Future[Any]") -> None:
+        with self._lock:
+            if self._async_calls.get(key) is call:
+                del self._async_calls[key]
+        if not task.cancelled():
+            # Retrieved here so that a failure nobody waited for is not logged as unhandled
+            task.exception()
+
+    def _join(self) -> None:
+        self.coalesced += 1
+        self.waiting += 1
+
+    def _leave(self) -> None:
+        with self._lock:
+            self.waiting -= 1
+
+    @staticmethod
+    def _outcome(call: _Call) -> Any:
+        if call.error is not None:
+            raise call.error
+        return call.value
+
+    def in_flight(self) -> List[Hashable]:
+        with self._lock:
+            return [*self._calls, *self._async_calls]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "coalesced": self.coalesced,
+                "waiting": self.waiting,
+                "in_flight": len(self._calls) + len(self._async_calls),
+            }
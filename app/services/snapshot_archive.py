@@ -0,0 +1,267 @@
+from __future__ import annotations
+
+from bisect import bisect_left
+from contextlib import closing
+import logging
+import sqlite3
+import threading
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from app.models import Module
+from app.services.csm_columns import OperatorColumns, QueueColumns, operator_columns, queue_columns
+from app.services.csm_queue import QueueIndex
+from app.services.snapshot_store import decode_csm, decode_modules, encode_csm, encode_modules
+
+
+logger = logging.getLogger(__name__)
+
+# Overlapping queue items are compared this many at a time before looking at single items
+_CHUNK = 1024
+# Columns missing from archive files of earlier versions: (table, column, declaration)
+_ADDED_COLUMNS = (
+    ("csm", "pinned", "INTEGER NOT NULL DEFAULT 0"),
+    ("modules", "base", "INTEGER"),
+    ("modules", "pinned", "INTEGER NOT NULL DEFAULT 0"),
+)
+
+
+def _changed_positions(prev: QueueColumns, cur: QueueColumns, start: int, end: int) -> Iterator[int]:
+    """Positions in `cur` [0, end - start) whose batch differs from `prev` [start, end)."""
+    cols = ("node_operator_id", "count")
+    for lo in range(start, end, _CHUNK):
+        hi = min(end, lo + _CHUNK)
+        if all(getattr(prev, c)[lo:hi] == getattr(cur, c)[lo - start : hi - start] for c in cols):
+            continue
+        for pos in range(lo, hi):
+            if any(getattr(prev, c)[pos] != getattr(cur, c)[pos - start] for c in cols):
+                yield pos - start
+
+
+def csm_delta(prev: Dict[str, Any], cur: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Changes from CSM snapshot `prev` to `cur`, as a partial snapshot; None if a full one is needed.
+
+    The delta holds the new queue bounds, the batches that changed or were appended (those
+    dequeued are implied by the head) and the operator rows that changed. Queue positions are
+    left out: a deposit moves them for every operator behind it, and they follow from the queue.
+    """
+    pq, cq = prev.get("queue") or {}, cur.get("queue") or {}
+    p_items, c_items = queue_columns(pq.get("items")), queue_columns(cq.get("items"))
+    if len(c_items) and len(p_items) and c_items.index[0] < p_items.index[0]:
+        # The queue moved backwards (reorg)
+        return None
+    start = bisect_left(p_items.index, c_items.index[0]) if len(c_items) else len(p_items)
+    overlap = min(len(p_items) - start, len(c_items))
+    if overlap and p_items.index[start : start + overlap] != c_items.index[:overlap]:
+        return None
+    changed = QueueColumns()
+    appended = range(overlap, len(c_items))
+    for pos in [*_changed_positions(p_items, c_items, start, start + overlap), *appended]:
+        changed.index.append(c_items.index[pos])
+        changed.node_operator_id.append(c_items.node_operator_id[pos])
+        changed.count.append(c_items.count[pos])
+
+    p_ops, c_ops = operator_columns(prev.get("node_operators")), operator_columns(cur.get("node_operators"))
+    old = dict(zip(p_ops.id, zip(*(col for _, col in p_ops.columns(positions=False)))))
+    rows = list(zip(*(col for _, col in c_ops.columns(positions=False))))
+    if len(old) > len(rows):
+        # Operators are never removed; start over from a full snapshot
+        return None
+    ops = OperatorColumns()
+    columns = [col for _, col in ops.columns(positions=False)]
+    for row in rows:
+        if old.get(row[0]) != row:
+            for col, value in zip(columns, row):
+                col.append(value)
+    ops.set_positions({})
+    return {
+        "queue": {"head": cq.get("head"), "tail": cq.get("tail"), "size": cq.get("size"), "items": changed},
+        "node_operators": ops,
+        "block_number": cur.get("block_number"),
+    }
+
+
+def apply_csm_delta(base: Dict[str, Any], delta: Dict[str, Any], positions: bool = True) -> Dict[str, Any]:
+    """Snapshot `base` moved forward by `delta` (see `csm_delta`); `base` columns are updated in place.
+
+    Queue positions are recomputed from the resulting queue, as the live snapshot does; when
+    applying several deltas in a row, pass `positions=False` to all but the last one.
+    """
+    queue = delta["queue"]
+    items = queue_columns((base.get("queue") or {}).get("items"))
+    if queue["head"] is not None:
+        items.drop_before(queue["head"])
+    items.update(queue["items"])
+    ops = operator_columns(base.get("node_operators"))
+    ops.update(delta["node_operators"])
+    if positions:
+        ops.set_positions(QueueIndex(items).positions())
+    return {
+        "queue": {"head": queue["head"], "tail": queue["tail"], "size": queue["size"], "items": items},
+        "node_operators": ops,
+        "block_number": delta["block_number"],
+    }
+
+
+class SnapshotArchive:
+    """Per-block CSM snapshots and module lists in a local SQLite file, for historical queries.
+
+    A full CSM snapshot (keyframe) is written every `keyframe_every` blocks and deltas from the
+    block appended before in between, so rebuilding any block decodes one keyframe and at most
+    `keyframe_every - 1` small deltas. Module lists are written only when they change (and
+    at keyframes). Blocks more than `retention_blocks` behind the newest are pruned, a whole
+    keyframe interval at a time.
+
+    Every row names the block it applies to (`base`), and rows are rebuilt by following those
+    links, so the blocks of one writer need not be consecutive and another writer can fill the
+    blocks in between (the backfill, with its own `writer`). Rows of a `pinned` writer are
+    never pruned, and such a writer does not prune either.
+    """
+
+    def __init__(
+        self, path: str, keyframe_every: int = 256, retention_blocks: int = 50_400, pinned: bool = False
+    ) -> None:
+        self.path = path
+        self.keyframe_every = max(1, keyframe_every)
+        self.retention_blocks = retention_blocks
+        self.pinned = pinned
+        self._lock = threading.Lock()
+        # Last archived block and its CSM snapshot / encoded module list, to diff against
+        self._last: Optional[Tuple[int, Optional[Dict[str, Any]], Optional[bytes]]] = None
+        self._since_keyframe = 0
+        with closing(self._connect()) as conn, conn:
+            # base = block for keyframes, else the block the delta applies to
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS csm (block INTEGER PRIMARY KEY, base INTEGER NOT NULL, body BLOB NOT NULL,"
+                " pinned INTEGER NOT NULL DEFAULT 0)"
+            )
+            # body NULL: same module list as block `base`
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS modules (block INTEGER PRIMARY KEY, body BLOB, base INTEGER,"
+                " pinned INTEGER NOT NULL DEFAULT 0)"
+            )
+            for table, column, decl in _ADDED_COLUMNS:
+                if column not in {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}:
+                    conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {decl}")
+
+    def writer(self, pinned: bool = False) -> "SnapshotArchive":
+        """Another writer of the same file, which does not diff against the blocks this one archived."""
+        return SnapshotArchive(
+            self.path, keyframe_every=self.keyframe_every, retention_blocks=self.retention_blocks, pinned=pinned
+        )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=10)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def append(self, block: int, csm: Optional[Dict[str, Any]], modules: Optional[List[Module]]) -> None:
+        """Archive the state at `block`; blocks must be appended in increasing order."""
+        with self._lock:
+            last = self._last
+            if last is not None and block <= last[0]:
+                return
+            keyframe = last is None or self._since_keyframe + 1 >= self.keyframe_every
+            csm_row = None
+            if csm is not None:
+                delta = None
+                if not keyframe and last is not None and last[1] is not None:
+                    delta = csm_delta(last[1], csm)
+                if delta is None:
+                    keyframe = True
+                    csm_row = (block, block, encode_csm(csm), int(self.pinned))
+                else:
+                    csm_row = (block, last[0], encode_csm(delta), int(self.pinned))  # type: ignore[index]
+            modules_body = encode_modules(modules) if modules is not None else None
+            unchanged = not keyframe and last is not None and modules_body == last[2]
+            with closing(self._connect()) as conn, conn:
+                # A pinned row stays as it is: pinned deltas may be based on it
+                if csm_row is not None:
+                    conn.execute(
+                        "INSERT INTO csm (block, base, body, pinned) VALUES (?, ?, ?, ?) ON CONFLICT (block)"
+                        " DO UPDATE SET base = excluded.base, body = excluded.body, pinned = excluded.pinned"
+                        " WHERE csm.pinned = 0",
+                        csm_row,
+                    )
+                if modules_body is not None:
+                    conn.execute(
+                        "INSERT INTO modules (block, body, base, pinned) VALUES (?, ?, ?, ?) ON CONFLICT (block)"
+                        " DO UPDATE SET body = excluded.body, base = excluded.base, pinned = excluded.pinned"
+                        " WHERE modules.pinned = 0",
+                        (block, None, last[0], int(self.pinned))  # type: ignore[index]
+                        if unchanged
+                        else (block, modules_body, block, int(self.pinned)),
+                    )
+                if keyframe and csm_row is not None and not self.pinned:
+                    self._prune(conn, block)
+            self._since_keyframe = 0 if keyframe else self._since_keyframe + 1
+            # A missing part breaks the chain of deltas; the next snapshot is a keyframe
+            self._last = (block, csm, modules_body) if csm is not None else None
+
+    def _prune(self, conn: sqlite3.Connection, newest: int) -> None:
+        """Drop unpinned blocks before the newest unpinned keyframe that is at least `retention_blocks` old.
+
+        Unpinned rows are only based on unpinned rows at or after their keyframe, and pinned
+        rows only on pinned ones, so the rows left keep their chains.
+        """
+        row = conn.execute(
+            "SELECT MAX(block) FROM csm WHERE base = block AND pinned = 0 AND block <= ?",
+            (newest - self.retention_blocks,),
+        ).fetchone()
+        cutoff = row[0] if row else None
+        if cutoff is None:
+            return
+        conn.execute("DELETE FROM csm WHERE block < ? AND pinned = 0", (cutoff,))
+        conn.execute("DELETE FROM modules WHERE block < ? AND pinned = 0", (cutoff,))
+
+    def csm_at(self, block: int) -> Optional[Dict[str, Any]]:
+        """CSM snapshot at `block` rebuilt from the archive, or None if that block is not archived."""
+        chain: List[bytes] = []
+        with closing(self._connect()) as conn:
+            number = block
+            while True:
+                row = conn.execute("SELECT base, body FROM csm WHERE block = ?", (number,)).fetchone()
+                if row is None:
+                    # Not archived, or a broken chain of deltas
+                    return None
+                base, body = row
+                chain.append(body)
+                if base == number:
+                    break
+                number = base
+        snapshot = decode_csm(chain.pop())
+        while chain:
+            snapshot = apply_csm_delta(snapshot, decode_csm(chain.pop()), positions=not chain)
+        return snapshot
+
+    def modules_at(self, block: int) -> Optional[List[Module]]:
+        """Module list at `block` from the archive, or None if that block is not archived."""
+        with closing(self._connect()) as conn:
+            number: Optional[int] = block
+            while number is not None:
+                row = conn.execute("SELECT body, base FROM modules WHERE block = ?", (number,)).fetchone()
+                if row is None:
+                    return None
+                body, base = row
+                if body is not None:
+                    return decode_modules(body)
+                if base is None:
+                    # Rows of earlier versions: same as the archived block before
+                    base = conn.execute("SELECT MAX(block) FROM modules WHERE block < ?", (number,)).fetchone()[0]
+                number = base
+        return None
+
+    def archived(self, start: int = 0, end: Optional[int] = None) -> List[int]:
+        """Blocks in [start, end] with a CSM snapshot or module list archived, ascending."""
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT block FROM csm WHERE block >= ?1 AND block <= ?2"
+                " UNION SELECT block FROM modules WHERE block >= ?1 AND block <= ?2 ORDER BY block",
+                (start, end if end is not None else 2**63 - 1),
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def blocks(self) -> Tuple[Optional[int], Optional[int]]:
+        """(oldest, newest) archived CSM block, or (None, None) when empty."""
+        with closing(self._connect()) as conn:
+            oldest, newest = conn.execute("SELECT MIN(block), MAX(block) FROM csm").fetchone()
+        return oldest, newest
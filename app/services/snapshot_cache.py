@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+from dataclasses import is_dataclass
+import sys
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+from app.services.single_flight import SingleFlight
+
+
+def approx_size(value: Any) -> int:
+    """Approximate deep memory footprint of `value` in bytes.
+
+    Walks dicts, lists/tuples/sets and dataclass instances; shared objects are counted once.
+    """
+    seen = set()
+    total = 0
+    stack = [value]
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        total += sys.getsizeof(obj)
+        if isinstance(obj, dict):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            stack.extend(obj)
+        elif is_dataclass(obj) and not isinstance(obj, type):
+            stack.append(obj.__dict__)
+    return total
+
+
+class SnapshotCache:
+    """Thread-safe LRU cache for chain snapshots keyed by (service, block number).
+
+    Entries are evicted least-recently-used first once either `max_entries` or the approximate
+    `max_bytes` budget is exceeded. A value larger than the whole byte budget is not stored.
+    Cached values are shared between callers and must be treated as read-only.
+
+    Concurrent `get_or_build` calls for a key that is not cached yet run one build and share
+    its value (see `SingleFlight`), so a burst of requests for a new block reads the chain once.
+    """
+
+    def __init__(self, max_entries: int = 64, max_bytes: int = 128 * 1024 * 1024) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Hashable, Tuple[Any, int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.flights = SingleFlight()
+
+    def get(self, key: Hashable) -> Any:
+        """Return the cached value or None; counts a hit or a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: Hashable, value: Any) -> None:
+        size = approx_size(value)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            if self.max_entries <= 0 or size > self.max_bytes:
+                return
+            self._entries[key] = (value, size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def _peek(self, key: Hashable) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry[0] if entry is not None else None
+
+    def get_or_build(self, key: Hashable, build: Callable[[], Any]) -> Any:
+        """Return the cached value for `key`, building and storing it on a miss."""
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        def build_once() -> Any:
+            # Built by a flight that ended between our miss and now
+            value = self._peek(key)
+            if value is None:
+                value = build()
+                self.put(key, value)
+            return value
+
+        return self.flights.do(key, build_once)
+
+    async def get_or_build_async(self, key: Hashable, build: Callable[[], Awaitable[Any]]) -> Any:
+        """`get_or_build` for an async `build`."""
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        async def build_once() -> Any:
+            value = self._peek(key)
+            if value is None:
+                value = await build()
+                self.put(key, value)
+            return value
+
+        return await self.flights.do_async(key, build_once)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                **{f"builds_{k}": v for k, v in self.flights.stats().items()},
+            }
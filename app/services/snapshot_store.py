@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+from array import array
+from contextlib import closing
+from dataclasses import asdict, dataclass
+import logging
+import sqlite3
+import struct
+import sys
+import time
+import zlib
+from typing import Any, Dict, List, Optional
+
+from app.models import Module
+from app.services.csm_columns import OperatorColumns, QueueColumns, operator_columns, queue_columns
+
+
+logger = logging.getLogger(__name__)
+
+# Bump when the encoding changes; rows of other versions are ignored
+FORMAT_VERSION = 1
+
+_QUEUE_COLUMNS = ("index", "node_operator_id", "count")
+_OPERATOR_COLUMNS = (
+    "id",
+    "deposited_keys",
+    "depositable_keys",
+    "enqueued_keys",
+    "is_active",
+    "first_queue_index",
+    "queued_keys_total",
+    "position_keys_ahead",
+)
+
+
+def encode_csm(snapshot: Dict[str, Any]) -> bytes:
+    """CSM snapshot as a JSON header followed by its raw queue and operator columns, deflated."""
+    import orjson  # type: ignore
+
+    queue = snapshot.get("queue") or {}
+    items = queue_columns(queue.get("items"))
+    ops = operator_columns(snapshot.get("node_operators"))
+    columns = [getattr(items, name) for name in _QUEUE_COLUMNS] + [getattr(ops, name) for name in _OPERATOR_COLUMNS]
+    header = orjson.dumps(
+        {
+            "head": queue.get("head"),
+            "tail": queue.get("tail"),
+            "size": queue.get("size"),
+            "block_number": snapshot.get("block_number"),
+            "byteorder": sys.byteorder,
+            "columns": [[col.typecode, len(col)] for col in columns],
+        }
+    )
+    return zlib.compress(struct.pack("<I", len(header)) + header + b"".join(col.tobytes() for col in columns))
+
+
+def decode_csm(blob: bytes) -> Dict[str, Any]:
+    """Inverse of `encode_csm`; the snapshot comes back columnar, as `CsmService.snapshot()` builds it."""
+    import orjson  # type: ignore
+
+    raw = zlib.decompress(blob)
+    (size,) = struct.unpack_from("<I", raw)
+    header = orjson.loads(raw[4 : 4 + size])
+    offset = 4 + size
+    columns: List[array] = []
+    for typecode, length in header["columns"]:
+        col = array(typecode)
+        end = offset + length * col.itemsize
+        col.frombytes(raw[offset:end])
+        if header["byteorder"] != sys.byteorder:
+            col.byteswap()
+        columns.append(col)
+        offset = end
+    n = len(_QUEUE_COLUMNS)
+    return {
+        "queue": {
+            "head": header["head"],
+            "tail": header["tail"],
+            "size": header["size"],
+            "items": QueueColumns(*columns[:n]),
+        },
+        "node_operators": OperatorColumns(**dict(zip(_OPERATOR_COLUMNS, columns[n:]))),
+        "block_number": header["block_number"],
+    }
+
+
+def encode_modules(modules: List[Module]) -> bytes:
+    import orjson  # type: ignore
+
+    return zlib.compress(orjson.dumps([asdict(m) for m in modules]))
+
+
+def decode_modules(blob: bytes) -> List[Module]:
+    import orjson  # type: ignore
+
+    fields = Module.__dataclass_fields__
+    return [Module(**{k: v for k, v in m.items() if k in fields}) for m in orjson.loads(zlib.decompress(blob))]
+
+
+@dataclass(frozen=True)
+class StoredSnapshot:
+    """Last persisted follower state: CSM snapshot and module list at `block`."""
+
+    block: int
+    csm: Optional[Dict[str, Any]]
+    modules: Optional[List[Module]]
+    # Wall-clock time (time.time()) when it was saved
+    saved_at: float
+
+
+class SnapshotStore:
+    """Latest CSM snapshot and module list in a local SQLite file, for warm restarts.
+
+    One row is kept and overwritten on every save. Each call opens its own connection,
+    so the store can be used from any thread.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS snapshot ("
+                " id INTEGER PRIMARY KEY CHECK (id = 1), version INTEGER NOT NULL, block INTEGER NOT NULL,"
+                " saved_at REAL NOT NULL, csm BLOB, modules BLOB)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=10)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def save(
+        self,
+        block: int,
+        csm: Optional[Dict[str, Any]],
+        modules: Optional[List[Module]],
+        saved_at: Optional[float] = None,
+    ) -> None:
+        row = (
+            FORMAT_VERSION,
+            block,
+            time.time() if saved_at is None else saved_at,
+            encode_csm(csm) if csm is not None else None,
+            encode_modules(modules) if modules is not None else None,
+        )
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO snapshot (id, version, block, saved_at, csm, modules)"
+                " VALUES (1, ?, ?, ?, ?, ?)",
+                row,
+            )
+
+    def load(self) -> Optional[StoredSnapshot]:
+        """The saved snapshot, or None when there is none or it cannot be read."""
+        try:
+            with closing(self._connect()) as conn:
+                row = conn.execute(
+                    "SELECT version, block, saved_at, csm, modules FROM snapshot WHERE id = 1"
+                ).fetchone()
+            if row is None or row[0] != FORMAT_VERSION:
+                return None
+            _, block, saved_at, csm, modules = row
+            return StoredSnapshot(
+                block=block,
+                csm=decode_csm(csm) if csm is not None else None,
+                modules=decode_modules(modules) if modules is not None else None,
+                saved_at=saved_at,
+            )
+        except Exception:
+            logger.warning("Cannot load the stored snapshot from %s", self.path, exc_info=True)
+            return None
+
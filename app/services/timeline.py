@@ -0,0 +1,251 @@
+from __future__ import annotations
+
+from bisect import bisect_right
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from decimal import Decimal
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from app.models import Module
+from app.services.allocation import VALIDATOR_ETH, is_eligible, max_after, water_fill
+
+
+WEI = 10**18
+DEPOSIT_WEI = VALIDATOR_ETH * WEI
+# Used when a module does not report its limits: batches of 30 * 32 ETH, one per block
+DEFAULT_MAX_DEPOSITS_PER_BLOCK = 30
+DEFAULT_MIN_DEPOSIT_BLOCK_DISTANCE = 1
+
+
+@dataclass
+class InflowSegment:
+    # ETH added to the buffer every block from `start_block` until the next segment starts
+    start_block: int
+    eth_per_block: float
+
+
+@dataclass
+class TimelineScenario:
+    modules: List[Module]
+    start_block: int
+    end_block: int
+    inflow: List[InflowSegment] = field(default_factory=list)
+    # Buffered ETH at `start_block`; inflow accrues from the next block on
+    initial_buffer_eth: float = 0
+    # Keep every (block, module index, validators) deposit in the result
+    record_deposits: bool = False
+
+
+@dataclass
+class TimelineResult:
+    end_block: int
+    # First block at which each module's share reached its limit; None if never (or no limit)
+    limit_reached_block: List[Optional[int]]
+    active_validators: List[int]
+    deposited_validators: List[int]
+    buffer_eth: float
+    # Blocks actually simulated (event blocks), out of end_block - start_block + 1
+    event_blocks: int
+    deposits: List[Tuple[int, int, int]] = field(default_factory=list)
+
+
+def _to_wei(eth: float) -> int:
+    return int(Decimal(str(eth)) * WEI)
+
+
+class _Timeline:
+    """Mutable simulation state; one deposit per module per block, modules in input order."""
+
+    def __init__(self, scenario: TimelineScenario) -> None:
+        modules = scenario.modules
+        self.scenario = scenario
+        self.active = [m.active_validators or 0 for m in modules]
+        self.depositable = [m.depositable_validators or 0 for m in modules]
+        self.limit_frac = [m.target_share_bps / 10000 if m.target_share_bps is not None else None for m in modules]
+        self.eligible = [is_eligible(m) for m in modules]
+        self.max_per_block = [
+            m.max_deposits_per_block if m.max_deposits_per_block is not None else DEFAULT_MAX_DEPOSITS_PER_BLOCK
+            for m in modules
+        ]
+        self.distance = [
+            max(1, m.min_deposit_block_distance or DEFAULT_MIN_DEPOSIT_BLOCK_DISTANCE) for m in modules
+        ]
+        self.last_deposit: List[Optional[int]] = [m.last_deposit_block for m in modules]
+        self.deposited = [0] * len(modules)
+        self.limit_reached: List[Optional[int]] = [None] * len(modules)
+        self.deposits: List[Tuple[int, int, int]] = []
+        self.buffer = _to_wei(scenario.initial_buffer_eth)
+        inflow = sorted(scenario.inflow, key=lambda s: s.start_block)
+        self.segment_starts = [s.start_block for s in inflow]
+        self.segment_rates = [_to_wei(s.eth_per_block) for s in inflow]
+
+    # Inflow
+
+    def _rate_at(self, block: int) -> Tuple[int, Optional[int]]:
+        """Inflow per block at `block` and the start of the next segment (None if last)."""
+        pos = bisect_right(self.segment_starts, block)
+        rate = self.segment_rates[pos - 1] if pos > 0 else 0
+        nxt = self.segment_starts[pos] if pos < len(self.segment_starts) else None
+        return rate, nxt
+
+    def inflow_between(self, block: int, until: int) -> int:
+        """Wei added over blocks block+1 .. until."""
+        total, cur = 0, block + 1
+        while cur <= until:
+            rate, nxt = self._rate_at(cur)
+            stop = until if nxt is None else min(until, nxt - 1)
+            total += rate * (stop - cur + 1)
+            cur = stop + 1
+        return total
+
+    def _buffer_reaches(self, block: int, target: int) -> Optional[int]:
+        """First block after `block` by which the buffer holds `target` wei, within the current
+        inflow segment; the next segment start if not reached before it, None if never."""
+        rate, nxt = self._rate_at(block + 1)
+        if rate > 0:
+            reached = block + max(1, -(-(target - self.buffer) // rate))
+            if nxt is None or reached < nxt:
+                return reached
+        return nxt
+
+    # Allocation
+
+    def allocation(self, wanted: int) -> List[int]:
+        """Validators per module the router would allocate out of `wanted` buffered ones."""
+        validators = min(wanted, sum(self.depositable))
+        total_final = sum(self.active) + validators
+        caps = [
+            max_after(a, d, f, e, total_final)
+            for a, d, f, e in zip(self.active, self.depositable, self.limit_frac, self.eligible)
+        ]
+        return [after - a for after, a in zip(water_fill(self.active, caps, validators), self.active)]
+
+    def _validators_needed(self, pos: int, have: int, allocation: Callable[[int], List[int]]) -> Optional[int]:
+        """Fewest buffered validators (> have) for which module `pos` gets an allocation.
+
+        Gallops up from `have + 1` (usually the answer), then bisects the last step.
+        """
+        limit = sum(self.depositable)
+        lo, step = have + 1, 1
+        while True:
+            if lo > limit:
+                return None
+            hi = min(limit, lo + step - 1)
+            if allocation(hi)[pos] > 0:
+                break
+            lo, step = hi + 1, step * 2
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if allocation(mid)[pos] > 0:
+                hi = mid
+            else:
+                lo = mid + 1
+        return lo
+
+    # Events
+
+    def _ready_at(self, pos: int) -> Optional[int]:
+        last = self.last_deposit[pos]
+        return None if last is None else last + self.distance[pos]
+
+    def _check_limit(self, pos: int, block: int) -> None:
+        # Only the module's own deposits raise its share, so checking after them is enough
+        bps = self.scenario.modules[pos].target_share_bps
+        if bps is None or self.limit_reached[pos] is not None:
+            return
+        total = sum(self.active)
+        if total > 0 and self.active[pos] * 10000 >= bps * total:
+            self.limit_reached[pos] = block
+
+    def deposit(self, block: int) -> None:
+        """Let every module that is off its cooldown deposit its allocation, up to its batch size."""
+        for pos in range(len(self.active)):
+            ready = self._ready_at(pos)
+            if ready is not None and block < ready:
+                continue
+            wanted = self.buffer // DEPOSIT_WEI
+            if wanted <= 0:
+                break
+            count = min(self.allocation(wanted)[pos], self.max_per_block[pos])
+            if count <= 0:
+                continue
+            self.active[pos] += count
+            self.depositable[pos] -= count
+            self.deposited[pos] += count
+            self.buffer -= count * DEPOSIT_WEI
+            self.last_deposit[pos] = block
+            if self.scenario.record_deposits:
+                self.deposits.append((block, pos, count))
+            self._check_limit(pos, block)
+
+    def next_event(self, block: int) -> Optional[int]:
+        """Next block at which anything can happen: a segment starts, or a module is off its
+        cooldown while the buffer is large enough to allocate it a validator."""
+        _, candidate = self._rate_at(block + 1)
+        memo: Dict[int, List[int]] = {}
+
+        def allocation(wanted: int) -> List[int]:
+            # The state is fixed here, and modules mostly probe the same buffer sizes
+            if wanted not in memo:
+                memo[wanted] = self.allocation(wanted)
+            return memo[wanted]
+
+        have = self.buffer // DEPOSIT_WEI
+        now = allocation(have) if have > 0 else [0] * len(self.active)
+        for pos in range(len(self.active)):
+            if not self.eligible[pos] or self.depositable[pos] <= 0:
+                continue
+            at = max(block + 1, self._ready_at(pos) or 0)
+            if now[pos] <= 0:
+                # The allocation only grows with the buffer: wait until it covers one validator
+                needed = self._validators_needed(pos, have, allocation)
+                reached = self._buffer_reaches(block, needed * DEPOSIT_WEI) if needed is not None else None
+                if reached is None:
+                    continue
+                at = max(at, reached)
+            candidate = at if candidate is None else min(candidate, at)
+        return candidate
+
+    def result(self, end_block: int, event_blocks: int) -> TimelineResult:
+        return TimelineResult(
+            end_block=end_block,
+            limit_reached_block=list(self.limit_reached),
+            active_validators=list(self.active),
+            deposited_validators=list(self.deposited),
+            buffer_eth=self.buffer / WEI,
+            event_blocks=event_blocks,
+            deposits=list(self.deposits),
+        )
+
+
+def simulate_timeline(scenario: TimelineScenario) -> TimelineResult:
+    """Replay buffered-ETH inflow block by block under the per-module deposit limits.
+
+    At every block each module off its `min_deposit_block_distance` cooldown deposits its
+    lowest-share-first allocation of the buffer, at most `max_deposits_per_block` validators.
+    State only changes at such deposits and at inflow segment starts, so the simulation jumps
+    straight from one event block to the next; the result equals a block-by-block replay.
+    """
+    state = _Timeline(scenario)
+    block, events = scenario.start_block, 1
+    for pos in range(len(state.active)):
+        state._check_limit(pos, block)
+    state.deposit(block)
+    while True:
+        nxt = state.next_event(block)
+        if nxt is None or nxt > scenario.end_block:
+            break
+        state.buffer += state.inflow_between(block, nxt)
+        block, events = nxt, events + 1
+        state.deposit(block)
+    if scenario.end_block > block:
+        state.buffer += state.inflow_between(block, scenario.end_block)
+    return state.result(scenario.end_block, events)
+
+
+def run_scenarios(scenarios: Sequence[TimelineScenario], max_workers: Optional[int] = None) -> List[TimelineResult]:
+    """Simulate scenarios in a process pool (in this process for a single scenario or worker)."""
+    if len(scenarios) <= 1 or max_workers == 1:
+        return [simulate_timeline(s) for s in scenarios]
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        return list(pool.map(simulate_timeline, scenarios))
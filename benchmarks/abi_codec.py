@@ -0,0 +1,68 @@
+"""Per-call CPU cost of the hot CSM view calls: web3's generic contract path vs. precompiled codecs.
+
+Covers building the bound call, encoding its calldata and decoding a return value, as done
+for every item of an aggregated read. No RPC is made.
+
+Run from the repository root: python -m benchmarks.abi_codec [calls]
+"""
+from __future__ import annotations
+
+import sys
+import time
+from typing import Any, Callable
+
+from eth_abi import encode
+from web3 import Web3
+
+from app.eth.abi_loader import load_abi_file
+from app.eth.adapter import EthAdapter
+from app.eth.multicall import decode_result, encode_call
+
+
+CSM = "0x00000000000000000000000000000000000000c5"
+OPERATOR = (10, 1, 8, 9, 0, 2, 0, 0, 0, 2, CSM, CSM, CSM, CSM, False)
+
+
+def _per_call_us(n: int, run: Callable[[int], Any]) -> float:
+    started = time.process_time()
+    for i in range(n):
+        run(i)
+    return (time.process_time() - started) / n * 1e6
+
+
+def main(n: int = 5000) -> None:
+    w3 = Web3()
+    generic = w3.eth.contract(address=CSM, abi=load_abi_file("csm.json")).functions
+    fast = EthAdapter(w3).contract(CSM, "csm.json").functions
+    item_word = encode(["uint256"], [(7 << 192) | (3 << 128)])
+    struct = "(" + ",".join(["uint32"] * 7 + ["uint8", "uint32", "uint32"] + ["address"] * 4 + ["bool"]) + ")"
+    operator_struct = encode([struct], [OPERATOR])
+
+    def roundtrip(functions: Any, name: str, data: bytes) -> Callable[[int], Any]:
+        def run(i: int) -> Any:
+            fn = getattr(functions, name)(i)
+            encode_call(fn)
+            return decode_result(fn, data)
+
+        return run
+
+    print(f"{n} calls each, CPU microseconds per call (build + encode + decode)")
+    print(f"{'':26}{'web3':>10}{'precompiled':>13}{'speedup':>9}")
+    for name, data in (
+        ("depositQueueItem", item_word),
+        ("getNodeOperator", operator_struct),
+        ("getNodeOperatorIsActive", encode(["bool"], [True])),
+    ):
+        assert roundtrip(generic, name, data)(1) == roundtrip(fast, name, data)(1)
+        slow = _per_call_us(n, roundtrip(generic, name, data))
+        quick = _per_call_us(n, roundtrip(fast, name, data))
+        print(f"{name:26}{slow:>10.1f}{quick:>13.1f}{slow / quick:>8.1f}x")
+
+    adapter = EthAdapter(w3)
+    built = _per_call_us(50, lambda i: w3.eth.contract(address=CSM, abi=load_abi_file("csm.json")))
+    cached = _per_call_us(n, lambda i: adapter.contract(CSM, "csm.json"))
+    print(f"{'contract()':26}{built:>10.1f}{cached:>13.1f}{built / cached:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5000)
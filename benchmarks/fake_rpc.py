@@ -0,0 +1,251 @@
+"""Local JSON-RPC server emulating the CSM and staking router views of `abi/` at any scale.
+
+State is synthetic and computed per id (nothing is stored per operator), so 100k operators
+cost no setup. Multicall3 `aggregate3` and JSON-RPC batch arrays are served natively; every
+HTTP request sleeps `latency` seconds first, emulating the round trip to a remote node.
+The server runs in a process of its own so that its ABI encoding does not share the
+measured process's GIL.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import multiprocessing
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from eth_abi import decode, encode
+from eth_utils import function_abi_to_4byte_selector
+from eth_utils.abi import get_abi_input_types, get_abi_output_types
+
+from app.config import MULTICALL3_ADDRESS
+from app.eth.abi_loader import load_abi_file
+
+
+CSM = "0x00000000000000000000000000000000000000c5"
+ROUTER = "0x00000000000000000000000000000000000000a0"
+ZERO_ADDRESS = "0x0000000000000000000000000000000000000000"
+
+
+class Revert(Exception):
+    pass
+
+
+@dataclass(frozen=True)
+class ChainShape:
+    """Size of the emulated state: CSM operators and queue batches, router modules."""
+
+    operators: int = 100
+    queue_length: int = 100
+    modules: int = 100
+    block_number: int = 20_000_000
+    latency: float = 0.0
+
+
+class SyntheticChain:
+    """Answers JSON-RPC requests from `ChainShape`; counts requests and contract calls."""
+
+    def __init__(self, shape: ChainShape) -> None:
+        self.shape = shape
+        self.requests = 0
+        self.contract_calls = 0
+        self._lock = threading.Lock()
+        self._functions: Dict[Tuple[str, bytes], Tuple[Any, Any, Callable[..., Any]]] = {}
+        self._register(MULTICALL3_ADDRESS, "multicall3.json", {"aggregate3": self._aggregate3})
+        self._register(
+            CSM,
+            "csm.json",
+            {
+                "depositQueue": lambda: (0, shape.queue_length),
+                "depositQueueItem": self._queue_item,
+                "getNodeOperatorsCount": lambda: shape.operators,
+                "getNodeOperatorIds": lambda off, lim: list(range(off, min(off + lim, shape.operators))),
+                "getNodeOperator": self._node_operator,
+                "getNodeOperatorIsActive": lambda i: self._operator(i) and i % 10 != 9,
+                "getNodeOperatorSummary": self._operator_summary,
+            },
+        )
+        self._register(
+            ROUTER,
+            "staking_router.json",
+            {
+                "getAllStakingModuleDigests": self._digests,
+                "getStakingModuleIsActive": lambda i: self._module(i) % 7 != 6,
+                "getStakingModuleIsDepositsPaused": lambda i: self._module(i) % 11 == 10,
+                "getStakingModuleIsStopped": lambda i: self._module(i) % 13 == 12,
+                "getStakingModuleActiveValidatorsCount": lambda i: 1000 + self._module(i) * 37 % 5000,
+                "getStakingModuleSummary": lambda i: (0, 0, self._module(i) * 13 % 800),
+            },
+        )
+
+    def _register(self, address: str, abi_filename: str, handlers: Dict[str, Callable[..., Any]]) -> None:
+        for entry in load_abi_file(abi_filename):
+            if entry.get("type") == "function" and entry["name"] in handlers:
+                key = (address.lower(), bytes(function_abi_to_4byte_selector(entry)))
+                outputs = get_abi_output_types(entry)
+                self._functions[key] = (get_abi_input_types(entry), outputs, handlers[entry["name"]])
+
+    def _operator(self, i: int) -> bool:
+        if not 0 <= i < self.shape.operators:
+            raise Revert("NodeOperatorDoesNotExist")
+        return True
+
+    def _module(self, i: int) -> int:
+        if not 1 <= i <= self.shape.modules:
+            raise Revert("StakingModuleUnregistered")
+        return i
+
+    def _queue_item(self, index: int) -> int:
+        if not 0 <= index < self.shape.queue_length:
+            raise Revert("QueueLookupNoLimit")
+        operator, count = index % max(1, self.shape.operators), 1 + index % 5
+        return (operator << 192) | (count << 128) | (index + 1)
+
+    def _keys(self, i: int) -> Tuple[int, int, int]:
+        """(deposited, depositable, enqueued) keys of operator `i`."""
+        self._operator(i)
+        return 10 + i % 90, i % 8, i % 8
+
+    def _node_operator(self, i: int) -> Tuple[Any, ...]:
+        deposited, depositable, enqueued = self._keys(i)
+        total = deposited + depositable
+        return (
+            total, 0, deposited, total, 0, depositable, 0, 0, 0, enqueued,
+            ZERO_ADDRESS, ZERO_ADDRESS, ZERO_ADDRESS, ZERO_ADDRESS, False,
+        )
+
+    def _operator_summary(self, i: int) -> Tuple[int, ...]:
+        deposited, depositable, _ = self._keys(i)
+        return (0, 0, 0, 0, 0, 0, deposited, depositable)
+
+    def _digests(self) -> List[Any]:
+        out = []
+        for mid in range(1, self.shape.modules + 1):
+            share_limit = 100 + mid * 97 % 9900
+            state = (
+                mid, "0x" + mid.to_bytes(20, "big").hex(), 500, 500, share_limit, 0, f"module-{mid}", 0,
+                self.shape.block_number - mid % 100, 0, share_limit, 30, 25,
+            )
+            out.append((0, 0, state, (0, 0, mid * 13 % 800)))
+        return out
+
+    def execute(self, to: str, data: bytes) -> bytes:
+        found = self._functions.get((to.lower(), data[:4]))
+        if found is None:
+            raise Revert("unknown selector")
+        inputs, outputs, handler = found
+        if handler != self._aggregate3:
+            with self._lock:
+                self.contract_calls += 1
+        try:
+            value = handler(*decode(inputs, data[4:]))
+        except Revert:
+            raise
+        except Exception as exc:
+            raise Revert(str(exc)) from exc
+        return encode(outputs, value if len(outputs) > 1 else (value,))
+
+    def _aggregate3(self, calls: Any) -> List[Tuple[bool, bytes]]:
+        results = []
+        for target, allow_failure, call_data in calls:
+            try:
+                results.append((True, self.execute(target, call_data)))
+            except Revert:
+                if not allow_failure:
+                    raise
+                results.append((False, b""))
+        return results
+
+    def handle(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        with self._lock:
+            self.requests += 1
+        method, params, rid = request.get("method"), request.get("params") or [], request.get("id")
+        if method == "eth_chainId":
+            return {"jsonrpc": "2.0", "id": rid, "result": "0x1"}
+        if method == "eth_blockNumber":
+            return {"jsonrpc": "2.0", "id": rid, "result": hex(self.shape.block_number)}
+        if method == "eth_getBlockByNumber":
+            number = self.shape.block_number if params[0] == "latest" else int(params[0], 16)
+            block_hash = "0x" + number.to_bytes(32, "big").hex()
+            parent = "0x" + (number - 1).to_bytes(32, "big").hex()
+            header = {"number": hex(number), "hash": block_hash, "parentHash": parent}
+            return {"jsonrpc": "2.0", "id": rid, "result": header}
+        if method == "eth_getLogs":
+            return {"jsonrpc": "2.0", "id": rid, "result": []}
+        if method == "eth_call":
+            tx = params[0]
+            try:
+                out = self.execute(tx["to"], bytes.fromhex((tx.get("data") or tx.get("input"))[2:]))
+            except Revert as exc:
+                return {"jsonrpc": "2.0", "id": rid, "error": {"code": 3, "message": f"execution reverted: {exc}"}}
+            return {"jsonrpc": "2.0", "id": rid, "result": "0x" + out.hex()}
+        return {"jsonrpc": "2.0", "id": rid, "error": {"code": -32601, "message": f"method not found: {method}"}}
+
+
+def _handler(chain: SyntheticChain) -> type:
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def do_POST(self) -> None:
+            payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            if chain.shape.latency:
+                time.sleep(chain.shape.latency)
+            if isinstance(payload, list):
+                body = json.dumps([chain.handle(r) for r in payload]).encode()
+            else:
+                body = json.dumps(chain.handle(payload)).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self) -> None:
+            # Counters for the benchmark driver
+            body = json.dumps({"requests": chain.requests, "contract_calls": chain.contract_calls}).encode()
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format: str, *args: Any) -> None:
+            pass
+
+    return Handler
+
+
+def serve(shape: ChainShape, ready: Any) -> None:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _handler(SyntheticChain(shape)))
+    server.daemon_threads = True
+    ready.send(server.server_address[1])
+    server.serve_forever()
+
+
+class FakeRpcServer:
+    """`serve()` in a child process; use as a context manager, `url` is its endpoint."""
+
+    def __init__(self, shape: ChainShape) -> None:
+        self.shape = shape
+        self.url: Optional[str] = None
+        self._process: Optional[multiprocessing.Process] = None
+
+    def __enter__(self) -> "FakeRpcServer":
+        parent, child = multiprocessing.Pipe()
+        self._process = multiprocessing.Process(target=serve, args=(self.shape, child), daemon=True)
+        self._process.start()
+        self.url = f"http://127.0.0.1:{parent.recv()}"
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        if self._process is not None:
+            self._process.terminate()
+            self._process.join()
+
+    def counters(self) -> Dict[str, int]:
+        """Requests and contract calls (inside aggregates included) served so far."""
+        import requests
+
+        return requests.get(self.url, timeout=10).json()
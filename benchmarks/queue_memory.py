@@ -0,0 +1,86 @@
+"""Memory and decode cost of CSM queue items and operator records: columnar vs. dicts.
+
+Run from the repository root: python -m benchmarks.queue_memory [items]
+"""
+from __future__ import annotations
+
+import random
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Tuple
+
+from app.services.csm_columns import OperatorColumns, QueueColumns
+from app.services.csm_service import CsmService
+from app.services.snapshot_cache import approx_size
+
+
+def _words(n: int) -> List[int]:
+    rnd = random.Random(1)
+    return [(rnd.randrange(5000) << 192) | (rnd.randint(1, 30) << 128) | rnd.getrandbits(64) for _ in range(n)]
+
+
+def _dicts(head: int, words: List[int]) -> List[Dict[str, int]]:
+    # What get_queue() used to build: one decode and one dict per batch
+    out = []
+    for i, word in enumerate(words):
+        no_id, count = CsmService._decode_batch(word)
+        out.append({"index": head + i, "node_operator_id": no_id, "count": count})
+    return out
+
+
+def _columns(head: int, words: List[int]) -> QueueColumns:
+    return QueueColumns.decode(range(head, head + len(words)), words)
+
+
+def _measure(build: Callable[[], Any]) -> Tuple[Any, float, int]:
+    tracemalloc.start()
+    started = time.perf_counter()
+    value = build()
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return value, elapsed, peak
+
+
+def main(n: int = 100_000) -> None:
+    words = _words(n)
+    dicts, dict_time, dict_peak = _measure(lambda: _dicts(0, words))
+    columns, col_time, col_peak = _measure(lambda: _columns(0, words))
+    assert columns.to_dicts() == dicts
+    started = time.perf_counter()
+    columns.to_dicts()
+    to_dicts = time.perf_counter() - started
+
+    print(f"{n} queue items")
+    print(f"{'':14}{'bytes/item':>12}{'peak MB':>10}{'decode ms':>11}")
+    for name, value, elapsed, peak in (
+        ("list of dicts", dicts, dict_time, dict_peak),
+        ("columns", columns, col_time, col_peak),
+    ):
+        print(f"{name:14}{approx_size(value) / n:>12.1f}{peak / 2**20:>10.1f}{elapsed * 1000:>11.1f}")
+    print(f"columns -> dicts at the API boundary: {to_dicts * 1000:.1f} ms")
+
+    ops = n // 10
+    records = [
+        {
+            "id": i,
+            "deposited_keys": i % 300,
+            "depositable_keys": i % 7,
+            "enqueued_keys": i % 7,
+            "is_active": i % 5 != 0,
+            "first_queue_index": i * 10,
+            "queued_keys_total": 7,
+            "position_keys_ahead": i * 70,
+        }
+        for i in range(ops)
+    ]
+    operators = OperatorColumns.from_records(records, {op["id"]: op for op in records})
+    assert operators.to_dicts() == records
+    print(f"{ops} operator records")
+    print(f"{'list of dicts':14}{approx_size(records) / ops:>12.1f}")
+    print(f"{'columns':14}{approx_size(operators) / ops:>12.1f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
@@ -0,0 +1,128 @@
+"""How snapshot reads, serialization and the allocation simulation scale with the CSM and router size.
+
+Each scale runs against its own `benchmarks.fake_rpc` server, with that many operators, queue
+batches and staking modules (unless fixed by the options), through the app's real HTTP adapter.
+Snapshots and module lists are read cold (a new service, no cache) `--repeat` times.
+Results are printed (or written to `--out`) as JSON for regression tracking.
+
+Run from the repository root: python -m benchmarks.snapshot_scale [--scales 100,10000,100000]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.config import Config
+from app.eth.adapter import make_eth_adapter
+from app.services.allocation import VALIDATOR_ETH, simulate_lowest_share_first
+from app.services.csm_columns import snapshot_to_json
+from app.services.csm_service import CsmService
+from app.services.encoded import dumps, encode_body
+from app.services.router_service import RouterService
+
+from benchmarks.fake_rpc import CSM, ROUTER, ChainShape, FakeRpcServer
+
+
+def _timed(repeat: int, run: Callable[[], Any]) -> Tuple[Dict[str, float], Any]:
+    seconds = []
+    value = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        value = run()
+        seconds.append(time.perf_counter() - started)
+    return {"min": round(min(seconds), 6), "median": round(statistics.median(seconds), 6)}, value
+
+
+def _with_rpc(server: FakeRpcServer, repeat: int, run: Callable[[], Any]) -> Tuple[Dict[str, Any], Any]:
+    """Timings of `run` plus the requests and contract calls one run costs at the server."""
+    before = server.counters()
+    seconds, value = _timed(repeat, run)
+    after = server.counters()
+    requests, calls = ((after[key] - before[key]) // repeat for key in ("requests", "contract_calls"))
+    return {"seconds": seconds, "rpc_requests": requests, "contract_calls": calls}, value
+
+
+def bench_scale(shape: ChainShape, repeat: int, rpc_batch: bool = False) -> Dict[str, Any]:
+    with FakeRpcServer(shape) as server:
+        cfg = Config(
+            eth_rpc_url=server.url or "",
+            eth_rpc_timeout=600,
+            csm_address=CSM,
+            staking_router_address=ROUTER,
+            eth_rpc_batch=rpc_batch,
+        )
+        adapter = make_eth_adapter(cfg)
+        block = adapter.block_number()
+
+        csm, snapshot = _with_rpc(server, repeat, lambda: CsmService(cfg, adapter).snapshot(block))
+        modules_result, modules = _with_rpc(server, repeat, lambda: RouterService(cfg, adapter).list_modules(block))
+
+    def serialize_csm() -> Any:
+        return encode_body(dumps(snapshot_to_json(snapshot)), "application/json")
+
+    csm_json, body = _timed(repeat, serialize_csm)
+    modules_json, _ = _timed(repeat, lambda: dumps(RouterService.serialize(modules)))
+    # Enough ETH to fill every module's depositable capacity
+    eth = sum(m.depositable_validators or 0 for m in modules) * VALIDATOR_ETH
+    allocation, result = _timed(repeat, lambda: simulate_lowest_share_first(modules, eth))
+    return {
+        "operators": shape.operators,
+        "queue_length": shape.queue_length,
+        "modules": shape.modules,
+        "csm_snapshot": {**csm, "node_operators": len(snapshot["node_operators"])},
+        "list_modules": {**modules_result, "modules": len(modules)},
+        "serialize_csm_state": {
+            "seconds": csm_json,
+            "bytes": {"identity": len(body.identity), "gzip": len(body.gzip), "br": len(body.br)},
+        },
+        "serialize_modules": {"seconds": modules_json},
+        "allocation": {"seconds": allocation, "eth": eth, "validators": result.validators},
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.snapshot_scale", description=__doc__.splitlines()[0])
+    parser.add_argument("--scales", default="100,10000,100000", help="comma-separated sizes (default: %(default)s)")
+    parser.add_argument("--operators", type=int, help="fixed CSM operator count instead of the scale")
+    parser.add_argument("--queue-length", type=int, help="fixed CSM queue length (batches) instead of the scale")
+    parser.add_argument("--modules", type=int, help="fixed staking module count instead of the scale")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every RPC request")
+    parser.add_argument("--repeat", type=int, default=1, help="runs per measurement (default: %(default)s)")
+    parser.add_argument("--rpc-batch", action="store_true", help="JSON-RPC batches instead of Multicall3")
+    parser.add_argument("--out", help="write the JSON results to this file instead of stdout")
+    args = parser.parse_args(argv)
+
+    results = []
+    for scale in (int(s) for s in args.scales.split(",") if s.strip()):
+        shape = ChainShape(
+            operators=args.operators if args.operators is not None else scale,
+            queue_length=args.queue_length if args.queue_length is not None else scale,
+            modules=args.modules if args.modules is not None else scale,
+            latency=args.latency,
+        )
+        print(f"scale {scale}: {shape}", file=sys.stderr)
+        results.append({"scale": scale, **bench_scale(shape, max(1, args.repeat), args.rpc_batch)})
+
+    report = {
+        "benchmark": "snapshot_scale",
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "params": {"latency": args.latency, "repeat": args.repeat, "rpc_batch": args.rpc_batch},
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,275 @@
+"""In-process JSON-RPC stand-in used by tests that need real ABI encoding.
+
+`FakeChain` is a web3 provider that answers `eth_call` from Python handlers registered
+per contract function, and emulates Multicall3 `aggregate3` natively. Every request is
+counted so tests can assert on round trips.
+"""
+import asyncio
+from collections import Counter
+from typing import Any, Callable, Dict, List, Tuple
+
+from eth_abi import decode, encode
+from eth_utils import event_abi_to_log_topic, function_abi_to_4byte_selector
+from eth_utils.abi import get_abi_input_types, get_abi_output_types
+from web3.providers.async_base import AsyncBaseProvider
+from web3.providers.base import BaseProvider
+
+from app.config import MULTICALL3_ADDRESS
+from app.eth.abi_loader import load_abi_file
+
+
+class Revert(Exception):
+    pass
+
+
+class FakeChain(BaseProvider):
+    def __init__(self, block_number: int = 100, multicall: bool = True) -> None:
+        super().__init__()
+        self.block_number = block_number
+        self.fork = 0
+        self.logs: List[Dict[str, Any]] = []
+        self.requests: Counter = Counter()
+        self.eth_calls: Counter = Counter()
+        # Block tag of every eth_call ("latest" or hex number)
+        self.call_blocks: Counter = Counter()
+        self._functions: Dict[Tuple[str, bytes], Tuple[dict, Callable[..., Any]]] = {}
+        if multicall:
+            self.register(MULTICALL3_ADDRESS, "multicall3.json", {"aggregate3": self._aggregate3})
+
+    def block_hash(self, number: int) -> str:
+        """Deterministic block hash; bump `fork` to emulate a reorg of every block."""
+        return "0x" + (number * 1_000_003 + self.fork).to_bytes(32, "big").hex()
+
+    def header(self, number: int) -> Dict[str, Any]:
+        return {
+            "number": hex(number),
+            "hash": self.block_hash(number),
+            "parentHash": self.block_hash(number - 1),
+        }
+
+    def emit(self, address: str, abi_filename: str, event: str, *indexed: int) -> None:
+        """Record a log of `event` with uint256 indexed args at the current block."""
+        entry = next(e for e in load_abi_file(abi_filename) if e.get("type") == "event" and e["name"] == event)
+        topics = ["0x" + bytes(event_abi_to_log_topic(entry)).hex()]
+        topics += ["0x" + value.to_bytes(32, "big").hex() for value in indexed]
+        self.logs.append({"address": address.lower(), "blockNumber": self.block_number, "topics": topics})
+
+    def _get_logs(self, flt: Dict[str, Any]) -> List[Dict[str, Any]]:
+        lo, hi = int(flt["fromBlock"], 16), int(flt["toBlock"], 16)
+        wanted = set(flt.get("topics", [[]])[0] or [])
+        addresses = flt["address"] if isinstance(flt["address"], list) else [flt["address"]]
+        addresses = {str(a).lower() for a in addresses}
+        out = []
+        for idx, log in enumerate(self.logs):
+            if log["address"] not in addresses or not lo <= log["blockNumber"] <= hi:
+                continue
+            if wanted and log["topics"][0] not in wanted:
+                continue
+            out.append(
+                {
+                    "address": log["address"],
+                    "topics": log["topics"],
+                    "data": "0x",
+                    "blockNumber": hex(log["blockNumber"]),
+                    "blockHash": self.block_hash(log["blockNumber"]),
+                    "transactionHash": "0x" + idx.to_bytes(32, "big").hex(),
+                    "transactionIndex": "0x0",
+                    "logIndex": hex(idx),
+                    "removed": False,
+                }
+            )
+        return out
+
+    def register(self, address: str, abi_filename: str, handlers: Dict[str, Callable[..., Any]]) -> None:
+        """Serve `handlers[name](*args)` for functions of `abi_filename` at `address`."""
+        for entry in load_abi_file(abi_filename):
+            if entry.get("type") != "function" or entry["name"] not in handlers:
+                continue
+            key = (address.lower(), bytes(function_abi_to_4byte_selector(entry)))
+            self._functions[key] = (entry, handlers[entry["name"]])
+
+    def is_connected(self, show_traceback: bool = False) -> bool:
+        return True
+
+    def make_request(self, method, params):
+        self.requests[method] += 1
+        if method == "eth_chainId":
+            return {"jsonrpc": "2.0", "id": 0, "result": "0x1"}
+        if method == "eth_blockNumber":
+            return {"jsonrpc": "2.0", "id": 0, "result": hex(self.block_number)}
+        if method == "eth_getBlockByNumber":
+            number = self.block_number if params[0] == "latest" else int(params[0], 16)
+            return {"jsonrpc": "2.0", "id": 0, "result": self.header(number)}
+        if method == "eth_getLogs":
+            return {"jsonrpc": "2.0", "id": 0, "result": self._get_logs(params[0])}
+        if method == "eth_call":
+            tx = params[0]
+            self.call_blocks[params[1] if len(params) > 1 else "latest"] += 1
+            try:
+                out = self.execute(tx["to"], bytes.fromhex(tx["data"][2:]))
+            except Revert as exc:
+                return {"jsonrpc": "2.0", "id": 0, "error": {"code": 3, "message": f"execution reverted: {exc}"}}
+            return {"jsonrpc": "2.0", "id": 0, "result": "0x" + out.hex()}
+        raise NotImplementedError(method)
+
+    def execute(self, to: str, data: bytes) -> bytes:
+        found = self._functions.get((to.lower(), data[:4]))
+        if found is None:
+            raise Revert("unknown selector")
+        entry, handler = found
+        args = decode(get_abi_input_types(entry), data[4:])
+        if handler != self._aggregate3:
+            self.eth_calls[entry["name"]] += 1
+        try:
+            value = handler(*args)
+        except Revert:
+            raise
+        except Exception as exc:
+            raise Revert(str(exc)) from exc
+        output_types = get_abi_output_types(entry)
+        values = value if len(output_types) > 1 else (value,)
+        return encode(output_types, values)
+
+    def _aggregate3(self, calls):
+        results = []
+        for target, allow_failure, call_data in calls:
+            try:
+                results.append((True, self.execute(target, call_data)))
+            except Revert:
+                if not allow_failure:
+                    raise
+                results.append((False, b""))
+        return results
+
+
+class AsyncFakeChain(AsyncBaseProvider):
+    """Async provider view of a `FakeChain`; tracks the peak number of requests in flight."""
+
+    def __init__(self, chain: FakeChain, latency: float = 0.001) -> None:
+        super().__init__()
+        self.chain = chain
+        self.latency = latency
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def is_connected(self, show_traceback: bool = False) -> bool:
+        return True
+
+    async def make_request(self, method, params):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.latency)
+            return self.chain.make_request(method, params)
+        finally:
+            self.in_flight -= 1
+
+
+ZERO_ADDRESS = "0x0000000000000000000000000000000000000000"
+
+
+def pack_batch(node_operator_id: int, count: int, next_index: int = 0) -> int:
+    return (node_operator_id << 192) | (count << 128) | next_index
+
+
+class FakeCsm:
+    """Mutable CSM state (deposit queue + node operators) served through a `FakeChain`.
+
+    `operators` maps id -> dict with deposited/depositable/enqueued keys and is_active.
+    """
+
+    def __init__(self, chain: FakeChain, address: str) -> None:
+        self.address = address
+        self.head = 0
+        self.queue: Dict[int, int] = {}
+        self.operators: Dict[int, Dict[str, Any]] = {}
+        chain.register(
+            address,
+            "csm.json",
+            {
+                "depositQueue": lambda: (self.head, self.tail),
+                "depositQueueItem": lambda i: self.queue[i],
+                "getNodeOperatorsCount": lambda: len(self.operators),
+                "getNodeOperatorIds": lambda off, lim: sorted(self.operators)[off : off + lim],
+                "getNodeOperator": self._node_operator,
+                "getNodeOperatorIsActive": lambda i: self.operators[i]["is_active"],
+                "getNodeOperatorSummary": self._summary,
+            },
+        )
+
+    @property
+    def tail(self) -> int:
+        return max(self.queue) + 1 if self.queue else self.head
+
+    def enqueue(self, node_operator_id: int, count: int) -> None:
+        self.queue[self.tail] = pack_batch(node_operator_id, count)
+
+    def add_operator(self, node_id: int, deposited: int = 0, depositable: int = 0, enqueued: int = 0, is_active: bool = True) -> None:
+        self.operators[node_id] = {
+            "deposited": deposited,
+            "depositable": depositable,
+            "enqueued": enqueued,
+            "is_active": is_active,
+        }
+
+    def _node_operator(self, i):
+        op = self.operators[i]
+        return (
+            op["deposited"] + op["depositable"], 0, op["deposited"], op["deposited"] + op["depositable"],
+            0, op["depositable"], 0, 0, 0, op["enqueued"],
+            ZERO_ADDRESS, ZERO_ADDRESS, ZERO_ADDRESS, ZERO_ADDRESS, False,
+        )
+
+    def _summary(self, i):
+        op = self.operators[i]
+        return (0, 0, 0, 0, 0, 0, op["deposited"], op["depositable"])
+
+
+class FakeRouter:
+    """Staking router serving module digests and per-id getters through a `FakeChain`.
+
+    `modules` maps id -> dict with address, name, share limit, flags and counters.
+    """
+
+    def __init__(self, chain: FakeChain, address: str) -> None:
+        self.address = address
+        self.modules: Dict[int, Dict[str, Any]] = {}
+        chain.register(
+            address,
+            "staking_router.json",
+            {
+                "getAllStakingModuleDigests": self._digests,
+                "getStakingModuleIsActive": lambda i: self.modules[i]["is_active"],
+                "getStakingModuleIsDepositsPaused": lambda i: self.modules[i]["is_deposits_paused"],
+                "getStakingModuleIsStopped": lambda i: self.modules[i]["is_stopped"],
+                "getStakingModuleActiveValidatorsCount": lambda i: self.modules[i]["active_validators"],
+                "getStakingModuleSummary": lambda i: (0, 0, self.modules[i]["depositable_validators"]),
+            },
+        )
+
+    def add_module(self, module_id: int, address: str, name: str = "", share_limit_bps: int = 10000, **fields: Any) -> None:
+        self.modules[module_id] = {
+            "address": address,
+            "name": name or f"module-{module_id}",
+            "share_limit_bps": share_limit_bps,
+            "is_active": True,
+            "is_deposits_paused": False,
+            "is_stopped": False,
+            "active_validators": 0,
+            "depositable_validators": 0,
+            "last_deposit_block": 0,
+            "max_deposits_per_block": 30,
+            "min_deposit_block_distance": 25,
+            **fields,
+        }
+
+    def _digests(self):
+        out = []
+        for mid, m in sorted(self.modules.items()):
+            state = (
+                mid, m["address"], 500, 500, m["share_limit_bps"], 0, m["name"], 0,
+                m["last_deposit_block"], 0, m["share_limit_bps"],
+                m["max_deposits_per_block"], m["min_deposit_block_distance"],
+            )
+            out.append((0, 0, state, (0, 0, m["depositable_validators"])))
+        return out
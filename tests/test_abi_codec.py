@@ -0,0 +1,74 @@
+import random
+
+from eth_abi import encode
+from eth_utils.abi import get_abi_output_types
+from web3 import Web3
+
+from app.config import MULTICALL3_ADDRESS
+from app.eth.abi_loader import load_abi_file
+from app.eth.adapter import EthAdapter
+from app.eth.codec import HOT_FUNCTIONS, PreparedCall, hot_codecs
+from app.eth.multicall import decode_result, encode_call
+
+from fake_chain import FakeChain, FakeCsm
+
+
+CSM = "0x00000000000000000000000000000000000000c5"
+ROUTER = "0x0000000000000000000000000000000000000052"
+
+
+def _random_value(rnd, abi_type):
+    if abi_type == "bool":
+        return rnd.random() < 0.5
+    if abi_type == "address":
+        return Web3.to_checksum_address(rnd.randbytes(20))
+    if abi_type.startswith("("):
+        return tuple(_random_value(rnd, t) for t in _split(abi_type[1:-1]))
+    return rnd.getrandbits(int(abi_type[4:] or 256))
+
+
+def _split(types):
+    # Top-level comma split of a tuple type string
+    out, depth, start = [], 0, 0
+    for i, ch in enumerate(types):
+        depth += ch == "("
+        depth -= ch == ")"
+        if ch == "," and depth == 0:
+            out.append(types[start:i])
+            start = i + 1
+    return out + [types[start:]]
+
+
+def test_precompiled_codec_matches_web3():
+    rnd = random.Random(5)
+    w3 = Web3()
+    for abi_file, address in (("csm.json", CSM), ("staking_router.json", ROUTER)):
+        codecs = hot_codecs(abi_file)
+        contract = w3.eth.contract(address=address, abi=load_abi_file(abi_file))
+        assert set(codecs) == {e["name"] for e in contract.abi if e.get("name") in HOT_FUNCTIONS}
+        for name, codec in codecs.items():
+            for _ in range(20):
+                args = [rnd.getrandbits(64) for _ in codec.encoders]
+                fn = getattr(contract.functions, name)(*args)
+                assert codec.encode(args) == encode_call(fn)[1]
+                types = get_abi_output_types(fn.abi)
+                data = encode(types, [_random_value(rnd, t) for t in types])
+                assert codec.decode(data) == decode_result(fn, data)
+
+
+def test_adapter_caches_contracts_and_prepares_hot_calls():
+    chain = FakeChain()
+    csm = FakeCsm(chain, CSM)
+    csm.add_operator(7, deposited=3, depositable=2, enqueued=2, is_active=True)
+    csm.enqueue(7, 2)
+    adapter = EthAdapter(Web3(chain), multicall_address=MULTICALL3_ADDRESS)
+    contract = adapter.contract(CSM, "csm.json")
+    assert adapter.contract(CSM.upper().replace("0X", "0x"), "csm.json") is contract
+
+    item = contract.functions.depositQueueItem(0)
+    assert isinstance(item, PreparedCall)
+    # Functions outside the hot set stay web3's
+    assert not isinstance(contract.functions.depositQueue(), PreparedCall)
+    assert item.call(block_identifier=100) == csm.queue[0]
+    infos = adapter.call_many([contract.functions.getNodeOperator(7), contract.functions.getNodeOperatorIsActive(7)])
+    assert infos[0].value[2] == 3 and infos[0].value[5] == 2 and infos[1].value is True
@@ -0,0 +1,219 @@
+import json
+import math
+from pathlib import Path
+import random
+import re
+import shutil
+import subprocess
+from dataclasses import asdict
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+import app.deps as deps
+from app.models import Module
+from app.services.allocation import simulate_lowest_share_first, water_fill
+
+
+TEMPLATE = Path(__file__).resolve().parents[1] / "templates" / "simulator.html"
+
+
+def _reference(mods, eth):
+    """Line-by-line port of `simulateLowestShareFirst` (one validator per iteration)."""
+    wanted = max(0, math.floor(eth / 32))
+    V = min(wanted, sum(m.depositable_validators or 0 for m in mods))
+    T0 = sum(m.active_validators or 0 for m in mods)
+    Tfinal = T0 + V
+    items = []
+    for m in mods:
+        A, D = m.active_validators or 0, m.depositable_validators or 0
+        f = m.target_share_bps / 10000 if m.target_share_bps is not None else None
+        eligible = not (m.is_deposits_paused is True or m.is_stopped is True or m.is_active is False)
+        max_after = A + (D if eligible else 0)
+        if eligible and f is not None:
+            max_after = min(max_after, math.ceil(f * Tfinal))
+        items.append({"A": A, "D": D, "after": A, "max": max_after, "f": f, "eligible": eligible})
+    remaining = V
+    while remaining > 0:
+        candidates = [it for it in items if it["eligible"] and it["after"] < it["max"]]
+        if not candidates:
+            break
+        best, best_share = None, math.inf
+        for it in candidates:
+            if it["after"] / Tfinal < best_share:
+                best, best_share = it, it["after"] / Tfinal
+        best["after"] += 1
+        remaining -= 1
+    out = []
+    for it in items:
+        after0 = it["after"]
+        d_rem = max(0, it["D"] - (after0 - it["A"]))
+        if d_rem <= 0:
+            headroom = 0
+        elif not (it["f"] is not None and it["f"] > 0) or not it["eligible"]:
+            headroom = d_rem
+        else:
+            lo, hi = 0, d_rem
+            while lo < hi:
+                mid = math.ceil((lo + hi + 1) / 2)
+                if after0 + mid <= min(it["A"] + it["D"], math.ceil(it["f"] * (Tfinal + mid))):
+                    lo = mid
+                else:
+                    hi = mid - 1
+            headroom = lo
+        share = (after0 / Tfinal) * 100 if Tfinal > 0 else 0
+        out.append((after0 - it["A"], share, headroom))
+    return out
+
+
+def _random_case(rng):
+    mods = [
+        Module(
+            address="0x%040x" % (i + 1),
+            module_id=i + 1,
+            active_validators=rng.choice([0, rng.randint(0, 50), rng.randint(0, 400_000)]),
+            depositable_validators=rng.choice([0, rng.randint(0, 30), rng.randint(0, 20_000)]),
+            target_share_bps=rng.choice([None, 0, 100, 400, 1000, 1500, 10000, rng.randint(1, 10000)]),
+            is_active=rng.choice([True, True, None, False]),
+            is_deposits_paused=rng.choice([False, False, True, None]),
+            is_stopped=rng.choice([False, False, True]),
+        )
+        for i in range(rng.randint(1, 6))
+    ]
+    eth = rng.choice([0, 31, 32, rng.randint(0, 100) * 32, rng.randint(0, 1_000_000), rng.random() * 1e5])
+    return mods, eth
+
+
+def _result(mods, eth):
+    res = simulate_lowest_share_first(mods, eth)
+    return [(a.add_validators, a.share_pct, a.headroom_validators) for a in res.modules]
+
+
+def test_water_fill_levels_and_ties():
+    # Lowest first; ties go to the earliest entry; caps are respected
+    assert water_fill([10, 0, 0, 5], [100, 3, 100, 100], 14) == [10, 3, 8, 8]
+    assert water_fill([0, 0, 0], [10, 10, 10], 4) == [2, 1, 1]
+    assert water_fill([0, 0], [1, 2], 10) == [1, 2]
+    assert water_fill([5, 1], [3, 4], 10) == [5, 4]
+
+
+def test_matches_reference_on_random_modules():
+    rng = random.Random(20240601)
+    for _ in range(1500):
+        mods, eth = _random_case(rng)
+        assert _result(mods, eth) == _reference(mods, eth), (mods, eth)
+
+
+def test_large_deposits_are_constant_time():
+    mods = [
+        Module(address="0x01", active_validators=400_000, depositable_validators=10_000_000, target_share_bps=10000),
+        Module(address="0x02", active_validators=20_000, depositable_validators=10_000_000, target_share_bps=1500),
+        Module(address="0x03", active_validators=1_000, depositable_validators=10_000_000, target_share_bps=400),
+    ]
+    res = simulate_lowest_share_first(mods, 100_000_000)
+    assert res.validators == 3_125_000
+    assert sum(a.add_validators for a in res.modules) == res.validators
+    assert res.total_validators == 421_000 + 3_125_000
+    assert res.modules[2].module.active_validators + res.modules[2].add_validators == math.ceil(
+        0.04 * res.total_validators
+    )
+
+
+def _extract_js(source, name):
+    start = source.index(f"function {name}(")
+    depth = 0
+    for pos in range(source.index("{", start), len(source)):
+        depth += {"{": 1, "}": -1}.get(source[pos], 0)
+        if depth == 0:
+            return source[start : pos + 1]
+    raise AssertionError(f"unbalanced {name}")
+
+
+@pytest.mark.skipif(shutil.which("node") is None, reason="node is not installed")
+def test_matches_simulator_page_javascript():
+    source = TEMPLATE.read_text()
+    script = "\n".join(_extract_js(source, fn) for fn in ("computeCurrentShares", "simulateLowestShareFirst"))
+    rng = random.Random(7)
+    cases = [_random_case(rng) for _ in range(300)]
+    payload = [{"mods": [asdict(m) for m in mods], "eth": eth} for mods, eth in cases]
+    script += """
+const cases = JSON.parse(require('fs').readFileSync(0, 'utf8'));
+console.log(JSON.stringify(cases.map(c => {
+  computeCurrentShares(c.mods);
+  return simulateLowestShareFirst(c.mods, c.eth).map(
+    m => [m._sim_add_validators, m._sim_share_pct, m._sim_headroom_validators]);
+})));
+"""
+    out = subprocess.run(
+        ["node", "-e", script], input=json.dumps(payload), capture_output=True, text=True, check=True, timeout=60
+    )
+    expected = json.loads(out.stdout)
+    for (mods, eth), js in zip(cases, expected):
+        assert [list(r) for r in _result(mods, eth)] == js, (mods, eth)
+
+
+def test_api_simulate():
+    class _Router:
+        def list_modules(self):
+            return [
+                Module(address="0x01", module_id=1, active_validators=100, depositable_validators=50, target_share_bps=10000),
+                Module(address="0x02", module_id=2, active_validators=10, depositable_validators=50, target_share_bps=2000),
+            ]
+
+    app.dependency_overrides[deps.get_router_service] = lambda: _Router()
+    try:
+        client = TestClient(app)
+        res = client.get("/api/simulate", params={"eth": 32 * 40 + 5})
+        bad = client.get("/api/simulate", params={"eth": -1})
+    finally:
+        app.dependency_overrides.clear()
+    assert res.status_code == 200
+    body = res.json()
+    assert body["validators"] == 40 and body["total_validators"] == 150
+    # Module 2 fills up to its 20% cap of 150, the rest goes to module 1
+    assert [m["add_validators"] for m in body["modules"]] == [20, 20]
+    assert body["modules"][1]["add_eth"] == 640
+    assert body["modules"][1]["share_pct"] == 20.0
+    assert body["modules"][0]["headroom_validators"] == 30
+    assert bad.status_code == 422
+
+
+def test_sweep_matches_single_amount_engine():
+    pytest.importorskip("numpy")
+    from app.services.allocation import sweep_lowest_share_first
+
+    rng = random.Random(99)
+    for _ in range(200):
+        mods, _ = _random_case(rng)
+        amounts = [rng.choice([0, 31, 32, rng.randint(0, 2_000_000), rng.random() * 1e6]) for _ in range(40)]
+        sweep = sweep_lowest_share_first(mods, amounts)
+        for k, eth in enumerate(amounts):
+            single = simulate_lowest_share_first(mods, eth)
+            assert sweep.validators[k] == single.validators
+            assert sweep.add_validators[k].tolist() == [a.add_validators for a in single.modules]
+            assert sweep.share_pct[k].tolist() == [a.share_pct for a in single.modules]
+            assert sweep.headroom_validators[k].tolist() == [a.headroom_validators for a in single.modules]
+
+
+def test_api_simulate_sweep_with_supplied_modules():
+    pytest.importorskip("numpy")
+    modules = [
+        {"address": "0x01", "module_id": 1, "active_validators": 100, "depositable_validators": 50,
+         "target_share_bps": 10000, "current_share_pct": 90.9},
+        {"address": "0x02", "module_id": 2, "active_validators": 10, "depositable_validators": 50,
+         "target_share_bps": 2000},
+    ]
+    client = TestClient(app)
+    res = client.post("/api/simulate/sweep", json={"eth": [0, 32 * 40, 32 * 1000], "modules": modules})
+    assert res.status_code == 200
+    body = res.json()
+    assert body["validators"] == [0, 40, 100]
+    assert body["modules"][1]["add_validators"] == [0, 20, 32]
+    assert body["modules"][0]["add_validators"] == [0, 20, 50]
+    assert client.post("/api/simulate/sweep", json={"eth": []}).status_code == 422
+    headers = {"Content-Type": "application/json"}
+    for bad in ('{"eth": [Infinity]}', '{"eth": [NaN]}', '{"eth": [-1]}'):
+        assert client.post("/api/simulate/sweep", content=bad, headers=headers).status_code == 422
+    no_address = [{"module_id": 1, "active_validators": 1}]
+    assert client.post("/api/simulate/sweep", json={"eth": [32], "modules": no_address}).status_code == 422
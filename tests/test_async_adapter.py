@@ -0,0 +1,116 @@
+import asyncio
+import threading
+
+import httpx
+from web3 import AsyncWeb3, Web3
+
+from app.config import MULTICALL3_ADDRESS, Config
+from app.eth.adapter import EthAdapter
+from app.eth.async_adapter import AsyncEthAdapter
+from app.main import app
+import app.deps as deps
+from app.services.csm_service import AsyncCsmService, CsmService
+from app.services.router_service import AsyncRouterService, RouterService
+
+from fake_chain import AsyncFakeChain, FakeChain, FakeCsm, FakeRouter
+
+
+CSM = "0x00000000000000000000000000000000000000c5"
+ROUTER = "0x0000000000000000000000000000000000000052"
+
+
+def _async_adapter(chain, **kwargs):
+    provider = AsyncFakeChain(chain)
+    return provider, AsyncEthAdapter(AsyncWeb3(provider), multicall_address=MULTICALL3_ADDRESS, **kwargs)
+
+
+def test_multicall_chunks_run_concurrently_within_limit():
+    chain = FakeChain()
+    csm = FakeCsm(chain, CSM)
+    for i in range(100):
+        csm.enqueue(i % 7, i + 1)
+    provider, adapter = _async_adapter(chain, multicall_batch_size=10, max_concurrency=3)
+    fns = adapter.contract(CSM, "csm.json").functions
+
+    results = asyncio.run(adapter.multicall([fns.depositQueueItem(i) for i in range(100)]))
+    assert [CsmService._decode_batch(r.value) for r in results] == [(i % 7, i + 1) for i in range(100)]
+    assert chain.requests["eth_call"] == 10
+    assert provider.max_in_flight == 3
+
+
+def test_async_csm_service_matches_sync_service():
+    chain = FakeChain()
+    csm = FakeCsm(chain, CSM)
+    for node_id in range(30):
+        csm.add_operator(node_id, deposited=node_id, depositable=2, enqueued=2, is_active=node_id % 3 != 0)
+        csm.enqueue(node_id, 2)
+    cfg = Config(eth_rpc_url="http://fake", csm_address=CSM)
+    full = Config(
+        eth_rpc_url="http://fake", csm_address=CSM, csm_incremental_queue=False, csm_incremental_operators=False
+    )
+    sync = CsmService(full, EthAdapter(Web3(chain), multicall_address=MULTICALL3_ADDRESS))
+    _, adapter = _async_adapter(chain)
+    service = AsyncCsmService(cfg, adapter)
+
+    async def run():
+        first = await service.snapshot()
+        expected.append(sync._build_snapshot(100))
+        chain.block_number += 1
+        csm.head = 5
+        csm.enqueue(3, 4)
+        csm.operators[3]["depositable"] = 4
+        chain.emit(CSM, "csm.json", "DepositableSigningKeysCountChanged", 3)
+        return first, await service.snapshot()
+
+    expected = []
+    first, second = asyncio.run(run())
+    assert first == expected[0]
+    assert second == sync._build_snapshot(101)
+    # The second snapshot is synced incrementally from the mirrors
+    assert service.queue_sync_stats["incremental"] == 1
+    assert service.operator_sync_stats["incremental"] == 1
+    assert service.operator_sync_stats["operators_fetched"] == 31
+
+
+def test_async_router_service_matches_sync_service():
+    chain = FakeChain()
+    router = FakeRouter(chain, ROUTER)
+    for mid in range(1, 4):
+        router.add_module(mid, "0x" + f"{mid:040x}", "m%d" % mid, 1000 * mid, active_validators=mid)
+    cfg = Config(eth_rpc_url="http://fake", staking_router_address=ROUTER)
+    sync = RouterService(cfg, EthAdapter(Web3(chain), multicall_address=MULTICALL3_ADDRESS))
+    _, adapter = _async_adapter(chain)
+
+    modules = asyncio.run(AsyncRouterService(cfg, adapter).list_modules())
+    assert modules == sync.list_modules()
+    assert [m.active_validators for m in modules] == [1, 2, 3]
+
+
+def test_sync_services_do_not_block_the_event_loop():
+    release = threading.Event()
+
+    class SlowCsm:
+        def snapshot(self):
+            release.wait(5)
+            return {"queue": {}, "node_operators": [], "block_number": 1}
+
+    app.dependency_overrides[deps.get_csm_service] = lambda: SlowCsm()
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            slow = asyncio.create_task(client.get("/api/csm/state"))
+            await asyncio.sleep(0.05)
+            health = await asyncio.wait_for(client.get("/healthz"), 2)
+            done_before_release = slow.done()
+            release.set()
+            return health, done_before_release, await slow
+
+    try:
+        health, done_before_release, slow = asyncio.run(run())
+    finally:
+        release.set()
+        app.dependency_overrides.clear()
+    assert health.status_code == 200
+    assert not done_before_release
+    assert slow.json()["block_number"] == 1
@@ -0,0 +1,205 @@
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+import sqlite3
+import threading
+import time
+
+from fastapi.testclient import TestClient
+
+from web3 import Web3
+
+from app.backfill import init_worker, run_backfill
+from app.config import MULTICALL3_ADDRESS, Config
+from app.eth.adapter import EthAdapter
+from app.main import app
+import app.deps as deps
+from app.services.csm_service import CsmService
+from app.services.router_service import RouterService
+from app.services.snapshot_archive import SnapshotArchive
+from app.services.snapshot_cache import SnapshotCache
+
+from fake_chain import FakeChain, FakeCsm, FakeRouter
+
+
+CSM = "0x00000000000000000000000000000000000000c5"
+ROUTER = "0x00000000000000000000000000000000000000aa"
+
+
+def _services(chain):
+    csm = FakeCsm(chain, CSM)
+    for node_id in range(5):
+        csm.add_operator(node_id, deposited=node_id, depositable=2, enqueued=2, is_active=True)
+        csm.enqueue(node_id, 2)
+    router = FakeRouter(chain, ROUTER)
+    router.add_module(1, "0x" + "11" * 20, active_validators=10)
+    cfg = Config(eth_rpc_url="http://fake", csm_address=CSM, staking_router_address=ROUTER)
+    adapter = EthAdapter(Web3(chain), multicall_address=MULTICALL3_ADDRESS)
+    return CsmService(cfg, adapter), RouterService(cfg, adapter)
+
+
+def test_backfill_pins_blocks_and_resumes(tmp_path):
+    chain = FakeChain(block_number=200)
+    archive = SnapshotArchive(str(tmp_path / "archive.sqlite3"))
+    services = _services(chain)
+    with ThreadPoolExecutor(1, initializer=init_worker, initargs=(None, services)) as pool:
+        stats = run_backfill(archive, range(100, 110, 2), pool, shard_size=2)
+
+    assert (stats.requested, stats.written, stats.skipped, stats.failed) == (5, 5, 0, 0)
+    assert archive.archived() == [100, 102, 104, 106, 108]
+    assert {hex(b) for b in range(100, 110, 2)} <= set(chain.call_blocks)
+    assert "latest" not in chain.call_blocks
+    csm = archive.csm_at(104)
+    assert csm["block_number"] == 104
+    assert csm["queue"]["size"] == 5
+    assert archive.modules_at(104)[0].active_validators == 10
+    assert archive.csm_at(105) is None
+
+    # A second, wider run only builds the missing blocks
+    calls = chain.requests["eth_call"]
+    with ThreadPoolExecutor(2, initializer=init_worker, initargs=(None, services)) as pool:
+        stats = run_backfill(archive, range(100, 114, 2), pool, shard_size=2)
+    assert (stats.written, stats.skipped) == (2, 5)
+    assert archive.archived(105) == [106, 108, 110, 112]
+    assert chain.requests["eth_call"] > calls
+
+
+def _snapshot(block, operators):
+    return {
+        "queue": {"head": 0, "tail": 0, "size": 0, "items": []},
+        "node_operators": [{"id": i, "deposited_keys": block if i == 0 else 0} for i in range(operators)],
+        "block_number": block,
+    }
+
+
+class _Shards:
+    """CSM service whose shards finish in reverse order."""
+
+    def __init__(self, release_after):
+        self.release_after = release_after
+        self.gate = threading.Event()
+
+    def snapshot(self, block):
+        if block < self.release_after and not self.gate.wait(5):
+            raise RuntimeError("later shard never finished")
+        if block >= self.release_after:
+            self.gate.set()
+        return _snapshot(block, 3)
+
+
+def test_backfill_stores_consecutive_blocks_as_deltas_in_block_order(tmp_path):
+    archive = SnapshotArchive(str(tmp_path / "archive.sqlite3"), keyframe_every=256)
+    with ThreadPoolExecutor(2, initializer=init_worker, initargs=(None, (_Shards(20), None))) as pool:
+        stats = run_backfill(archive, range(10, 30), pool, shard_size=10)
+
+    assert (stats.written, stats.failed) == (20, 0)
+    assert _keyframes(archive) == [10]
+    assert archive.csm_at(25)["node_operators"][0]["deposited_keys"] == 25
+
+
+def _keyframes(archive):
+    with closing(sqlite3.connect(archive.path)) as conn:
+        return [row[0] for row in conn.execute("SELECT block FROM csm WHERE base = block ORDER BY block")]
+
+
+def test_every_nth_block_is_stored_as_deltas(tmp_path):
+    archive = SnapshotArchive(str(tmp_path / "archive.sqlite3"))
+    with ThreadPoolExecutor(2, initializer=init_worker, initargs=(None, (_Shards(0), None))) as pool:
+        run_backfill(archive, range(10, 60, 5), pool, shard_size=3)
+    assert _keyframes(archive) == [10]
+    assert [archive.csm_at(b)["node_operators"][0]["deposited_keys"] for b in range(10, 60, 5)] == list(
+        range(10, 60, 5)
+    )
+
+
+def test_backfilled_blocks_outlive_the_retention(tmp_path):
+    archive = SnapshotArchive(str(tmp_path / "archive.sqlite3"), keyframe_every=4, retention_blocks=10)
+    with ThreadPoolExecutor(1, initializer=init_worker, initargs=(None, (_Shards(0), None))) as pool:
+        run_backfill(archive, range(100, 150), pool)
+    # The follower then archives blocks far ahead, pruning its own older ones
+    for block in range(300, 320):
+        archive.append(block, _snapshot(block, 3), None)
+
+    assert archive.archived(0, 199) == list(range(100, 150))
+    assert archive.csm_at(100)["block_number"] == 100 and archive.csm_at(149)["block_number"] == 149
+    assert archive.archived(200)[0] > 300
+
+
+def test_router_only_backfill_resumes(tmp_path):
+    archive = SnapshotArchive(str(tmp_path / "archive.sqlite3"))
+    router = _services(FakeChain(block_number=200))[1]
+    with ThreadPoolExecutor(1, initializer=init_worker, initargs=(None, (None, router))) as pool:
+        run_backfill(archive, range(100, 104), pool)
+        stats = run_backfill(archive, range(100, 106), pool)
+    assert (stats.written, stats.skipped) == (2, 4)
+    assert archive.modules_at(105)[0].active_validators == 10
+
+
+def test_backfill_bounds_the_shards_ahead_of_a_slow_one(tmp_path):
+    archive = SnapshotArchive(str(tmp_path / "archive.sqlite3"))
+
+    class Counting(ThreadPoolExecutor):
+        submitted = 0
+
+        def submit(self, *args, **kwargs):
+            Counting.submitted += 1
+            return super().submit(*args, **kwargs)
+
+    seen = []
+
+    class Slow:
+        def snapshot(self, block):
+            if block == 0:
+                time.sleep(0.2)
+                seen.append(Counting.submitted)
+            return _snapshot(block, 1)
+
+    with Counting(4, initializer=init_worker, initargs=(None, (Slow(), None))) as pool:
+        stats = run_backfill(archive, range(0, 20), pool, shard_size=1, max_pending=3)
+    assert stats.written == 20
+    assert seen == [3]
+
+
+def test_backfilled_blocks_are_served_by_the_api(tmp_path):
+    archive = SnapshotArchive(str(tmp_path / "archive.sqlite3"))
+    chain = FakeChain(block_number=200)
+    with ThreadPoolExecutor(1, initializer=init_worker, initargs=(None, _services(chain))) as pool:
+        run_backfill(archive, range(100, 104), pool)
+
+    class _Unused:
+        def snapshot(self):
+            raise AssertionError("served from the archive")
+
+    app.dependency_overrides[deps.get_csm_service] = lambda: _Unused()
+    app.dependency_overrides[deps.get_router_service] = lambda: _Unused()
+    app.dependency_overrides[deps.get_snapshot_archive] = lambda: archive
+    app.dependency_overrides[deps.get_snapshot_cache] = lambda: SnapshotCache()
+    try:
+        client = TestClient(app)
+        state = client.get("/api/csm/state", params={"block": 102})
+        modules = client.get("/api/modules", params={"block": 103})
+    finally:
+        app.dependency_overrides.clear()
+    assert state.status_code == 200 and state.json()["block_number"] == 102
+    assert modules.status_code == 200 and modules.json()[0]["active_validators"] == 10
+
+
+def test_backfill_leaves_failed_blocks_for_the_next_run(tmp_path):
+    archive = SnapshotArchive(str(tmp_path / "archive.sqlite3"))
+
+    class Flaky:
+        def snapshot(self, block):
+            if block == 3:
+                raise RuntimeError("rpc down")
+            return _snapshot(block, 0)
+
+    with ThreadPoolExecutor(1, initializer=init_worker, initargs=(None, (Flaky(), None))) as pool:
+        stats = run_backfill(archive, range(1, 6), pool)
+    assert (stats.written, stats.failed) == (4, 1)
+    assert archive.archived() == [1, 2, 4, 5]
+    assert archive.modules_at(2) is None
+
+    # The retried block fills the gap without breaking the blocks after it
+    with ThreadPoolExecutor(1, initializer=init_worker, initargs=(None, (_Shards(0), None))) as pool:
+        stats = run_backfill(archive, range(1, 6), pool)
+    assert (stats.written, stats.skipped) == (1, 4)
+    assert [archive.csm_at(b)["block_number"] for b in range(1, 6)] == [1, 2, 3, 4, 5]
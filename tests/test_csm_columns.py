@@ -0,0 +1,50 @@
+import random
+
+from app.services.csm_columns import OperatorColumns, QueueColumns, decode_batches, snapshot_to_json
+from app.services.csm_service import CsmService
+from app.services.snapshot_cache import approx_size
+
+
+def test_bulk_decode_matches_single_word_decode():
+    rnd = random.Random(3)
+    words = [rnd.getrandbits(256) for _ in range(500)] + [2**256 - 1, 0, (5 << 192) | (7 << 128) | 123]
+    ids, counts = decode_batches(words)
+    assert list(zip(ids, counts)) == [CsmService._decode_batch(w) for w in words]
+
+
+def test_queue_columns_read_as_dicts_and_sync_in_place():
+    queue = QueueColumns.decode(range(10, 14), [(i << 192) | ((i + 1) << 128) for i in range(4)])
+    assert len(queue) == 4
+    assert queue[1] == {"index": 11, "node_operator_id": 1, "count": 2}
+    assert list(queue) == queue.to_dicts()
+
+    copy = queue.copy()
+    queue.drop_before(12)
+    # Head batch partially deposited, two batches appended
+    queue.update(QueueColumns.decode([12, 14, 15], [(2 << 192) | (1 << 128), 9 << 128, 8 << 128]))
+    assert list(queue.rows()) == [(12, 2, 1), (13, 3, 4), (14, 0, 9), (15, 0, 8)]
+    assert queue.find(13) == 1 and queue.find(11) is None
+    # Copies do not share storage
+    assert len(copy) == 4 and copy[0]["index"] == 10
+
+
+def test_operator_columns_round_trip_records():
+    records = [
+        {"id": 3, "deposited_keys": 5, "depositable_keys": 2, "enqueued_keys": 2, "is_active": True},
+        {"id": 1, "deposited_keys": 0, "depositable_keys": 0, "enqueued_keys": 0, "is_active": None},
+    ]
+    positions = {3: {"first_queue_index": 7, "queued_keys_total": 2, "position_keys_ahead": 4}}
+    ops = OperatorColumns.from_records(records, positions)
+    assert ops.to_dicts() == [{**records[0], **positions[3]}, records[1]]
+    assert ops.get(1) == records[1] and ops.get(2) is None
+    assert ops.depositable() == {3: 2, 1: 0}
+
+
+def test_snapshot_is_columnar_until_serialized():
+    items = QueueColumns.decode(range(100_000), [(i % 900 << 192) | (3 << 128) for i in range(100_000)])
+    snapshot = CsmService._assemble_snapshot({"head": 0, "tail": 100_000, "size": 100_000, "items": items}, [], 5)
+    assert isinstance(snapshot["node_operators"], OperatorColumns)
+    as_json = snapshot_to_json(snapshot)
+    assert as_json["queue"]["items"][-1] == {"index": 99_999, "node_operator_id": 99_999 % 900, "count": 3}
+    # An order of magnitude smaller than the same items as dicts
+    assert approx_size(snapshot) * 10 < approx_size(as_json)
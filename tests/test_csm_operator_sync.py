@@ -0,0 +1,94 @@
+from web3 import Web3
+
+from app.config import MULTICALL3_ADDRESS, Config
+from app.eth.adapter import EthAdapter
+from app.services.csm_service import CsmService
+
+from fake_chain import FakeChain, FakeCsm
+
+
+CSM = "0x00000000000000000000000000000000000000c5"
+
+
+def _setup(n_operators=200, **cfg_kwargs):
+    chain = FakeChain()
+    csm = FakeCsm(chain, CSM)
+    for node_id in range(n_operators):
+        csm.add_operator(node_id, deposited=10, depositable=2, enqueued=2)
+    adapter = EthAdapter(Web3(chain), multicall_address=MULTICALL3_ADDRESS)
+    service = CsmService(Config(eth_rpc_url="http://fake", csm_address=CSM, **cfg_kwargs), adapter)
+    return chain, csm, service
+
+
+def _emit(chain, event, node_id):
+    chain.emit(CSM, "csm.json", event, node_id)
+
+
+def test_only_operators_with_events_are_reread():
+    chain, csm, service = _setup()
+    service.list_node_operators(chain.block_number)
+    assert service.operator_sync_stats == {"full": 1, "incremental": 0, "operators_fetched": 200}
+
+    chain.block_number += 1
+    csm.operators[7].update(deposited=12, depositable=0)
+    _emit(chain, "DepositedSigningKeysCountChanged", 7)
+    _emit(chain, "DepositableSigningKeysCountChanged", 7)
+    csm.operators[42]["enqueued"] = 5
+    _emit(chain, "BatchEnqueued", 42)
+    chain.block_number += 1
+    # Unrelated events are ignored
+    _emit(chain, "ELRewardsStealingPenaltySettled", 99)
+
+    ops = {op["id"]: op for op in service.list_node_operators(chain.block_number)}
+    assert ops[7]["deposited_keys"] == 12 and ops[7]["depositable_keys"] == 0
+    assert ops[42]["enqueued_keys"] == 5
+    assert service.operator_sync_stats == {"full": 1, "incremental": 1, "operators_fetched": 202}
+    assert ops == {op["id"]: op for op in service.list_node_operators(chain.block_number, full=True)}
+
+
+def test_new_operators_are_picked_up_from_logs():
+    chain, csm, service = _setup(n_operators=3)
+    service.list_node_operators(chain.block_number)
+    chain.block_number += 1
+    csm.add_operator(3, depositable=4)
+    chain.emit(CSM, "csm.json", "NodeOperatorAdded", 3, 0, 0)
+    ops = service.list_node_operators(chain.block_number)
+    assert [op["id"] for op in ops] == [0, 1, 2, 3]
+    assert ops[3]["depositable_keys"] == 4
+    assert service.operator_sync_stats["full"] == 1
+
+
+def test_operator_count_mismatch_falls_back_to_full_read():
+    chain, csm, service = _setup(n_operators=3)
+    service.list_node_operators(chain.block_number)
+    chain.block_number += 1
+    csm.add_operator(3)  # no event emitted
+    ops = service.list_node_operators(chain.block_number)
+    assert len(ops) == 4
+    assert service.operator_sync_stats["full"] == 2
+
+
+def test_periodic_reconciliation_and_reorgs_reread_everything():
+    chain, csm, service = _setup(n_operators=5, csm_operators_reconcile_blocks=10)
+    service.list_node_operators(chain.block_number)
+    chain.block_number += 5
+    csm.operators[1]["is_active"] = False  # changes without an event
+    assert service.list_node_operators(chain.block_number)[1]["is_active"] is True
+    assert service.operator_sync_stats["incremental"] == 1
+
+    chain.block_number += 5
+    assert service.list_node_operators(chain.block_number)[1]["is_active"] is False
+    assert service.operator_sync_stats["full"] == 2
+
+    chain.fork += 1
+    chain.block_number += 1
+    service.list_node_operators(chain.block_number)
+    assert service.operator_sync_stats["full"] == 3
+
+
+def test_log_scan_is_split_into_block_ranges():
+    chain, csm, service = _setup(n_operators=2, csm_log_block_range=10)
+    service.list_node_operators(chain.block_number)
+    chain.block_number += 35
+    service.list_node_operators(chain.block_number)
+    assert chain.requests["eth_getLogs"] == 4
@@ -0,0 +1,119 @@
+from fastapi.testclient import TestClient
+from web3 import Web3
+
+from app.config import MULTICALL3_ADDRESS, Config
+from app.eth.adapter import EthAdapter
+from app.main import app
+import app.deps as deps
+from app.services import csm_pages
+from app.services.csm_columns import OperatorColumns, snapshot_to_json
+from app.services.csm_pages import CsmFilters, operators_page, queue_page
+from app.services.csm_service import CsmService
+from app.services.snapshot_cache import SnapshotCache
+
+from fake_chain import FakeChain, FakeCsm
+
+
+CSM = "0x00000000000000000000000000000000000000c5"
+
+
+def _setup():
+    chain = FakeChain()
+    csm = FakeCsm(chain, CSM)
+    for node_id in range(20):
+        csm.add_operator(node_id, depositable=node_id % 3, enqueued=2, is_active=node_id % 4 != 0)
+    for i in range(60):
+        # Operators 15..19 never enqueue
+        csm.enqueue(i % 15, 1 + i % 2)
+    cache = SnapshotCache()
+    service = CsmService(
+        Config(eth_rpc_url="http://fake", csm_address=CSM),
+        EthAdapter(Web3(chain), multicall_address=MULTICALL3_ADDRESS),
+        cache=cache,
+    )
+    return chain, csm, service, cache
+
+
+def _pages(client, path, cursor=0, block=None, **params):
+    """Items of a listing from `cursor` on, following `next_cursor` at the first page's block."""
+    items = []
+    while cursor is not None:
+        res = client.get(path, params={**params, "cursor": cursor, **({"block": block} if block else {})})
+        assert res.status_code == 200, res.text
+        body = res.json()
+        block = block or body["block_number"]
+        assert body["block_number"] == block
+        items.extend(body["items"])
+        cursor = body["next_cursor"]
+    return items
+
+
+def test_page_functions_filter_and_continue_from_cursor():
+    ops = [
+        {"id": i, "depositable_keys": i % 2, "is_active": i != 3, **({"first_queue_index": i} if i < 4 else {})}
+        for i in range(6)
+    ]
+    items = [{"index": 10 + i, "node_operator_id": i % 4, "count": 1} for i in range(8)]
+    snapshot = {"queue": {"items": items}, "node_operators": ops, "block_number": 1}
+
+    first = queue_page(snapshot, 0, 3, CsmFilters())
+    assert [it["index"] for it in first.items] == [10, 11, 12] and first.next_cursor == 13
+    assert queue_page(snapshot, 16, 3, CsmFilters()).next_cursor is None
+    odd = queue_page(snapshot, 0, 10, CsmFilters(has_depositable=True, active_only=True))
+    assert [it["node_operator_id"] for it in odd.items] == [1, 1]
+    picked = queue_page(snapshot, 12, 10, CsmFilters(operator_ids=frozenset({0, 2}), in_queue=True))
+    assert [it["index"] for it in picked.items] == [12, 14, 16]
+
+    queued = operators_page(snapshot, 0, 2, CsmFilters(in_queue=True))
+    assert [op["id"] for op in queued.items] == [0, 1] and queued.next_cursor == 2
+    assert [op["id"] for op in operators_page(snapshot, 2, 5, CsmFilters(in_queue=True)).items] == [2, 3]
+    # Unknown ids are ignored
+    wanted = operators_page(snapshot, 0, 5, CsmFilters(operator_ids=frozenset({5, 1, 99}), active_only=True))
+    assert [op["id"] for op in wanted.items] == [1, 5] and wanted.next_cursor is None
+
+
+def test_operator_order_is_computed_once_per_snapshot_and_filters(monkeypatch):
+    ops = OperatorColumns.from_records({"id": i, "depositable_keys": i % 2} for i in reversed(range(1000)))
+    snapshot = {"queue": {"items": []}, "node_operators": ops, "block_number": 1}
+    calls = []
+    matching = csm_pages._matching_operators
+    monkeypatch.setattr(csm_pages, "_matching_operators", lambda *args: calls.append(args) or matching(*args))
+
+    ids, cursor = [], 0
+    while cursor is not None:
+        page = operators_page(snapshot, cursor, 100, CsmFilters(has_depositable=True))
+        ids.extend(op["id"] for op in page.items)
+        cursor = page.next_cursor
+    assert ids == list(range(1, 1000, 2)) and len(calls) == 1
+    operators_page(snapshot, 0, 100, CsmFilters())
+    assert len(calls) == 2
+
+    # Changed columns drop the memoized order
+    ops.update(OperatorColumns.from_records([{"id": 1000, "depositable_keys": 1}]))
+    assert operators_page(snapshot, 998, 100, CsmFilters(has_depositable=True)).items[-1]["id"] == 1000
+    assert len(calls) == 3
+
+
+def test_pages_are_pinned_to_the_first_page_block():
+    chain, csm, service, cache = _setup()
+    app.dependency_overrides[deps.get_csm_service] = lambda: service
+    app.dependency_overrides[deps.get_snapshot_cache] = lambda: cache
+    try:
+        client = TestClient(app)
+        first = client.get("/api/csm/queue", params={"limit": 7}).json()
+        # The chain moves on between pages
+        csm.head = 30
+        chain.block_number += 1
+        calls = sum(chain.requests.values())
+        rest = _pages(client, "/api/csm/queue", limit=7, cursor=first["next_cursor"], block=first["block_number"])
+        operators = _pages(client, "/api/csm/node-operators", limit=6, block=100, active_only=True)
+        assert sum(chain.requests.values()) == calls
+        evicted = client.get("/api/csm/queue", params={"block": 99})
+    finally:
+        app.dependency_overrides.clear()
+
+    expected = snapshot_to_json(cache.get(("csm", 100)))
+    assert first["items"] + rest == expected["queue"]["items"]
+    assert [it["index"] for it in rest] == list(range(7, 60))
+    assert operators == [op for op in expected["node_operators"] if op["is_active"]]
+    assert evicted.status_code == 410
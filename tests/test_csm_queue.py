@@ -0,0 +1,150 @@
+import random
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+import app.deps as deps
+from app.services.csm_queue import QueueIndex
+from app.services.csm_service import CsmService
+
+
+def _items(batches, head=0):
+    return [{"index": head + i, "node_operator_id": no_id, "count": cnt} for i, (no_id, cnt) in enumerate(batches)]
+
+
+def _reference(batches, depositable, keys):
+    """CSM obtainDepositData: consume batches from the head, capped by depositable keys."""
+    left = dict(depositable)
+    out, stop, remaining = {}, None, 0
+    for pos, (no_id, cnt) in enumerate(batches):
+        if keys <= 0:
+            break
+        # Operators without a known depositable count are not capped
+        take = min(cnt, left.get(no_id, cnt), keys)
+        if take <= 0:
+            continue
+        if no_id in left:
+            left[no_id] -= take
+        keys -= take
+        out[no_id] = out.get(no_id, 0) + take
+        stop, remaining = pos, cnt - take
+    return out, stop, remaining
+
+
+def test_deposit_matches_sequential_queue_walk():
+    rnd = random.Random(11)
+    for _ in range(200):
+        batches = [(rnd.randint(0, 8), rnd.randint(1, 10)) for _ in range(rnd.randint(0, 40))]
+        depositable = {no_id: rnd.choice([0, 1, 3, 100]) for no_id in range(0, 9, 2)}
+        index = QueueIndex(_items(batches, head=50), depositable)
+        for keys in range(0, index.total_keys + 3):
+            got = index.deposit(keys)
+            operators, stop, remaining = _reference(batches, depositable, keys)
+            assert got.keys == min(keys, index.total_keys)
+            assert got.operators == operators
+            assert got.stop_queue_index == (None if stop is None else 50 + stop)
+            assert got.remaining_in_batch == remaining
+
+
+def test_partial_batches_and_operators_without_depositable_keys():
+    # Operator 2 has no depositable keys; operator 1 only 4 of its 5 queued keys
+    index = QueueIndex(_items([(1, 2), (2, 3), (1, 3), (3, 4)]), {1: 4, 2: 0})
+    assert index.total_keys == 8
+    first = index.deposit_eth(32 * 3 + 31)
+    assert first.keys == 3 and first.operators == {1: 3}
+    # The last key comes from batch 2, which keeps its other 2 keys
+    assert (first.stop_queue_index, first.remaining_in_batch) == (2, 2)
+    assert index.deposit(5).operators == {1: 4, 3: 1}
+    assert index.deposit(5).remaining_in_batch == 3
+    assert index.deposit(100).operators == {1: 4, 3: 4}
+
+
+def test_positions_match_queue_walk():
+    batches = [(1, 2), (2, 1), (1, 3), (4, 5)]
+    assert CsmService._compute_positions(_items(batches, head=10)) == {
+        1: {"first_queue_index": 10, "queued_keys_total": 5, "position_keys_ahead": 0},
+        2: {"first_queue_index": 11, "queued_keys_total": 1, "position_keys_ahead": 2},
+        4: {"first_queue_index": 13, "queued_keys_total": 5, "position_keys_ahead": 6},
+    }
+
+
+def test_api_csm_simulate():
+    class _Csm:
+        def snapshot(self):
+            return {
+                "queue": {"head": 10, "tail": 13, "size": 3, "items": _items([(1, 2), (2, 1), (1, 3)], head=10)},
+                "node_operators": [{"id": 1, "depositable_keys": 5}, {"id": 2, "depositable_keys": 0}],
+                "block_number": 7,
+            }
+
+        def queue_index(self, snapshot):
+            return QueueIndex.from_snapshot(snapshot)
+
+    app.dependency_overrides[deps.get_csm_service] = lambda: _Csm()
+    try:
+        client = TestClient(app)
+        res = client.get("/api/csm/simulate", params=[("eth", 64), ("eth", 100), ("eth", 10_000)])
+        bad = client.get("/api/csm/simulate", params={"eth": -32})
+    finally:
+        app.dependency_overrides.clear()
+    assert res.status_code == 200
+    body = res.json()
+    assert body["block_number"] == 7 and body["queue_keys"] == 5
+    assert [r["keys"] for r in body["results"]] == [2, 3, 5]
+    assert body["results"][1] == {
+        "eth": 100,
+        "keys": 3,
+        "stop_queue_index": 12,
+        "remaining_in_batch": 2,
+        "operators": [{"id": 1, "keys": 3}],
+    }
+    assert bad.status_code == 422
+
+
+def test_operator_lookup_lists_batches_with_keys_ahead():
+    snapshot = {
+        "queue": {"items": _items([(1, 2), (2, 1), (1, 3)], head=10)},
+        "node_operators": [{"id": 1, "depositable_keys": 5}, {"id": 2, "depositable_keys": 0}, {"id": 3}],
+    }
+    index = QueueIndex.from_snapshot(snapshot)
+    assert index.operator(1) == {
+        "id": 1,
+        "depositable_keys": 5,
+        "batches": [{"index": 10, "count": 2, "keys_ahead": 0}, {"index": 12, "count": 3, "keys_ahead": 3}],
+    }
+    assert index.operator(3) == {"id": 3, "batches": []}
+    assert index.operator(4) is None
+
+
+def test_api_csm_operators():
+    class _Csm:
+        def snapshot(self):
+            return {
+                "queue": {"items": _items([(1, 2), (2, 1), (1, 3)], head=10)},
+                "node_operators": [{"id": 1, "depositable_keys": 5}, {"id": 2, "depositable_keys": 0}],
+                "block_number": 7,
+            }
+
+        def queue_index(self, snapshot):
+            return QueueIndex.from_snapshot(snapshot)
+
+    app.dependency_overrides[deps.get_csm_service] = lambda: _Csm()
+    try:
+        client = TestClient(app)
+        one = client.get("/api/csm/operators/2")
+        unknown = client.get("/api/csm/operators/9")
+        bulk = client.get("/api/csm/operators", params={"ids": "2, 9,1,2"})
+        bad = client.get("/api/csm/operators", params={"ids": "1,x"})
+    finally:
+        app.dependency_overrides.clear()
+    assert one.json() == {
+        "block_number": 7,
+        "id": 2,
+        "depositable_keys": 0,
+        "batches": [{"index": 11, "count": 1, "keys_ahead": 2}],
+    }
+    assert unknown.status_code == 404
+    body = bulk.json()
+    assert [op["id"] for op in body["operators"]] == [2, 1]
+    assert body["missing"] == [9]
+    assert bad.status_code == 422
@@ -0,0 +1,101 @@
+from web3 import Web3
+
+from app.config import MULTICALL3_ADDRESS, Config
+from app.eth.adapter import EthAdapter
+from app.services.csm_service import CsmService
+
+from fake_chain import FakeChain, FakeCsm, pack_batch
+
+
+CSM = "0x00000000000000000000000000000000000000c5"
+
+
+def _setup(n_batches=50, **cfg_kwargs):
+    chain = FakeChain()
+    csm = FakeCsm(chain, CSM)
+    for i in range(n_batches):
+        csm.enqueue(i % 10, 3)
+    adapter = EthAdapter(Web3(chain), multicall_address=MULTICALL3_ADDRESS)
+    service = CsmService(Config(eth_rpc_url="http://fake", csm_address=CSM, **cfg_kwargs), adapter)
+    return chain, csm, service
+
+
+def _items(queue):
+    return [(it["index"], it["node_operator_id"], it["count"]) for it in queue["items"]]
+
+
+def _advance(chain, csm, deposited_batches=0, new_batches=(), partial=None):
+    csm.head += deposited_batches
+    for node_id, count in new_batches:
+        csm.enqueue(node_id, count)
+    if partial is not None:
+        csm.queue[csm.head] = pack_batch(csm.queue[csm.head] >> 192, partial)
+    chain.block_number += 1
+
+
+def test_incremental_sync_fetches_only_new_batches():
+    chain, csm, service = _setup()
+    service.get_queue(chain.block_number)
+    assert service.queue_sync_stats == {"full": 1, "incremental": 0, "items_fetched": 50}
+
+    _advance(chain, csm, deposited_batches=5, new_batches=[(42, 7), (43, 1)])
+    queue = service.get_queue(chain.block_number)
+    assert queue["head"] == 5 and queue["tail"] == 52 and queue["size"] == 47
+    assert _items(queue)[-2:] == [(50, 42, 7), (51, 43, 1)]
+    # Two new batches plus the re-read head batch
+    assert service.queue_sync_stats == {"full": 1, "incremental": 1, "items_fetched": 53}
+    assert _items(queue) == _items(service.get_queue(chain.block_number, full=True))
+
+
+def test_partially_consumed_head_batch_is_updated_in_place():
+    chain, csm, service = _setup()
+    service.get_queue(chain.block_number)
+    _advance(chain, csm, deposited_batches=2, partial=1)
+    queue = service.get_queue(chain.block_number)
+    assert _items(queue)[0] == (2, 2, 1)
+    assert service.queue_sync_stats["full"] == 1
+
+
+def test_reorg_triggers_full_revalidation():
+    chain, csm, service = _setup()
+    service.get_queue(chain.block_number)
+    # The synced block is replaced; an older batch now belongs to another operator
+    chain.fork += 1
+    csm.queue[30] = pack_batch(99, 3)
+    _advance(chain, csm)
+    queue = service.get_queue(chain.block_number)
+    assert (30, 99, 3) in _items(queue)
+    assert service.queue_sync_stats["full"] == 2
+
+
+def test_changed_head_batch_triggers_full_revalidation():
+    chain, csm, service = _setup()
+    service.get_queue(chain.block_number)
+    csm.queue[0] = pack_batch(77, 3)
+    csm.queue[20] = pack_batch(78, 3)
+    _advance(chain, csm)
+    queue = service.get_queue(chain.block_number)
+    assert (20, 78, 3) in _items(queue)
+    assert service.queue_sync_stats["full"] == 2
+
+
+def test_same_block_and_older_blocks_do_not_touch_the_mirror():
+    chain, csm, service = _setup()
+    service.get_queue(chain.block_number)
+    calls = chain.requests["eth_call"]
+    service.get_queue(chain.block_number)
+    assert chain.requests["eth_call"] == calls
+
+    # An older block is a plain full read and leaves the mirror as is
+    service.get_queue(chain.block_number - 1)
+    assert service.queue_sync_stats["full"] == 1
+    assert service._queue_mirror.block == chain.block_number
+
+
+def test_full_read_when_incremental_sync_disabled():
+    chain, csm, service = _setup(csm_incremental_queue=False)
+    service.get_queue(chain.block_number)
+    _advance(chain, csm, new_batches=[(1, 1)])
+    service.get_queue(chain.block_number)
+    assert service._queue_mirror is None
+    assert service.queue_sync_stats["items_fetched"] == 101
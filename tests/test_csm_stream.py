@@ -0,0 +1,90 @@
+import json
+
+from fastapi.testclient import TestClient
+from web3 import AsyncWeb3, Web3
+
+from app.config import MULTICALL3_ADDRESS, Config
+from app.eth.adapter import EthAdapter
+from app.eth.async_adapter import AsyncEthAdapter
+from app.main import app
+import app.deps as deps
+from app.services.csm_columns import snapshot_to_json
+from app.services.csm_service import AsyncCsmService, CsmService
+
+from fake_chain import AsyncFakeChain, FakeChain, FakeCsm
+
+
+CSM = "0x00000000000000000000000000000000000000c5"
+
+
+def _chain(n_operators=30):
+    chain = FakeChain()
+    csm = FakeCsm(chain, CSM)
+    for node_id in range(n_operators):
+        csm.add_operator(node_id, deposited=node_id, depositable=3, enqueued=3, is_active=node_id % 4 != 0)
+        csm.enqueue(node_id, 3)
+    return chain, csm
+
+
+def _stream(service):
+    app.dependency_overrides[deps.get_csm_service] = lambda: service
+    try:
+        res = TestClient(app).get("/api/csm/state.ndjson")
+    finally:
+        app.dependency_overrides.clear()
+    assert res.status_code == 200
+    assert res.headers["content-type"] == "application/x-ndjson"
+    return [json.loads(line) for line in res.text.splitlines()]
+
+
+def _strip(lines, kind):
+    return [{k: v for k, v in line.items() if k != "type"} for line in lines if line["type"] == kind]
+
+
+def _expected(chain):
+    cfg = Config(eth_rpc_url="http://fake", csm_address=CSM)
+    service = CsmService(cfg, EthAdapter(Web3(chain), multicall_address=MULTICALL3_ADDRESS))
+    snapshot = snapshot_to_json(service._build_snapshot(chain.block_number))
+    return snapshot["queue"]["items"], service.list_node_operators(chain.block_number)
+
+
+def test_ndjson_stream_matches_snapshot():
+    chain, csm = _chain()
+    csm.head = 4
+    cfg = Config(eth_rpc_url="http://fake", csm_address=CSM, multicall_batch_size=7)
+    service = CsmService(cfg, EthAdapter(Web3(chain), multicall_address=MULTICALL3_ADDRESS))
+
+    lines = _stream(service)
+    items, operators = _expected(chain)
+    assert lines[0] == {"type": "block", "block_number": 100}
+    assert _strip(lines, "queue_item") == items and len(items) == 26
+    assert _strip(lines, "node_operator") == operators
+    # Queue lines come before operator lines
+    assert [line["type"] for line in lines[1:]] == ["queue_item"] * 26 + ["node_operator"] * 30
+
+
+def test_ndjson_stream_reads_pages_lazily():
+    chain, _ = _chain()
+    cfg = Config(eth_rpc_url="http://fake", csm_address=CSM, multicall_batch_size=5)
+    service = CsmService(cfg, EthAdapter(Web3(chain), multicall_address=MULTICALL3_ADDRESS))
+
+    pages = service.iter_queue(100)
+    first = [next(pages) for _ in range(5)]
+    calls = chain.requests["eth_call"]
+    assert [it["index"] for it in first] == list(range(5))
+    next(pages)
+    # The next page is fetched only once the first is consumed
+    assert chain.requests["eth_call"] > calls
+    assert len(list(pages)) == 24
+
+
+def test_ndjson_stream_with_async_service():
+    chain, _ = _chain()
+    cfg = Config(eth_rpc_url="http://fake", csm_address=CSM, multicall_batch_size=8)
+    adapter = AsyncEthAdapter(AsyncWeb3(AsyncFakeChain(chain)), multicall_address=MULTICALL3_ADDRESS)
+
+    lines = _stream(AsyncCsmService(cfg, adapter))
+    items, operators = _expected(chain)
+    assert lines[0] == {"type": "block", "block_number": 100}
+    assert _strip(lines, "queue_item") == items
+    assert _strip(lines, "node_operator") == operators
@@ -0,0 +1,105 @@
+import gzip
+import json
+
+import brotli
+from fastapi.testclient import TestClient
+
+from app.main import app
+import app.deps as deps
+from app.services.encoded import etag_matches, pick_encoding
+from app.services.snapshot_cache import SnapshotCache
+
+
+class _Csm:
+    def __init__(self):
+        self.block = 100
+
+    def snapshot(self):
+        return {
+            "queue": {"head": 0, "tail": 1, "size": 1, "items": [{"index": 0, "node_operator_id": 1, "count": 2}]},
+            "node_operators": [{"id": 1, "depositable_keys": 2}],
+            "block_number": self.block,
+        }
+
+
+def test_pick_encoding_and_etag_matching():
+    assert pick_encoding("gzip, deflate, br") == "br"
+    assert pick_encoding("br;q=0, gzip;q=0.5") == "gzip"
+    assert pick_encoding("*;q=0") is None
+    assert pick_encoding("identity") is None
+    assert pick_encoding("br;q=0.1, gzip;q=0.9") == "gzip"
+    assert pick_encoding("gzip;q=0.8, *;q=0.9") == "br"
+    assert pick_encoding("gzip;q=0.5, identity;q=0.9") is None
+    assert pick_encoding("br;q=bad, gzip") == "gzip"
+    assert pick_encoding(None) is None
+    assert etag_matches('"a", W/"csm-state-1"', '"csm-state-1"')
+    assert etag_matches("*", '"x"')
+    assert not etag_matches('"csm-state-2"', '"csm-state-1"')
+    assert not etag_matches('"x"', None)
+
+
+def test_csm_state_is_encoded_once_per_block(monkeypatch):
+    import app.main as main
+
+    encoded = []
+    original = main.encode_body
+    monkeypatch.setattr(main, "encode_body", lambda *a, **kw: encoded.append(a) or original(*a, **kw))
+    csm = _Csm()
+    cache = SnapshotCache()
+    app.dependency_overrides[deps.get_csm_service] = lambda: csm
+    app.dependency_overrides[deps.get_snapshot_cache] = lambda: cache
+    try:
+        client = TestClient(app)
+        first = client.get("/api/csm/state", headers={"Accept-Encoding": "gzip"})
+        plain = client.get("/api/csm/state", headers={"Accept-Encoding": "identity"})
+        br = client.get("/api/csm/state", headers={"Accept-Encoding": "br"})
+        not_modified = client.get("/api/csm/state", headers={"If-None-Match": first.headers["etag"]})
+        csm.block = 101
+        changed = client.get("/api/csm/state", headers={"If-None-Match": first.headers["etag"]})
+    finally:
+        app.dependency_overrides.clear()
+
+    assert first.headers["etag"] == '"csm-state-100"'
+    assert first.headers["content-encoding"] == "gzip"
+    assert first.headers["vary"] == "Accept-Encoding"
+    assert "content-encoding" not in plain.headers
+    assert br.headers["content-encoding"] == "br"
+    expected = {**csm.snapshot(), "block_number": 100}
+    assert first.json() == plain.json() == br.json() == json.loads(plain.content) == expected
+    assert not_modified.status_code == 304 and not_modified.content == b""
+    assert changed.status_code == 200 and changed.headers["etag"] == '"csm-state-101"'
+    # One encoding per block, however many requests and encodings
+    assert len(encoded) == 2
+
+
+def test_stored_variants_decode_to_the_same_body():
+    app.dependency_overrides[deps.get_csm_service] = lambda: _Csm()
+    app.dependency_overrides[deps.get_snapshot_cache] = lambda: SnapshotCache()
+    try:
+        client = TestClient(app)
+        # Read the raw bytes without the client decoding them
+        with client.stream("GET", "/api/csm/state", headers={"Accept-Encoding": "br"}) as res:
+            raw_br = b"".join(res.iter_raw())
+        with client.stream("GET", "/api/csm/state", headers={"Accept-Encoding": "gzip"}) as res:
+            raw_gzip = b"".join(res.iter_raw())
+        plain = client.get("/api/csm/state", headers={"Accept-Encoding": "identity"}).content
+    finally:
+        app.dependency_overrides.clear()
+    assert brotli.decompress(raw_br) == gzip.decompress(raw_gzip) == plain
+
+
+def test_csm_snapshot_page_has_block_etag():
+    app.dependency_overrides[deps.get_csm_service] = lambda: _Csm()
+    app.dependency_overrides[deps.get_snapshot_cache] = lambda: SnapshotCache()
+    try:
+        client = TestClient(app)
+        page = client.get("/csm/snapshot")
+        again = client.get("/csm/snapshot", headers={"If-None-Match": page.headers["etag"]})
+    finally:
+        app.dependency_overrides.clear()
+    assert page.status_code == 200
+    assert page.headers["etag"] == '"csm-html-100"'
+    assert page.headers["content-type"].startswith("text/html")
+    assert 'filename="csm_snapshot_block_100.html"' in page.headers["content-disposition"]
+    assert '"block_number":100' in page.text
+    assert again.status_code == 304
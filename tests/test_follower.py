@@ -0,0 +1,135 @@
+import asyncio
+import time
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+import app.deps as deps
+from app.models import Module
+from app.services.follower import BlockFollower
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class _Chain:
+    def __init__(self):
+        self.block = 100
+        self.snapshots = 0
+        self.module_reads = 0
+
+    def block_number(self):
+        return self.block
+
+
+class _Csm:
+    def __init__(self, chain):
+        self.chain = chain
+
+    def snapshot(self, block_identifier=None):
+        self.chain.snapshots += 1
+        return {"queue": {"items": []}, "node_operators": [], "block_number": block_identifier}
+
+
+class _Router:
+    def __init__(self, chain):
+        self.chain = chain
+
+    async def list_modules(self, block_identifier=None):
+        self.chain.module_reads += 1
+        return [Module(address="0x01", module_id=1, active_validators=block_identifier, depositable_validators=0)]
+
+
+def _follower(**kwargs):
+    chain = _Chain()
+    clock = _Clock()
+    follower = BlockFollower(chain.block_number, csm=_Csm(chain), router=_Router(chain), clock=clock, **kwargs)
+    return chain, clock, follower
+
+
+def test_refresh_rebuilds_only_on_new_blocks():
+    chain, clock, follower = _follower()
+
+    async def run():
+        first = await follower.refresh()
+        await follower.refresh()
+        chain.block = 101
+        second = await follower.refresh()
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert first.block == 100 and first.csm["block_number"] == 100
+    assert second.block == 101 and second.modules[0].active_validators == 101
+    assert (chain.snapshots, chain.module_reads) == (2, 2)
+    assert follower.stats == {"polls": 3, "refreshes": 2, "failures": 0}
+    # The previous snapshot object is untouched by the swap
+    assert first.csm["block_number"] == 100
+
+
+def test_stale_snapshot_waits_for_refresh():
+    chain, clock, follower = _follower(max_staleness=5, wait_timeout=1)
+
+    async def run():
+        await follower.refresh()
+        follower._task = object()  # pretend the background loop is running
+        clock.now += 10
+        waiter = asyncio.create_task(follower.latest())
+        await asyncio.sleep(0.01)
+        assert not waiter.done()
+        chain.block = 101
+        await follower.refresh()
+        return await waiter
+
+    state = asyncio.run(run())
+    assert state.block == 101
+
+
+def test_stale_snapshot_times_out_to_none():
+    chain, clock, follower = _follower(max_staleness=5, wait_timeout=0.01)
+
+    async def run():
+        await follower.refresh()
+        follower._task = object()
+        clock.now += 10
+        return await follower.latest()
+
+    assert asyncio.run(run()) is None
+
+
+def test_api_serves_followed_snapshot_with_headers():
+    chain, clock, follower = _follower(poll_interval=60)
+
+    class _Unused:
+        def snapshot(self):
+            raise AssertionError("served from the follower")
+
+        def list_modules(self):
+            raise AssertionError("served from the follower")
+
+    app.dependency_overrides[deps.get_follower] = lambda: follower
+    app.dependency_overrides[deps.get_csm_service] = lambda: _Unused()
+    app.dependency_overrides[deps.get_router_service] = lambda: _Unused()
+    try:
+        with TestClient(app) as client:
+            for _ in range(100):
+                if follower.state is not None:
+                    break
+                time.sleep(0.01)
+            clock.now += 1.5
+            state = client.get("/api/csm/state")
+            modules = client.get("/api/modules")
+    finally:
+        app.dependency_overrides.clear()
+    assert state.status_code == 200
+    assert state.json()["block_number"] == 100
+    assert state.headers["X-Snapshot-Block"] == "100"
+    assert state.headers["X-Snapshot-Age"] == "1.500"
+    assert modules.json()[0]["active_validators"] == 100
+    assert modules.headers["X-Snapshot-Block"] == "100"
+    # The lifespan stopped the follower
+    assert follower._task is None
@@ -23,3 +23,5 @@ def test_make_router_service_uses_real_web3():
     # request_kwargs may be attached to underlying HTTP session; check attribute if present
     timeout = getattr(provider, "_request_kwargs", {}).get("timeout") or getattr(provider, "request_kwargs", {}).get("timeout")
     assert timeout == 13
+    # No web3-level HTTP retries: a 429 must reach the rate controller
+    assert provider.provider.exception_retry_configuration is None
@@ -0,0 +1,53 @@
+from fastapi.testclient import TestClient
+from web3 import Web3
+
+from app import metrics
+from app.config import MULTICALL3_ADDRESS, Config
+from app.eth.adapter import EthAdapter
+from app.main import app
+from app.services.csm_service import CsmService
+import app.deps as deps
+
+from fake_chain import FakeChain, FakeCsm
+
+
+CSM = "0x00000000000000000000000000000000000000c5"
+
+
+def test_snapshot_records_rpc_calls_by_function_and_stages():
+    chain = FakeChain()
+    csm = FakeCsm(chain, CSM)
+    for node_id in range(5):
+        csm.add_operator(node_id, deposited=1, depositable=2, enqueued=2, is_active=True)
+        csm.enqueue(node_id, 2)
+    cfg = Config(eth_rpc_url="http://fake", csm_address=CSM)
+    w3 = metrics.instrument_web3(metrics.instrument_web3(Web3(chain)))
+    adapter = EthAdapter(w3, multicall_address=MULTICALL3_ADDRESS)
+
+    requests_before = metrics.BUILD_RPC_REQUESTS.count("csm")
+    stages_before = metrics.STAGE_SECONDS.count("list_node_operators")
+    eth_calls = sum(v for (method, _), v in metrics.RPC_REQUESTS._values.items() if method == "eth_call")
+    snapshot = CsmService(cfg, adapter).snapshot(100)
+
+    assert len(snapshot["node_operators"]) == 5
+    assert metrics.BUILD_RPC_REQUESTS.count("csm") == requests_before + 1
+    assert metrics.STAGE_SECONDS.count("list_node_operators") == stages_before + 1
+    assert metrics.CONTRACT_CALLS.value("getNodeOperator") >= 5
+    assert metrics.NODE_OPERATORS.value() == 5
+    labelled = sum(v for (method, _), v in metrics.RPC_REQUESTS._values.items() if method == "eth_call")
+    assert labelled - eth_calls == chain.requests["eth_call"]
+    assert metrics.RPC_REQUESTS.value("eth_call", "getNodeOperatorsCount") >= 1
+
+
+def test_metrics_endpoint_renders_route_latency():
+    app.dependency_overrides[deps.get_endpoint_pool] = lambda: None
+    client = TestClient(app)
+    assert client.get("/api/rpc").status_code == 200
+    app.dependency_overrides.clear()
+
+    resp = client.get("/metrics")
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("text/plain")
+    assert "# TYPE http_request_seconds histogram" in resp.text
+    assert 'http_request_seconds_count{method="GET",route="/api/rpc",status="200"}' in resp.text
+    assert "# TYPE rpc_requests_total counter" in resp.text
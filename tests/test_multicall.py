@@ -0,0 +1,104 @@
+import pytest
+from web3 import Web3
+
+from app.config import MULTICALL3_ADDRESS, Config
+from app.eth.adapter import EthAdapter
+from app.services.csm_service import CsmService
+
+from fake_chain import FakeChain, FakeCsm, FakeRouter
+
+
+CSM = "0x00000000000000000000000000000000000000c5"
+
+
+def _setup(multicall: bool = True, batch_size: int = 500):
+    chain = FakeChain(multicall=multicall)
+    csm = FakeCsm(chain, CSM)
+    adapter = EthAdapter(
+        Web3(chain),
+        multicall_address=MULTICALL3_ADDRESS if multicall else None,
+        multicall_batch_size=batch_size,
+    )
+    service = CsmService(Config(eth_rpc_url="http://fake", csm_address=CSM), adapter)
+    return chain, csm, service
+
+
+def test_multicall_packs_calls_into_batches():
+    chain, csm, service = _setup(batch_size=40)
+    for i in range(100):
+        csm.enqueue(i % 7, i + 1)
+    fns = service._contract.functions
+    results = service.adapter.multicall([fns.depositQueueItem(i) for i in range(100)])
+    assert [CsmService._decode_batch(r.value) for r in results] == [(i % 7, i + 1) for i in range(100)]
+    # ceil(100 / 40) aggregate3 round trips
+    assert chain.requests["eth_call"] == 3
+
+
+def test_multicall_tolerates_individual_failures():
+    chain, csm, service = _setup()
+    csm.enqueue(1, 2)
+    fns = service._contract.functions
+    results = service.adapter.multicall([fns.depositQueueItem(0), fns.depositQueueItem(5)])
+    assert results[0].success and results[0].value >> 192 == 1
+    assert not results[1].success and results[1].error
+    with pytest.raises(RuntimeError):
+        service.adapter.multicall([fns.depositQueueItem(5)], allow_failure=False)
+
+
+def test_multicall_falls_back_to_sequential_calls():
+    # Multicall3 is not deployed: the aggregate call reverts, calls are made one by one
+    chain, csm, service = _setup(multicall=False)
+    service.adapter.multicall_address = MULTICALL3_ADDRESS
+    csm.enqueue(3, 4)
+    csm.enqueue(4, 5)
+    queue = service.get_queue()
+    assert [(it["node_operator_id"], it["count"]) for it in queue["items"]] == [(3, 4), (4, 5)]
+    assert chain.eth_calls["depositQueueItem"] == 2
+
+
+def test_snapshot_costs_constant_round_trips():
+    chain, csm, service = _setup()
+    for node_id in range(300):
+        csm.add_operator(node_id, deposited=node_id, depositable=1, enqueued=1, is_active=node_id % 2 == 0)
+        csm.enqueue(node_id, 1)
+    csm.head = 10
+
+    snap = service.snapshot()
+    assert snap["queue"]["size"] == 290
+    ops = {op["id"]: op for op in snap["node_operators"]}
+    assert len(ops) == 300
+    assert ops[11]["deposited_keys"] == 11 and ops[11]["is_active"] is False
+    assert ops[11]["position_keys_ahead"] == 1
+    assert "first_queue_index" not in ops[5]
+    # depositQueue + queue items + count + ids + operators/flags, independent of operator count
+    assert chain.requests["eth_call"] <= 6
+
+
+def test_list_node_operators_falls_back_to_summary():
+    chain, csm, service = _setup()
+    csm.add_operator(1, deposited=4, depositable=2, enqueued=2)
+    csm.add_operator(2, deposited=7, depositable=0)
+    chain._functions = {
+        key: value for key, value in chain._functions.items() if value[0]["name"] != "getNodeOperator"
+    }
+    ops = service.list_node_operators()
+    assert [(op["id"], op["deposited_keys"], op["depositable_keys"], op["enqueued_keys"]) for op in ops] == [
+        (1, 4, 2, 0),
+        (2, 7, 0, 0),
+    ]
+
+
+def test_list_modules_enriches_digests_in_one_aggregated_read():
+    chain = FakeChain()
+    router = FakeRouter(chain, "0x0000000000000000000000000000000000000052")
+    for mid in range(1, 6):
+        router.add_module(mid, "0x" + f"{mid:040x}", active_validators=mid * 100, depositable_validators=mid)
+    router.modules[3]["is_stopped"] = True
+    adapter = EthAdapter(Web3(chain), multicall_address=MULTICALL3_ADDRESS)
+
+    modules = adapter.list_modules(router.address, "staking_router.json")
+    assert [m["active_validators"] for m in modules] == [100, 200, 300, 400, 500]
+    assert [m["depositable_validators"] for m in modules] == [1, 2, 3, 4, 5]
+    assert [m["is_stopped"] for m in modules] == [False, False, True, False, False]
+    # digests + a single aggregate3 for all per-module getters
+    assert chain.requests["eth_call"] == 2
@@ -0,0 +1,189 @@
+import asyncio
+import time
+
+from fastapi.testclient import TestClient
+from web3 import AsyncWeb3, Web3
+
+import app.deps as deps
+from app.main import app
+from app.eth.provider_pool import AsyncPooledHTTPProvider, EndpointPool, PooledHTTPProvider
+from app.eth.rpc_batch import BatchRejected, RpcBatchTransport
+
+from fake_chain import AsyncFakeChain, FakeChain
+
+
+class Upstream:
+    """Wraps a `FakeChain` as one endpoint with a configurable delay and failure mode."""
+
+    def __init__(self, chain, delay=0.0, fail=None):
+        self.chain = chain
+        self.delay = delay
+        self.fail = fail
+        self.requests = 0
+
+    def make_request(self, method, params):
+        self.requests += 1
+        time.sleep(self.delay)
+        if self.fail == "down":
+            raise ConnectionError("connection refused")
+        if self.fail == "429":
+            return {"jsonrpc": "2.0", "id": 0, "error": {"code": -32005, "message": "rate limit exceeded"}}
+        return self.chain.make_request(method, params)
+
+    def is_connected(self, show_traceback=False):
+        return True
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_slow_endpoint_is_hedged_then_avoided():
+    chain = FakeChain(block_number=123)
+    slow, fast = Upstream(chain, delay=0.5), Upstream(chain)
+    pool = EndpointPool(["http://slow", "http://fast"], initial_hedge_delay=0.05)
+    w3 = Web3(PooledHTTPProvider(pool, [slow, fast]))
+
+    started = time.perf_counter()
+    assert w3.eth.block_number == 123
+    assert time.perf_counter() - started < 0.4
+    assert pool.stats()[1]["hedges"] == 1
+
+    # The fast endpoint now ranks first and takes the traffic
+    time.sleep(0.5)
+    before = slow.requests
+    for _ in range(5):
+        assert w3.eth.block_number == 123
+    assert slow.requests == before
+    assert pool.order() == [1, 0]
+
+
+def test_failover_and_circuit_breaker():
+    chain = FakeChain(block_number=7)
+    clock = Clock()
+    down, limited, good = Upstream(chain, fail="down"), Upstream(chain, fail="429"), Upstream(chain)
+    pool = EndpointPool(
+        ["http://down", "http://limited", "http://good"], hedge_percentile=0, breaker_failures=1,
+        breaker_cooldown=10, clock=clock,
+    )
+    w3 = Web3(PooledHTTPProvider(pool, [down, limited, good]))
+
+    for _ in range(3):
+        assert w3.eth.block_number == 7
+    stats = {s["url"]: s for s in pool.stats()}
+    assert stats["http://down"]["state"] == "open" and stats["http://limited"]["state"] == "open"
+    assert stats["http://good"]["state"] == "closed" and stats["http://good"]["errors"] == 0
+    assert (down.requests, limited.requests) == (1, 1)
+
+    # While open, failing endpoints get no traffic; after the cooldown one probe each
+    assert w3.eth.block_number == 7
+    assert (down.requests, limited.requests, good.requests) == (1, 1, 4)
+    clock.now = 11
+    down.fail = None
+    assert w3.eth.block_number == 7
+    assert (down.requests, limited.requests, good.requests) == (2, 1, 4)
+    assert pool.stats()[0]["state"] == "closed"
+
+
+def test_reverts_are_not_retried_elsewhere():
+    chain = FakeChain()
+    first, second = Upstream(chain), Upstream(chain)
+    pool = EndpointPool(["http://a", "http://b"], hedge_percentile=0)
+    provider = PooledHTTPProvider(pool, [first, second])
+    reverted = {"jsonrpc": "2.0", "id": 0, "error": {"code": 3, "message": "execution reverted"}}
+    first.make_request = lambda method, params: reverted
+    assert provider.make_request("eth_call", [{}, "latest"]) is reverted
+    assert second.requests == 0
+
+
+def test_batches_fail_over_across_the_pool():
+    chain = FakeChain()
+    down, good = Upstream(chain, fail="down"), Upstream(chain)
+    pool = EndpointPool(["http://down", "http://good"], hedge_percentile=0, breaker_failures=1)
+    posts = []
+
+    class Transport(RpcBatchTransport):
+        def post(self, payload, url=None):
+            posts.append((url, len(payload)))
+            if url == "http://down":
+                raise ConnectionError("connection refused")
+            if len(payload) > 2:
+                raise BatchRejected("batch too large")
+            return [{"jsonrpc": "2.0", "id": p["id"], "result": "0x1"} for p in payload]
+
+    transport = Transport("http://unused", pool_provider=PooledHTTPProvider(pool, [down, good]), max_retries=0)
+    results = transport.request([("eth_blockNumber", [])] * 4)
+    assert all(r.success for r in results)
+    assert posts[0] == ("http://down", 4)
+    # A rejected batch is split on the endpoint that answered, without failing over or opening its circuit
+    assert posts[1:] == [("http://good", 4), ("http://good", 2), ("http://good", 2)]
+    stats = {s["url"]: s for s in pool.stats()}
+    assert stats["http://down"]["state"] == "open" and stats["http://good"]["errors"] == 0
+
+
+def test_batches_fail_over_on_server_errors():
+    chain = FakeChain()
+    pool = EndpointPool(["http://degraded", "http://good"], hedge_percentile=0, breaker_failures=1)
+    posts = []
+
+    class Resp:
+        def __init__(self, status_code, body=None):
+            self.status_code, self.body = status_code, body
+
+        def raise_for_status(self):
+            if self.status_code >= 400:
+                raise RuntimeError(f"HTTP {self.status_code}")
+
+        def json(self):
+            return self.body
+
+    class Session:
+        def post(self, url, json, timeout):
+            posts.append((url, len(json)))
+            if url == "http://degraded":
+                return Resp(503)
+            return Resp(200, [{"jsonrpc": "2.0", "id": p["id"], "result": "0x1"} for p in json])
+
+    provider = PooledHTTPProvider(pool, [Upstream(chain), Upstream(chain)])
+    transport = RpcBatchTransport("http://unused", session=Session(), pool_provider=provider, max_retries=0)
+    results = transport.request([("eth_blockNumber", [])] * 4)
+    assert all(r.success for r in results)
+    # Not taken for a size rejection: the batch moves on whole, and the 503 opens the circuit
+    assert posts == [("http://degraded", 4), ("http://good", 4)]
+    assert transport.max_batch_size == 100
+    stats = {s["url"]: s for s in pool.stats()}
+    assert stats["http://degraded"]["state"] == "open" and stats["http://degraded"]["errors"] == 1
+
+
+def test_async_pool_hedges_slow_endpoint():
+    chain = FakeChain(block_number=42)
+    slow, fast = AsyncFakeChain(chain, latency=0.5), AsyncFakeChain(chain, latency=0.001)
+    pool = EndpointPool(["http://slow", "http://fast"], initial_hedge_delay=0.05)
+    w3 = AsyncWeb3(AsyncPooledHTTPProvider(pool, [slow, fast]))
+
+    async def main():
+        started = time.perf_counter()
+        assert await w3.eth.block_number == 42
+        return time.perf_counter() - started
+
+    assert asyncio.run(main()) < 0.4
+    stats = pool.stats()
+    assert stats[1]["hedges"] == 1 and stats[1]["requests"] == 1
+    # The cancelled request still counts towards the slow endpoint's latency
+    assert stats[0]["requests"] == 0 and stats[0]["latency_ewma_ms"] > 0
+
+
+def test_rpc_stats_endpoint():
+    pool = EndpointPool(["http://a", "http://b"])
+    pool.record(1, 0.01, False)
+    app.dependency_overrides[deps.get_endpoint_pool] = lambda: pool
+    resp = TestClient(app).get("/api/rpc")
+    app.dependency_overrides.clear()
+    data = resp.json()
+    assert data["enabled"] is True
+    assert [e["url"] for e in data["endpoints"]] == ["http://a", "http://b"]
+    assert data["endpoints"][1]["errors"] == 1 and data["endpoints"][1]["latency_ewma_ms"] == 10.0
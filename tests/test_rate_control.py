@@ -0,0 +1,186 @@
+import asyncio
+import threading
+import time
+
+import requests
+from web3 import Web3
+
+from app.eth.rate_control import RateController, ThrottledProvider, TokenBucket, is_rate_limit_error
+from app.eth.rpc_batch import RpcBatchTransport
+
+from fake_chain import FakeChain
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_aimd_limit_grows_halves_on_throttle_and_pauses():
+    clock = Clock()
+    c = RateController("http://node", max_concurrency=8, clock=clock)
+    assert c.limit == 4
+    for _ in range(40):
+        assert c.try_acquire() == 0
+        c.release(0.01)
+    assert c.limit == 8
+
+    assert c.try_acquire() == 0 and c.try_acquire() == 0
+    c.release(0.01, "rpc_rate_limit")
+    assert c.limit == 4 and c.events["rpc_rate_limit"] == 1
+    # Another request throttled in the same burst does not halve it again
+    c.release(0.01, "rpc_rate_limit")
+    assert c.limit == 4
+    # Paused for the backoff, doubled for the second throttle in a row
+    assert c.try_acquire() == 0.4
+    clock.now = 0.4
+    assert c.try_acquire() == 0
+    c.release(0.01, "http_429", retry_after=3)
+    assert c.limit == 2
+    assert c.try_acquire() == 3
+
+    clock.now = 10
+    assert c.try_acquire() == 0
+    # Latency far above the baseline shrinks the limit
+    c.release(0.5)
+    assert c.events["latency"] == 1 and c.limit == 1.8
+
+
+def test_concurrency_limit_and_token_bucket():
+    clock = Clock()
+    c = RateController("http://node", max_concurrency=2, clock=clock)
+    assert c.limit == 1
+    assert c.try_acquire() == 0
+    assert c.try_acquire() > 0  # limit reached
+    c.release(0.01)
+
+    bucket = TokenBucket(rate=2, burst=2, tokens=2)
+    assert [bucket.wait_time(0.0) for _ in range(3)] == [0, 0, 0.5]
+    assert bucket.wait_time(0.5) == 0
+
+
+def test_failures_neither_grow_the_limit_nor_end_a_throttle_streak():
+    clock = Clock()
+    c = RateController("http://node", max_concurrency=8, clock=clock)
+    c.try_acquire()
+    c.try_acquire()
+    c.release(0.01, "http_429")
+    assert c.limit == 2 and c.try_acquire() == 0.2
+    clock.now = 1
+    c.release(0.01, failed=True)
+    assert c.limit == 2 and c.events["failures"] == 1
+    c.release(0.01, "http_429")
+    # Still the second throttle in a row: backoff doubled
+    assert round(c.try_acquire(), 6) == 0.4
+
+
+def test_waiters_wake_when_a_slot_is_released():
+    c = RateController("http://node", max_concurrency=2)
+    assert c.limit == 1 and c.try_acquire() == 0
+    woke = []
+
+    def blocked():
+        c.acquire()
+        woke.append(time.perf_counter())
+
+    thread = threading.Thread(target=blocked)
+    thread.start()
+    time.sleep(0.05)
+    released = time.perf_counter()
+    c.release(0.01)
+    thread.join(1)
+    assert woke and woke[0] - released < 0.05
+
+    while c.try_acquire() == 0:
+        pass
+
+    async def main():
+        waiter = asyncio.ensure_future(c.acquire_async())
+        await asyncio.sleep(0.05)
+        assert not waiter.done()
+        # Released from another thread, as the sync providers do
+        threading.Thread(target=c.release, args=(0.01,)).start()
+        await asyncio.wait_for(waiter, 1)
+
+    asyncio.run(main())
+    assert c.in_flight == int(c.limit) and c.events["waits"] == 2
+
+
+def test_is_rate_limit_error():
+    assert is_rate_limit_error({"code": -32005, "message": "limit exceeded"})
+    assert is_rate_limit_error({"code": -32000, "message": "Too Many Requests"})
+    assert not is_rate_limit_error({"code": 3, "message": "execution reverted"})
+    assert not is_rate_limit_error(None)
+
+
+def test_throttled_provider_reports_rate_limit_errors():
+    chain = FakeChain(block_number=9)
+    limited = {"on": True}
+
+    class Upstream:
+        def make_request(self, method, params):
+            if limited["on"]:
+                limited["on"] = False
+                return {"jsonrpc": "2.0", "id": 0, "error": {"code": -32005, "message": "rate limit"}}
+            return chain.make_request(method, params)
+
+    controller = RateController("http://node", backoff=0.05)
+    w3 = Web3(ThrottledProvider(Upstream(), controller))
+    try:
+        w3.eth.block_number
+    except Exception:
+        pass
+    started = time.perf_counter()
+    assert w3.eth.block_number == 9
+    # The second request waited out the backoff
+    assert time.perf_counter() - started >= 0.04
+    stats = controller.stats()
+    assert stats["throttle_events"]["rpc_rate_limit"] == 1 and stats["throttle_events"]["waits"] == 1
+    assert stats["in_flight"] == 0
+
+
+def test_throttled_provider_bounds_concurrency():
+    peak = {"now": 0, "max": 0}
+    lock = threading.Lock()
+
+    class Upstream:
+        def make_request(self, method, params):
+            with lock:
+                peak["now"] += 1
+                peak["max"] = max(peak["max"], peak["now"])
+            time.sleep(0.01)
+            with lock:
+                peak["now"] -= 1
+            return {"jsonrpc": "2.0", "id": 0, "result": "0x1"}
+
+    provider = ThrottledProvider(Upstream(), RateController("http://node", max_concurrency=3))
+    threads = [threading.Thread(target=provider.make_request, args=("eth_blockNumber", [])) for _ in range(12)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert peak["max"] <= 3
+
+
+def test_batch_transport_backs_off_on_http_429():
+    calls = []
+
+    class Transport(RpcBatchTransport):
+        def post(self, payload):
+            calls.append(time.perf_counter())
+            if len(calls) == 1:
+                response = requests.Response()
+                response.status_code = 429
+                response.headers["Retry-After"] = "0.05"
+                raise requests.HTTPError("429", response=response)
+            return [{"jsonrpc": "2.0", "id": p["id"], "result": "0x1"} for p in payload]
+
+    controller = RateController("http://node")
+    transport = Transport("http://node", controller=controller)
+    results = transport.request([("eth_blockNumber", [])])
+    assert results[0].success
+    assert calls[1] - calls[0] >= 0.04
+    assert controller.events["http_429"] == 1
@@ -0,0 +1,125 @@
+from web3 import Web3
+
+from app.eth.abi_loader import load_abi_file
+from app.eth.adapter import EthAdapter
+from app.eth.rpc_batch import RpcBatchTransport
+
+from fake_chain import FakeChain, FakeRouter, Revert
+
+
+ROUTER = "0x0000000000000000000000000000000000000052"
+
+
+class _Resp:
+    def __init__(self, status_code, body):
+        self.status_code = status_code
+        self._body = body
+
+    def json(self):
+        return self._body
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RuntimeError(f"HTTP {self.status_code}")
+
+
+class _FakeSession:
+    """Answers JSON-RPC batch POSTs from a FakeChain, with injectable failures."""
+
+    def __init__(self, chain, max_batch=None):
+        self.chain = chain
+        self.max_batch = max_batch
+        self.flaky = set()
+        self.posts = []
+        # HTTP statuses of the next POSTs, before anything is served
+        self.statuses = []
+
+    def post(self, url, json, timeout):
+        self.posts.append(len(json))
+        if self.statuses:
+            return _Resp(self.statuses.pop(0), None)
+        if self.max_batch is not None and len(json) > self.max_batch:
+            return _Resp(200, {"jsonrpc": "2.0", "id": None, "error": {"code": -32600, "message": "batch too large"}})
+        out = []
+        for req in json:
+            tx = req["params"][0]
+            if tx["data"] in self.flaky:
+                # Rate limited once, then served
+                self.flaky.discard(tx["data"])
+                out.append({"jsonrpc": "2.0", "id": req["id"], "error": {"code": -32005, "message": "rate limited"}})
+                continue
+            try:
+                result = "0x" + self.chain.execute(tx["to"], bytes.fromhex(tx["data"][2:])).hex()
+            except Revert:
+                out.append({"jsonrpc": "2.0", "id": req["id"], "error": {"code": 3, "message": "execution reverted"}})
+                continue
+            out.append({"jsonrpc": "2.0", "id": req["id"], "result": result})
+        return _Resp(200, list(reversed(out)))
+
+
+def _setup(n_modules=20, **session_kwargs):
+    chain = FakeChain(multicall=False)
+    router = FakeRouter(chain, ROUTER)
+    for mid in range(1, n_modules + 1):
+        router.add_module(mid, "0x" + f"{mid:040x}", active_validators=mid, depositable_validators=2 * mid)
+    session = _FakeSession(chain, **session_kwargs)
+    transport = RpcBatchTransport("http://fake", session=session, max_batch_size=1000)
+    adapter = EthAdapter(Web3(chain), batch_transport=transport)
+    return chain, router, session, adapter
+
+
+def test_list_modules_uses_one_batch_for_all_getters():
+    chain, router, session, adapter = _setup()
+    modules = adapter.list_modules(ROUTER, "staking_router.json")
+    assert [m["active_validators"] for m in modules] == list(range(1, 21))
+    assert [m["depositable_validators"] for m in modules] == [2 * i for i in range(1, 21)]
+    assert all(m["is_active"] is True for m in modules)
+    # Digests via the provider, then every per-module getter in a single batch POST
+    assert chain.requests["eth_call"] == 1
+    assert session.posts == [100]
+
+
+def test_oversized_batches_are_split():
+    chain, router, session, adapter = _setup(max_batch=30)
+    modules = adapter.list_modules(ROUTER, "staking_router.json")
+    assert [m["active_validators"] for m in modules] == list(range(1, 21))
+    # Halved until accepted; the lowered limit sticks for the remainder and later batches
+    assert session.posts == [100, 50, 25, 25, 25, 25]
+    assert adapter.batch_transport.max_batch_size == 25
+
+
+def test_server_errors_are_retried_without_splitting():
+    chain, router, session, adapter = _setup()
+    session.statuses = [503]
+    modules = adapter.list_modules(ROUTER, "staking_router.json")
+    assert [m["active_validators"] for m in modules] == list(range(1, 21))
+    # The whole batch is sent again at its size; only a 413 lowers the limit
+    assert session.posts == [100, 100]
+    assert adapter.batch_transport.max_batch_size == 1000
+    session.statuses = [413]
+    adapter.list_modules(ROUTER, "staking_router.json")
+    assert session.posts[2:] == [100, 50, 50]
+
+
+def test_only_failed_entries_are_retried():
+    chain, router, session, _ = _setup()
+    fns = Web3(chain).eth.contract(address=ROUTER, abi=load_abi_file("staking_router.json")).functions
+    flaky = fns.getStakingModuleActiveValidatorsCount(3)._encode_transaction_data()
+    session.flaky = {flaky}
+    transport = RpcBatchTransport("http://fake", session=session)
+    adapter = EthAdapter(Web3(chain), batch_transport=transport)
+
+    results = adapter.batch_call([fns.getStakingModuleActiveValidatorsCount(i) for i in range(1, 6)])
+    assert [r.value for r in results] == [1, 2, 3, 4, 5]
+    assert session.posts == [5, 1]
+
+
+def test_missing_getter_is_reported_per_entry():
+    chain, router, session, adapter = _setup(n_modules=3)
+    del router.modules[2]["is_stopped"]
+    modules = adapter.list_modules(ROUTER, "staking_router.json")
+    assert [m["is_stopped"] for m in modules] == [False, None, False]
+    assert [m["active_validators"] for m in modules] == [1, 2, 3]
+    # A revert is permanent and not retried
+    assert session.posts == [15]
+
@@ -0,0 +1,132 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from web3 import AsyncWeb3
+
+from app.config import MULTICALL3_ADDRESS, Config
+from app.eth.async_adapter import AsyncEthAdapter
+from app.services.csm_service import AsyncCsmService
+from app.services.snapshot_cache import SnapshotCache
+
+from fake_chain import AsyncFakeChain, FakeChain, FakeCsm
+
+
+CSM = "0x00000000000000000000000000000000000000c5"
+
+
+def test_concurrent_threads_share_one_build():
+    cache = SnapshotCache()
+    builds = []
+    start = threading.Barrier(10)
+
+    def build():
+        builds.append(1)
+        time.sleep(0.05)
+        return {"block": 1}
+
+    results = []
+
+    def request():
+        start.wait()
+        results.append(cache.get_or_build(("csm", 1), build))
+
+    threads = [threading.Thread(target=request) for _ in range(10)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(builds) == 1
+    assert all(r is results[0] for r in results)
+    stats = cache.stats()
+    assert stats["builds_calls"] == 1 and stats["builds_coalesced"] == 9
+    assert stats["builds_waiting"] == 0 and stats["builds_in_flight"] == 0
+
+
+def test_failed_build_reaches_waiters_and_is_not_cached():
+    cache = SnapshotCache()
+
+    async def failing():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("rpc down")
+
+    async def main():
+        return await asyncio.gather(
+            *(cache.get_or_build_async(("modules", 5), failing) for _ in range(3)), return_exceptions=True
+        )
+
+    errors = asyncio.run(main())
+    assert all(isinstance(e, RuntimeError) for e in errors)
+    assert cache.stats()["builds_calls"] == 1
+    assert cache.get(("modules", 5)) is None
+
+
+def test_cancelled_caller_does_not_cancel_the_build():
+    cache = SnapshotCache()
+
+    async def build():
+        await asyncio.sleep(0.05)
+        return "state"
+
+    async def main():
+        first = asyncio.ensure_future(cache.get_or_build_async(("csm", 2), build))
+        await asyncio.sleep(0)
+        second = asyncio.ensure_future(cache.get_or_build_async(("csm", 2), build))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(main()) == "state"
+    assert cache.get(("csm", 2)) == "state"
+
+
+def test_concurrent_async_snapshots_read_the_chain_once():
+    chain = FakeChain()
+    csm = FakeCsm(chain, CSM)
+    for node_id in range(20):
+        csm.add_operator(node_id, deposited=1, depositable=2, enqueued=2, is_active=True)
+        csm.enqueue(node_id, 2)
+    cfg = Config(eth_rpc_url="http://fake", csm_address=CSM)
+    adapter = AsyncEthAdapter(AsyncWeb3(AsyncFakeChain(chain, latency=0.005)), multicall_address=MULTICALL3_ADDRESS)
+    service = AsyncCsmService(cfg, adapter, cache=SnapshotCache())
+
+    async def main():
+        return await asyncio.gather(*(service.snapshot(100) for _ in range(10)))
+
+    snapshots = asyncio.run(main())
+    assert all(s is snapshots[0] for s in snapshots)
+    calls = chain.requests["eth_call"]
+    # A second, uncached service pays the same for a single build
+    chain.requests.clear()
+    asyncio.run(AsyncCsmService(cfg, adapter).snapshot(100))
+    assert chain.requests["eth_call"] == calls
+    # One coalescing layer: the cache counts every follower, the service's own flights none
+    assert service.cache.stats()["builds_coalesced"] == 9
+    assert service.flights.stats()["coalesced"] == 0
+
+
+def test_uncached_services_coalesce_per_block_identifier():
+    chain = FakeChain()
+    csm = FakeCsm(chain, CSM)
+    for node_id in range(5):
+        csm.add_operator(node_id, deposited=1, depositable=2, enqueued=2, is_active=True)
+        csm.enqueue(node_id, 2)
+    cfg = Config(eth_rpc_url="http://fake", csm_address=CSM)
+    adapter = AsyncEthAdapter(AsyncWeb3(AsyncFakeChain(chain, latency=0.005)), multicall_address=MULTICALL3_ADDRESS)
+    asyncio.run(AsyncCsmService(cfg, adapter).snapshot(100))
+    single = chain.requests["eth_call"]
+
+    service = AsyncCsmService(cfg, adapter)
+    for block in (100, "latest"):
+        chain.requests.clear()
+
+        async def main():
+            return await asyncio.gather(*(service.snapshot(block) for _ in range(10)))
+
+        snapshots = asyncio.run(main())
+        assert all(s is snapshots[0] for s in snapshots)
+        assert chain.requests["eth_call"] == single
+    assert service.flights.stats()["coalesced"] == 18
@@ -0,0 +1,135 @@
+import random
+
+from fastapi.testclient import TestClient
+from web3 import Web3
+
+from app.config import MULTICALL3_ADDRESS, Config
+from app.eth.adapter import EthAdapter
+from app.main import app
+import app.deps as deps
+from app.models import Module
+from app.services.csm_columns import snapshot_to_json
+from app.services.csm_service import CsmService
+from app.services.snapshot_archive import SnapshotArchive, csm_delta
+from app.services.snapshot_cache import SnapshotCache
+
+from fake_chain import FakeChain, FakeCsm, pack_batch
+
+
+CSM = "0x00000000000000000000000000000000000000c5"
+
+
+def _history(blocks=30, seed=4):
+    """CSM snapshots and module lists of `blocks` consecutive blocks with random queue activity."""
+    rnd = random.Random(seed)
+    chain = FakeChain()
+    csm = FakeCsm(chain, CSM)
+    for node_id in range(30):
+        csm.add_operator(node_id, deposited=node_id, depositable=3, enqueued=3, is_active=True)
+    for i in range(200):
+        csm.enqueue(i % 30, 1 + i % 4)
+    adapter = EthAdapter(Web3(chain), multicall_address=MULTICALL3_ADDRESS)
+    service = CsmService(Config(eth_rpc_url="http://fake", csm_address=CSM), adapter)
+    history = []
+    for _ in range(blocks):
+        block = chain.block_number
+        modules = [Module(address="0x01", module_id=1, active_validators=1000 + block // 10)]
+        history.append((block, service.snapshot(block), modules))
+        # Deposits, partial batches, new batches and operator changes
+        if rnd.random() < 0.5:
+            csm.head += rnd.randint(1, 5)
+        if rnd.random() < 0.3:
+            csm.queue[csm.head] = pack_batch(csm.queue[csm.head] >> 192, 1)
+        for _ in range(rnd.randint(0, 3)):
+            csm.enqueue(rnd.randrange(35), rnd.randint(1, 5))
+        node_id = rnd.randrange(30)
+        csm.operators[node_id]["depositable"] = rnd.randint(0, 9)
+        chain.block_number += 1
+    return history
+
+
+def test_archive_rebuilds_every_block(tmp_path):
+    history = _history()
+    archive = SnapshotArchive(str(tmp_path / "archive.sqlite3"), keyframe_every=8)
+    for block, csm, modules in history:
+        archive.append(block, csm, modules)
+    for block, csm, modules in history:
+        assert snapshot_to_json(archive.csm_at(block)) == snapshot_to_json(csm)
+        assert archive.modules_at(block) == modules
+    assert archive.csm_at(history[-1][0] + 1) is None and archive.modules_at(99) is None
+
+    restarted = SnapshotArchive(archive.path, keyframe_every=8)
+    assert restarted.blocks() == (100, 129)
+    assert snapshot_to_json(restarted.csm_at(117)) == snapshot_to_json(history[17][1])
+
+
+def test_a_deposit_changes_only_the_depositing_operator(tmp_path):
+    chain = FakeChain()
+    csm = FakeCsm(chain, CSM)
+    for node_id in range(500):
+        csm.add_operator(node_id, deposited=1, depositable=2, enqueued=2, is_active=True)
+        csm.enqueue(node_id, 2)
+    cfg = Config(eth_rpc_url="http://fake", csm_address=CSM)
+    adapter = EthAdapter(Web3(chain), multicall_address=MULTICALL3_ADDRESS)
+    before = CsmService(cfg, adapter).snapshot(100)
+    # The head batch is deposited: keys ahead shrink for all 499 operators behind it
+    csm.head += 1
+    csm.operators[0].update(deposited=3, depositable=0)
+    chain.block_number = 101
+    after = CsmService(cfg, adapter).snapshot(101)
+
+    delta = csm_delta(before, after)
+    assert list(delta["node_operators"].id) == [0]
+    assert len(delta["queue"]["items"]) == 0
+    archive = SnapshotArchive(str(tmp_path / "archive.sqlite3"))
+    archive.append(100, before, None)
+    archive.append(101, after, None)
+    assert snapshot_to_json(archive.csm_at(101)) == snapshot_to_json(after)
+
+
+def test_archive_prunes_whole_keyframe_intervals(tmp_path):
+    history = _history(blocks=20)
+    archive = SnapshotArchive(str(tmp_path / "archive.sqlite3"), keyframe_every=4, retention_blocks=6)
+    for block, csm, modules in history:
+        archive.append(block, csm, modules)
+    oldest, newest = archive.blocks()
+    # Keyframes at 100, 104, ..., 116; pruned when 116 was written, up to 108 (at least 6 blocks old)
+    assert (oldest, newest) == (108, 119)
+    assert archive.csm_at(107) is None
+    assert snapshot_to_json(archive.csm_at(109)) == snapshot_to_json(history[9][1])
+    assert archive.modules_at(108) == history[8][2] and archive.modules_at(107) is None
+
+
+def test_api_serves_past_blocks_from_the_archive(tmp_path):
+    history = _history(blocks=5)
+    archive = SnapshotArchive(str(tmp_path / "archive.sqlite3"))
+    for block, csm, modules in history:
+        archive.append(block, csm, modules)
+
+    class _Unused:
+        def snapshot(self):
+            raise AssertionError("served from the archive")
+
+    app.dependency_overrides[deps.get_csm_service] = lambda: _Unused()
+    app.dependency_overrides[deps.get_router_service] = lambda: _Unused()
+    app.dependency_overrides[deps.get_snapshot_cache] = lambda: SnapshotCache()
+    app.dependency_overrides[deps.get_snapshot_archive] = lambda: archive
+    try:
+        client = TestClient(app)
+        state = client.get("/api/csm/state", params={"block": 102})
+        modules = client.get("/api/modules", params={"block": 103})
+        page = client.get("/api/csm/queue", params={"block": 101, "limit": 5})
+        missing = client.get("/api/csm/state", params={"block": 90})
+        app.dependency_overrides[deps.get_snapshot_archive] = lambda: None
+        no_archive = client.get("/api/csm/state", params={"block": 102})
+    finally:
+        app.dependency_overrides.clear()
+    assert state.status_code == 200
+    assert state.json() == snapshot_to_json(history[2][1])
+    assert state.headers["etag"] == '"csm-state-102"'
+    assert modules.json()[0]["active_validators"] == history[3][2][0].active_validators
+    assert modules.headers["X-Snapshot-Block"] == "103"
+    assert page.json()["items"] == snapshot_to_json(history[1][1])["queue"]["items"][:5]
+    assert missing.status_code == 404
+    assert "outside the archived range (100-104" in missing.json()["detail"]
+    assert no_archive.status_code == 404
@@ -0,0 +1,107 @@
+from fastapi.testclient import TestClient
+from web3 import Web3
+
+from app.config import MULTICALL3_ADDRESS, Config
+from app.eth.adapter import EthAdapter
+from app.main import app
+import app.deps as deps
+from app.services.csm_service import CsmService
+from app.services.router_service import RouterService
+from app.services.snapshot_cache import SnapshotCache, approx_size
+
+from fake_chain import FakeChain, FakeCsm, FakeRouter
+
+
+CSM = "0x00000000000000000000000000000000000000c5"
+ROUTER = "0x0000000000000000000000000000000000000052"
+
+
+def test_lru_evicts_by_entry_count():
+    cache = SnapshotCache(max_entries=2)
+    cache.put(("csm", 1), {"a": 1})
+    cache.put(("csm", 2), {"a": 2})
+    assert cache.get(("csm", 1)) == {"a": 1}  # refreshes recency of block 1
+    cache.put(("csm", 3), {"a": 3})
+    assert cache.get(("csm", 2)) is None
+    assert cache.get(("csm", 1)) == {"a": 1}
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["hits"] == 2 and cache.stats()["misses"] == 1
+
+
+def test_lru_evicts_by_approximate_bytes():
+    big = {"items": list(range(1000))}
+    size = approx_size(big)
+    cache = SnapshotCache(max_entries=100, max_bytes=int(size * 2.5))
+    for block in range(5):
+        cache.put(("csm", block), {"items": list(range(1000))})
+    stats = cache.stats()
+    assert stats["entries"] == 2
+    assert stats["bytes"] <= stats["max_bytes"]
+    assert stats["evictions"] == 3
+    # Values larger than the whole budget are not cached at all
+    cache.put(("csm", 99), {"items": list(range(10_000))})
+    assert cache.get(("csm", 99)) is None
+
+
+def _csm_service(cache):
+    chain = FakeChain()
+    csm = FakeCsm(chain, CSM)
+    for node_id in range(5):
+        csm.add_operator(node_id, deposited=1, depositable=2, enqueued=2)
+        csm.enqueue(node_id, 2)
+    adapter = EthAdapter(Web3(chain), multicall_address=MULTICALL3_ADDRESS)
+    return chain, csm, CsmService(Config(eth_rpc_url="http://fake", csm_address=CSM), adapter, cache=cache)
+
+
+def test_csm_snapshot_built_once_per_block_and_pinned():
+    cache = SnapshotCache()
+    chain, csm, service = _csm_service(cache)
+
+    first = service.snapshot()
+    calls_after_first = chain.requests["eth_call"]
+    assert first["block_number"] == 100
+    # Every read of the snapshot is pinned to the block fetched first
+    assert set(chain.call_blocks) == {hex(100)}
+
+    again = service.snapshot()
+    assert again is first
+    assert chain.requests["eth_call"] == calls_after_first
+    assert chain.requests["eth_blockNumber"] == 2
+
+    chain.block_number = 101
+    csm.enqueue(4, 1)
+    newer = service.snapshot()
+    assert newer["block_number"] == 101
+    assert newer["queue"]["size"] == 6
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 2
+
+
+def test_router_modules_cached_per_block():
+    chain = FakeChain()
+    router = FakeRouter(chain, ROUTER)
+    router.add_module(1, "0x" + "11" * 20, active_validators=10)
+    cfg = Config(eth_rpc_url="http://fake", staking_router_address=ROUTER)
+    service = RouterService(cfg, EthAdapter(Web3(chain), multicall_address=MULTICALL3_ADDRESS), cache=SnapshotCache())
+
+    modules = service.list_modules()
+    assert modules[0].active_validators == 10
+    calls = chain.requests["eth_call"]
+    assert service.list_modules() is modules
+    assert chain.requests["eth_call"] == calls
+    assert set(chain.call_blocks) == {hex(100)}
+
+    chain.block_number = 105
+    router.modules[1]["active_validators"] = 11
+    assert service.list_modules()[0].active_validators == 11
+
+
+def test_cache_stats_endpoint():
+    cache = SnapshotCache()
+    cache.get(("csm", 1))
+    app.dependency_overrides[deps.get_snapshot_cache] = lambda: cache
+    resp = TestClient(app).get("/api/cache")
+    app.dependency_overrides.clear()
+    assert resp.status_code == 200
+    data = resp.json()
+    assert data["enabled"] is True
+    assert data["misses"] == 1 and data["hits"] == 0 and data["evictions"] == 0
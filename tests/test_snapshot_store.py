@@ -0,0 +1,99 @@
+import asyncio
+
+from fastapi.testclient import TestClient
+from web3 import Web3
+
+from app.config import MULTICALL3_ADDRESS, Config
+from app.eth.adapter import EthAdapter
+from app.main import app
+import app.deps as deps
+from app.models import Module
+from app.services.csm_columns import snapshot_to_json
+from app.services.csm_service import CsmService
+from app.services.follower import BlockFollower
+from app.services.snapshot_cache import SnapshotCache
+from app.services.snapshot_store import SnapshotStore
+
+from fake_chain import FakeChain, FakeCsm
+
+
+CSM = "0x00000000000000000000000000000000000000c5"
+
+
+def _csm_service():
+    chain = FakeChain()
+    csm = FakeCsm(chain, CSM)
+    for node_id in range(40):
+        csm.add_operator(node_id, deposited=node_id, depositable=node_id % 4, enqueued=2, is_active=node_id % 3 != 0)
+    for i in range(300):
+        csm.enqueue(i % 25, 1 + i % 3)
+    csm.head = 7
+    adapter = EthAdapter(Web3(chain), multicall_address=MULTICALL3_ADDRESS)
+    return chain, CsmService(Config(eth_rpc_url="http://fake", csm_address=CSM), adapter)
+
+
+class _Router:
+    def __init__(self):
+        self.reads = 0
+
+    def list_modules(self, block_identifier=None):
+        self.reads += 1
+        return [Module(address="0x01", module_id=1, name="csm", active_validators=block_identifier)]
+
+
+def test_store_round_trips_snapshots(tmp_path):
+    chain, service = _csm_service()
+    snapshot = service.snapshot(100)
+    modules = _Router().list_modules(100)
+    store = SnapshotStore(str(tmp_path / "snapshots.sqlite3"))
+    assert store.load() is None
+
+    store.save(100, snapshot, modules, saved_at=123.0)
+    stored = SnapshotStore(store.path).load()
+    assert (stored.block, stored.saved_at) == (100, 123.0)
+    assert snapshot_to_json(stored.csm) == snapshot_to_json(snapshot)
+    assert stored.modules == modules
+    # Restored snapshots index and page like fresh ones
+    assert service.queue_index(stored.csm).total_keys == service.queue_index(snapshot).total_keys
+
+    # Plain (non-columnar) snapshots are stored too; the latest save wins
+    store.save(101, snapshot_to_json(snapshot), None)
+    stored = store.load()
+    assert stored.block == 101 and stored.modules is None
+    assert snapshot_to_json(stored.csm) == snapshot_to_json(snapshot)
+
+
+def test_restart_serves_stored_snapshot_until_first_refresh(tmp_path):
+    _, service = _csm_service()
+    router = _Router()
+    store = SnapshotStore(str(tmp_path / "snapshots.sqlite3"))
+    asyncio.run(BlockFollower(lambda: 100, csm=service, router=router, store=store).refresh())
+
+    def unreachable():
+        raise ConnectionError("RPC is down")
+
+    restarted = BlockFollower(unreachable, csm=service, router=router, max_staleness=5, wait_timeout=0.01, store=store)
+    app.dependency_overrides[deps.get_follower] = lambda: restarted
+    app.dependency_overrides[deps.get_csm_service] = lambda: None
+    app.dependency_overrides[deps.get_router_service] = lambda: None
+    app.dependency_overrides[deps.get_snapshot_cache] = lambda: SnapshotCache()
+    try:
+        with TestClient(app) as client:
+            state = client.get("/api/csm/state")
+            modules = client.get("/api/modules")
+    finally:
+        app.dependency_overrides.clear()
+    assert state.status_code == 200 and modules.status_code == 200
+    assert state.json() == snapshot_to_json(service.snapshot(100))
+    assert state.headers["X-Snapshot-Block"] == "100" and state.headers["X-Snapshot-Restored"] == "1"
+    assert modules.json()[0]["active_validators"] == 100
+    assert router.reads == 1
+
+    # The first refresh replaces it
+    async def refresh():
+        restarted.block_number = lambda: 101
+        return await restarted.refresh()
+
+    fresh = asyncio.run(refresh())
+    assert fresh.block == 101 and not fresh.restored
+    assert store.load().block == 101
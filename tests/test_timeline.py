@@ -0,0 +1,126 @@
+import dataclasses
+from decimal import Decimal
+import random
+
+from app.models import Module
+from app.services.allocation import simulate_lowest_share_first
+from app.services.timeline import (
+    InflowSegment,
+    TimelineScenario,
+    run_scenarios,
+    simulate_timeline,
+)
+
+
+def _module(mid, active, depositable, bps, per_block=30, distance=1, last=None, **kwargs):
+    return Module(
+        address="0x" + f"{mid:040x}",
+        module_id=mid,
+        target_share_bps=bps,
+        active_validators=active,
+        depositable_validators=depositable,
+        max_deposits_per_block=per_block,
+        min_deposit_block_distance=distance,
+        last_deposit_block=last,
+        **kwargs,
+    )
+
+
+def _replay(scenario):
+    """Reference: visit every block, allocating with the scalar engine."""
+    modules = [dataclasses.replace(m) for m in scenario.modules]
+    # Exact ETH amounts, as the engine keeps the buffer in wei
+    buffer = Decimal(str(scenario.initial_buffer_eth))
+    rates = sorted(scenario.inflow, key=lambda s: s.start_block)
+    reached = [None] * len(modules)
+    deposits = []
+    for block in range(scenario.start_block, scenario.end_block + 1):
+        if block > scenario.start_block:
+            buffer += next((Decimal(str(s.eth_per_block)) for s in reversed(rates) if s.start_block <= block), 0)
+        for pos, m in enumerate(modules):
+            if block == scenario.start_block and reached[pos] is None and m.target_share_bps is not None:
+                total = sum(x.active_validators for x in modules)
+                if total and m.active_validators * 10000 >= m.target_share_bps * total:
+                    reached[pos] = block
+        for pos, m in enumerate(modules):
+            if m.last_deposit_block is not None and block < m.last_deposit_block + m.min_deposit_block_distance:
+                continue
+            alloc = simulate_lowest_share_first(modules, float(buffer)).modules[pos].add_validators
+            count = min(alloc, m.max_deposits_per_block)
+            if count <= 0:
+                continue
+            m.active_validators += count
+            m.depositable_validators -= count
+            m.last_deposit_block = block
+            buffer -= count * 32
+            deposits.append((block, pos, count))
+            total = sum(x.active_validators for x in modules)
+            if reached[pos] is None and m.target_share_bps is not None:
+                if m.active_validators * 10000 >= m.target_share_bps * total:
+                    reached[pos] = block
+    return reached, [m.active_validators for m in modules], deposits, float(buffer)
+
+
+def test_matches_block_by_block_replay():
+    rnd = random.Random(7)
+    for _ in range(60):
+        modules = [
+            _module(
+                mid,
+                rnd.randint(0, 200),
+                rnd.randint(0, 150),
+                rnd.choice([None, 500, 1000, 2500, 10000]),
+                per_block=rnd.randint(1, 30),
+                distance=rnd.randint(1, 40),
+                last=rnd.choice([None, 0, 5]),
+                is_deposits_paused=rnd.random() < 0.1,
+            )
+            for mid in range(1, rnd.randint(1, 5) + 1)
+        ]
+        inflow = [InflowSegment(rnd.randint(0, 400), rnd.choice([0, 0.5, 3.2, 64, 100])) for _ in range(rnd.randint(0, 3))]
+        scenario = TimelineScenario(
+            modules=modules,
+            start_block=0,
+            end_block=rnd.randint(0, 800),
+            inflow=inflow,
+            initial_buffer_eth=rnd.choice([0, 31, 320, 5000]),
+            record_deposits=True,
+        )
+        reached, active, deposits, buffer = _replay(scenario)
+        result = simulate_timeline(scenario)
+        assert result.deposits == deposits
+        assert result.limit_reached_block == reached
+        assert result.active_validators == active
+        assert abs(result.buffer_eth - buffer) < 1e-6
+
+
+def test_rate_limits_and_share_limit_block():
+    # Module 1 may take 10 validators every 50 blocks and is capped at 50% of the total
+    modules = [_module(1, 0, 1000, 5000, per_block=10, distance=50), _module(2, 100, 0, None)]
+    scenario = TimelineScenario(modules, 0, 1000, initial_buffer_eth=32 * 100, record_deposits=True)
+    result = simulate_timeline(scenario)
+    assert result.deposits == [(block, 0, 10) for block in range(0, 451, 50)]
+    assert result.limit_reached_block == [450, None]
+    assert result.active_validators == [100, 100]
+
+
+def test_jumps_between_event_blocks():
+    modules = [_module(1, 1000, 10**6, 5000, per_block=30, distance=25), _module(2, 2000, 10**6, 10000, distance=25)]
+    scenario = TimelineScenario(modules, 0, 5_000_000, inflow=[InflowSegment(0, 2.0), InflowSegment(200_000, 0)])
+    result = simulate_timeline(scenario)
+    assert result.end_block == 5_000_000
+    # One validator of inflow every 16 blocks (from block 1), then nothing until the end
+    assert result.event_blocks <= 200_000 // 16 + 1
+    assert sum(result.deposited_validators) == 199_999 * 2 // 32
+    # Module 1 catches up with module 2 (50% each) while the inflow lasts
+    assert result.limit_reached_block[0] < 200_000
+    assert result.limit_reached_block[1] is None
+
+
+def test_run_scenarios_in_process_pool():
+    scenarios = [
+        TimelineScenario([_module(1, 0, 500, 5000, distance=d), _module(2, 50, 500, None)], 0, 10_000, [InflowSegment(0, 2)])
+        for d in (1, 10, 100)
+    ]
+    expected = [simulate_timeline(s) for s in scenarios]
+    assert run_scenarios(scenarios, max_workers=2) == expected